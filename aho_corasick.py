@@ -0,0 +1,86 @@
+"""
+Excel Data Cleaner - Aho-Corasick matcher
+Tells whether a text contains any of many patterns in a single pass over the text
+"""
+
+from collections import deque
+
+try:
+    import ahocorasick  # pyahocorasick, an optional C implementation
+except ImportError:
+    ahocorasick = None
+
+
+class Automaton:
+    """Aho-Corasick automaton answering "does the text contain any of the patterns?"
+    
+    Built once from the patterns; every text is then scanned one character at a time
+    with one transition per character, however many patterns there are. Uses
+    pyahocorasick when it is installed and a pure Python automaton otherwise, whose
+    transitions are completed (failure links folded in) so a step is one dict lookup.
+    Matching is case-sensitive: pass lowered patterns and text for case-insensitivity.
+    """
+    
+    def __init__(self, patterns):
+        self.patterns = list(dict.fromkeys(patterns))
+        # An empty pattern is contained in every text
+        self.matches_all = "" in self.patterns
+        self.native = None
+        if ahocorasick is not None and self.patterns and not self.matches_all:
+            self.native = ahocorasick.Automaton()
+            for pattern in self.patterns:
+                self.native.add_word(pattern, None)
+            self.native.make_automaton()
+        else:
+            self.transitions, self.accepting = self._build(self.patterns)
+    
+    @staticmethod
+    def _build(patterns):
+        """Transition dict and accepting flag of every state, state 0 being the root"""
+        # Trie of the patterns
+        goto = [{}]
+        accepting = [False]
+        for pattern in patterns:
+            state = 0
+            for char in pattern:
+                following = goto[state].get(char)
+                if following is None:
+                    following = len(goto)
+                    goto.append({})
+                    accepting.append(False)
+                    goto[state][char] = following
+                state = following
+            accepting[state] = True
+        
+        # Breadth first, each state takes the transitions of its failure state and adds its own;
+        # characters of no pattern are left out and lead back to the root
+        alphabet = set("".join(patterns))
+        transitions = [None] * len(goto)
+        transitions[0] = {char: goto[0].get(char, 0) for char in alphabet}
+        failure = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            # A state ending in a pattern (through its failure state) accepts too
+            accepting[state] = accepting[state] or accepting[failure[state]]
+            completed = dict(transitions[failure[state]])
+            for char, following in goto[state].items():
+                failure[following] = transitions[failure[state]][char]
+                completed[char] = following
+                queue.append(following)
+            transitions[state] = completed
+        return transitions, accepting
+    
+    def search(self, text):
+        """True if text contains any of the patterns"""
+        if self.matches_all:
+            return True
+        if self.native is not None:
+            return next(self.native.iter(text), None) is not None
+        transitions, accepting = self.transitions, self.accepting
+        state = 0
+        for char in text:
+            state = transitions[state].get(char, 0)
+            if accepting[state]:
+                return True
+        return False
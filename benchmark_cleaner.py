@@ -0,0 +1,411 @@
+"""
+Benchmark suite for Excel Cleaner
+Generates synthetic POLine workbooks and times each phase of the cleaning pipeline
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+import aho_corasick
+from cleaner_core import ExcelCleaner, PatternMatcher
+from instrumentation import peak_rss_mb
+from xlsx_stream import column_letter_to_index, index_to_column_letter
+
+
+SIZES = (10_000, 100_000, 1_000_000)
+
+# Phases of the pandas pipeline, timed one by one
+PHASES = ("load_file", "validate_columns", "clean_data", "save_cleaned_file", "save_deleted_file")
+
+# Pattern list sizes of the matcher benchmark, and the distinct values of its column
+PATTERN_COUNTS = (10, 100, 1000)
+PATTERN_VALUES = 200_000
+
+# Rows of the parallel matching benchmark, all with distinct rule cells, and its patterns per rule
+PARALLEL_ROWS = 2_000_000
+PARALLEL_PATTERNS = 40
+
+# Slowdown (as a fraction) reported as a regression by --compare; phases
+# slowing down by less than MIN_REGRESSION_SECONDS are timer noise
+REGRESSION_THRESHOLD = 0.10
+MIN_REGRESSION_SECONDS = 0.05
+
+CONTENT_TYPES = (
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+PACKAGE_RELS = (
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+WORKBOOK = (
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="POLine" sheetId="1" r:id="rId1"/></sheets></workbook>'
+)
+WORKBOOK_RELS = (
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" Target="sharedStrings.xml"/>'
+    '<Relationship Id="rId3" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+STYLES = (
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="1"><font/></fonts>'
+    '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0"/></cellStyleXfs>'
+    '<cellXfs count="1"><xf numFmtId="0" xfId="0"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles></styleSheet>'
+)
+
+
+def create_benchmark_excel(path, rows, width=74, match_rate=0.1, cardinality=1000, seed=0):
+    """Write a synthetic POLine workbook, a scalable version of test_cleaner.create_test_excel
+    
+    Every cell is filled: every fourth column holds numbers, the others text. Each column
+    draws from `cardinality` distinct values, and a `match_rate` share of the rows gets a
+    pattern of one of the rules in its column, so that share of the rows is removed.
+    The sheet XML is streamed into the file, so memory use does not grow with rows.
+    """
+    rule_columns = {column_letter_to_index(letter): name
+                    for name, letter in ExcelCleaner.COLUMNS.items()}
+    if width <= max(rule_columns):
+        raise ValueError(f"width must be at least {max(rule_columns) + 1} to reach all rule columns")
+    patterns = {name: patterns for name, patterns in ExcelCleaner.RULES}
+    rule_list = [(col_idx, patterns[name]) for col_idx, name in rule_columns.items() if name in patterns]
+    rng = random.Random(seed)
+    
+    # Shared strings: header names, then the value pool of every text column
+    strings = [rule_columns.get(col_idx, f"Col_{col_idx}") for col_idx in range(width)]
+    pools = {}
+    for col_idx in range(width):
+        if col_idx in rule_columns or col_idx % 4 != 3:
+            prefix = rule_columns.get(col_idx, f"Value {col_idx}")
+            pools[col_idx] = len(strings)
+            strings.extend(f"{prefix} {k:06d}" for k in range(cardinality))
+    hit_strings = {}
+    for col_idx, col_patterns in rule_list:
+        hit_strings[col_idx] = len(strings)
+        strings.extend(f"{pattern} {k:06d}" for pattern in col_patterns for k in range(cardinality))
+    
+    letters = [index_to_column_letter(col_idx) for col_idx in range(width)]
+    path = Path(path)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as package:
+        package.writestr("[Content_Types].xml", CONTENT_TYPES)
+        package.writestr("_rels/.rels", PACKAGE_RELS)
+        package.writestr("xl/workbook.xml", WORKBOOK)
+        package.writestr("xl/_rels/workbook.xml.rels", WORKBOOK_RELS)
+        package.writestr("xl/styles.xml", STYLES)
+        
+        with package.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write((
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                f'<dimension ref="A1:{letters[-1]}{rows + 1}"/><sheetData>'
+            ).encode())
+            header = "".join(f'<c r="{letters[c]}1" t="s"><v>{c}</v></c>' for c in range(width))
+            sheet.write(f'<row r="1">{header}</row>'.encode())
+            
+            block = []
+            for row_number in range(2, rows + 2):
+                hit = None
+                if rng.random() < match_rate:
+                    col_idx, col_patterns = rng.choice(rule_list)
+                    hit = (col_idx, hit_strings[col_idx] + rng.randrange(len(col_patterns) * cardinality))
+                cells = []
+                for col_idx in range(width):
+                    ref = f"{letters[col_idx]}{row_number}"
+                    if hit is not None and hit[0] == col_idx:
+                        cells.append(f'<c r="{ref}" t="s"><v>{hit[1]}</v></c>')
+                    elif col_idx in pools:
+                        cells.append(f'<c r="{ref}" t="s"><v>{pools[col_idx] + rng.randrange(cardinality)}</v></c>')
+                    else:
+                        cells.append(f'<c r="{ref}"><v>{rng.randrange(cardinality)}</v></c>')
+                block.append(f'<row r="{row_number}">{"".join(cells)}</row>')
+                if len(block) >= 1000:
+                    sheet.write("".join(block).encode())
+                    block = []
+            sheet.write(("".join(block) + "</sheetData></worksheet>").encode())
+        
+        with package.open("xl/sharedStrings.xml", "w") as shared:
+            shared.write(f'<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                         f'count="{len(strings)}" uniqueCount="{len(strings)}">'.encode())
+            for start in range(0, len(strings), 10_000):
+                shared.write("".join(f"<si><t>{escape(text)}</t></si>"
+                                     for text in strings[start:start + 10_000]).encode())
+            shared.write(b"</sst>")
+    return path
+
+
+def time_phases(path):
+    """Run the pandas pipeline one phase at a time and return {phase: seconds}"""
+    cleaner = ExcelCleaner(path, save_deleted=True, raise_errors=True)
+    timings = {}
+    for phase in PHASES:
+        started = time.perf_counter()
+        getattr(cleaner, phase)()
+        timings[phase] = time.perf_counter() - started
+    return cleaner, timings
+
+
+def time_engine(path, engine):
+    """Run a whole engine and return {"process": seconds}"""
+    cleaner = ExcelCleaner(path, save_deleted=True, engine=engine, raise_errors=True)
+    started = time.perf_counter()
+    cleaner.process()
+    return cleaner, {"process": time.perf_counter() - started}
+
+
+def run_case(path, engine):
+    """Benchmark one engine on one workbook (runs in a fresh process to measure peak memory)"""
+    if engine == "pandas":
+        cleaner, timings = time_phases(path)
+    else:
+        cleaner, timings = time_engine(path, engine)
+    return {
+        "engine": engine,
+        "phases": timings,
+        "seconds": sum(timings.values()),
+        "rows": cleaner.original_row_count,
+        "rows_removed": cleaner.rows_removed,
+        "peak_memory_mb": peak_rss_mb(),
+    }
+
+
+def run_isolated(path, engine):
+    """run_case in a new interpreter, so peak memory and caches are per case"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+        return executor.submit(run_case, path, engine).result()
+
+
+def run_suite(sizes=SIZES, width=74, match_rate=0.1, cardinality=1000, engines=("pandas",),
+              repeat=1, workdir="benchmark_data", isolate=True, report=print):
+    """Generate (or reuse) the workbooks and benchmark every engine on them
+    
+    With repeat > 1 the fastest run of each case is kept.
+    """
+    workdir = Path(workdir)
+    workdir.mkdir(parents=True, exist_ok=True)
+    cases = []
+    for rows in sizes:
+        path = workdir / f"poline_{rows}r_{width}c_{match_rate:g}m_{cardinality}u.xlsx"
+        generate_seconds = 0.0
+        if not path.exists():
+            report(f"Generating {path.name}...")
+            started = time.perf_counter()
+            create_benchmark_excel(path, rows, width, match_rate, cardinality)
+            generate_seconds = time.perf_counter() - started
+        
+        for engine in engines:
+            runs = [run_isolated(path, engine) if isolate else run_case(path, engine) for _ in range(repeat)]
+            result = min(runs, key=lambda run: run["seconds"])
+            result.update(rows=rows, width=width, match_rate=match_rate, cardinality=cardinality,
+                          file_bytes=path.stat().st_size, generate_seconds=generate_seconds)
+            result["rows_per_second"] = rows / result["seconds"] if result["seconds"] else None
+            report(format_case(result))
+            cases.append(result)
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "openpyxl": openpyxl.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "cases": cases,
+    }
+
+
+def random_code(rng):
+    """Supplier-code-like text of 4 to 9 letters and digits"""
+    return "".join(rng.choices("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789", k=rng.randint(4, 9)))
+
+
+def run_pattern_benchmark(pattern_counts=PATTERN_COUNTS, values=PATTERN_VALUES, seed=0, report=print):
+    """Time PatternMatcher.match_series with the regex alternation and the Aho-Corasick automaton
+    
+    The column holds `values` distinct comment-like texts (matching only looks at distinct
+    values) and every list `pattern_counts` random codes. The automaton is timed in pure
+    Python and, when pyahocorasick is installed, natively. Returns {pattern count: {method: seconds}}.
+    """
+    rng = random.Random(seed)
+    column = pd.Series([f"PO-{random_code(rng)} {random_code(rng)} ref {rng.randint(0, 10**6)}"
+                        for _ in range(values)], dtype=object)
+    regex_matcher = type("RegexMatcher", (PatternMatcher,), {"AUTOMATON_MIN_PATTERNS": float("inf")})
+    automaton_matcher = type("AutomatonMatcher", (PatternMatcher,), {"AUTOMATON_MIN_PATTERNS": 0})
+    
+    methods = {"regex": (regex_matcher, None), "automaton": (automaton_matcher, None)}
+    if aho_corasick.ahocorasick is not None:
+        methods["pyahocorasick"] = (automaton_matcher, aho_corasick.ahocorasick)
+    
+    results = {}
+    native = aho_corasick.ahocorasick
+    try:
+        for count in pattern_counts:
+            patterns = [random_code(rng) for _ in range(count)]
+            timings = {}
+            expected = None
+            for method, (matcher_class, module) in methods.items():
+                aho_corasick.ahocorasick = module
+                started = time.perf_counter()
+                hits = matcher_class(patterns).match_series(column).to_numpy()
+                timings[method] = time.perf_counter() - started
+                if expected is None:
+                    expected = hits
+                elif not np.array_equal(hits, expected):
+                    raise AssertionError(f"{method} disagrees with the regex on {count} patterns")
+            results[count] = timings
+            report(f"{count:>5} patterns  " + "  ".join(f"{method} {seconds:.2f}s" for method, seconds in timings.items())
+                   + f"  ({int(expected.sum())} of {values} values matched)")
+    finally:
+        aho_corasick.ahocorasick = native
+    return results
+
+
+def run_parallel_benchmark(workers, rows=PARALLEL_ROWS, patterns=PARALLEL_PATTERNS, seed=0, report=print):
+    """Time ExcelCleaner.evaluate_rules serially and with match_workers=workers on the same frame
+    
+    The four rule columns hold comment-like text that is distinct on every row, the
+    case parallel matching is for, and every rule has `patterns` random codes. The
+    masks must agree. Returns {"serial": seconds, "parallel": seconds, "speedup": ratio}.
+    """
+    rng = random.Random(seed)
+    rules_frame = pd.DataFrame({
+        column: [f"PO-{random_code(rng)} {random_code(rng)} ref {row}" for row in range(rows)]
+        for column in range(4)
+    }, dtype=object)
+    rule_patterns = [[random_code(rng) for _ in range(patterns)] for _ in range(4)]
+    positions = {column_letter_to_index(letter): position
+                 for position, letter in enumerate(ExcelCleaner.COLUMNS.values())}
+    
+    timings = {}
+    masks = {}
+    for name, match_workers in (("serial", 1), ("parallel", workers)):
+        cleaner = ExcelCleaner("benchmark.xlsx", match_workers=match_workers)
+        cleaner.RULES = [(col_name, rule_patterns[position]) for position, col_name in enumerate(cleaner.COLUMNS)]
+        started = time.perf_counter()
+        masks[name] = cleaner.evaluate_rules(rules_frame, positions).to_numpy()
+        timings[name] = time.perf_counter() - started
+    if not np.array_equal(masks["serial"], masks["parallel"]):
+        raise AssertionError("Parallel matching disagrees with serial matching")
+    timings["speedup"] = timings["serial"] / timings["parallel"]
+    report(f"{rows} rows, {patterns} patterns per rule: serial {timings['serial']:.2f}s, "
+           f"{workers} workers {timings['parallel']:.2f}s ({timings['speedup']:.2f}x)")
+    return timings
+
+
+def case_key(case):
+    return (case["rows"], case["width"], case["match_rate"], case["cardinality"], case["engine"])
+
+
+def format_case(case):
+    """One line per case for the console"""
+    phases = "  ".join(f"{phase} {seconds:.2f}s" for phase, seconds in case["phases"].items())
+    memory = f"  peak {case['peak_memory_mb']:.0f} MB" if case["peak_memory_mb"] else ""
+    return f"{case['engine']:<9} {case['rows']:>9} rows  {phases}  total {case['seconds']:.2f}s{memory}"
+
+
+def compare_results(baseline, current, threshold=REGRESSION_THRESHOLD, report=print):
+    """Print the per-phase change against a baseline result file, returns the regressed phases"""
+    baseline_cases = {case_key(case): case for case in baseline["cases"]}
+    regressions = []
+    for case in current["cases"]:
+        before = baseline_cases.get(case_key(case))
+        if before is None:
+            continue
+        for phase, seconds in case["phases"].items():
+            previous = before["phases"].get(phase)
+            if not previous:
+                continue
+            change = seconds / previous - 1
+            flag = ""
+            if change > threshold and seconds - previous > MIN_REGRESSION_SECONDS:
+                flag = "  REGRESSION"
+                regressions.append((case_key(case), phase, change))
+            report(f"{case['engine']:<9} {case['rows']:>9} rows  {phase:<18} "
+                   f"{previous:8.2f}s -> {seconds:8.2f}s  {change:+.1%}{flag}")
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the Excel Cleaner on synthetic POLine workbooks.")
+    parser.add_argument("--rows", type=int, nargs="+", default=list(SIZES),
+                        help="data rows of the generated workbooks (default: 10000 100000 1000000)")
+    parser.add_argument("--width", type=int, default=74, help="number of columns (at least 74)")
+    parser.add_argument("--match-rate", type=float, default=0.1, help="share of rows that match a rule")
+    parser.add_argument("--cardinality", type=int, default=1000, help="distinct values per column")
+    parser.add_argument("--engines", nargs="+", choices=ExcelCleaner.ENGINES, default=["pandas"],
+                        help="engines to time (pandas is timed per phase, the others as a whole)")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per case, the fastest is kept")
+    parser.add_argument("--workdir", default="benchmark_data", help="folder of the generated workbooks")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file for the results")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="slowdown reported as a regression by --compare (default: 0.10)")
+    parser.add_argument("--patterns", type=int, nargs="+",
+                        help="instead of the workbooks, time the pattern matchers on lists of these sizes "
+                             "(e.g. 10 100 1000)")
+    parser.add_argument("--parallel", type=int, metavar="WORKERS",
+                        help="instead of the workbooks, time rule matching with this many match workers "
+                             "against serial matching; fails unless it is faster")
+    parser.add_argument("--parallel-rows", type=int, default=PARALLEL_ROWS,
+                        help="rows of the --parallel benchmark (default: 2000000)")
+    return parser
+
+
+def main(argv=None):
+    """Command line entry point, returns 1 if --compare found a regression or --parallel no speedup"""
+    args = build_parser().parse_args(argv)
+    if args.parallel:
+        results = run_parallel_benchmark(args.parallel, args.parallel_rows)
+        Path(args.output).write_text(json.dumps({"parallel": results}, indent=2), encoding="utf-8")
+        print(f"Results written to {args.output}")
+        if (os.cpu_count() or 1) < 2:
+            print("One CPU only: the speedup is not checked")
+            return 0
+        return 0 if results["speedup"] > 1 else 1
+    if args.patterns:
+        results = run_pattern_benchmark(args.patterns)
+        Path(args.output).write_text(json.dumps({"patterns": results}, indent=2), encoding="utf-8")
+        print(f"Results written to {args.output}")
+        return 0
+    
+    results = run_suite(args.rows, args.width, args.match_rate, args.cardinality, args.engines,
+                        args.repeat, args.workdir)
+    Path(args.output).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"Results written to {args.output}")
+    
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        print(f"\nCompared with {args.compare}:")
+        if compare_results(baseline, results, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,388 @@
+"""
+Excel Data Cleaner - Command line entry point
+Cleans many Excel files in one run, in parallel worker processes, without the GUI
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from pathlib import Path
+
+from cleaner_core import ExcelCleaner, RulesError
+from instrumentation import PROFILE_MODES, available_memory_mb
+from frame_cache import FrameCache, DEFAULT_MAX_BYTES as DEFAULT_FRAME_MAX_BYTES
+from result_cache import ResultCache, DEFAULT_MAX_BYTES
+
+
+INPUT_SUFFIXES = tuple(f".{file_format}" for file_format in ExcelCleaner.FILE_FORMATS)
+OUTPUT_SUFFIXES = tuple(f"{kind}{suffix}" for kind in ("_CLEANED", "_DELETED") for suffix in INPUT_SUFFIXES)
+
+
+def is_input_file(path):
+    """True for .xlsx, .csv and .parquet files that are not our own outputs or Excel lock files"""
+    return (
+        path.suffix.lower() in INPUT_SUFFIXES
+        and not path.name.startswith("~$")
+        and not path.name.endswith(OUTPUT_SUFFIXES)
+    )
+
+
+def collect_files(inputs, recursive=False):
+    """Expand files, glob patterns and directories into a sorted list of input files"""
+    files = set()
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            candidates = path.rglob("*") if recursive else path.glob("*")
+        elif path.exists():
+            candidates = [path]
+        else:
+            candidates = [Path(match) for match in glob.glob(item, recursive=recursive)]
+            if not candidates:
+                print(f"No files match: {item}", file=sys.stderr)
+        files.update(candidate.resolve() for candidate in candidates if is_input_file(candidate))
+    return sorted(files)
+
+
+def clean_file(path, engine="auto", save_deleted=False, chunk_size=ExcelCleaner.CHUNK_SIZE, cache=None,
+               incremental=False, profile=None, save_report=False, memory_budget_mb=None, match_workers=1,
+               sheets=None, sheet_workers=None, output_formats=None, frame_cache=None, rules_file=None,
+               compact=False):
+    """Clean one file and return a summary dict (runs inside a worker process)"""
+    started = time.perf_counter()
+    summary = {"file": str(path), "ok": False, "rows": 0, "removed": 0, "remaining": 0,
+               "output": None, "deleted_output": None, "cached": False, "frame_cached": False,
+               "engine": engine, "engine_reason": None,
+               "sheets": {}, "rules": [], "memory_mb": None, "seconds": 0.0, "error": None}
+    try:
+        cleaner = ExcelCleaner(
+            path,
+            save_deleted=save_deleted,
+            engine=engine,
+            chunk_size=chunk_size,
+            cache=cache,
+            incremental=incremental,
+            profile=profile,
+            save_report=save_report,
+            memory_budget_mb=memory_budget_mb,
+            match_workers=match_workers,
+            sheets=sheets,
+            sheet_workers=sheet_workers,
+            output_formats=output_formats,
+            frame_cache=frame_cache,
+            rules_file=rules_file,
+            compact=compact
+        )
+        output_path = cleaner.process()
+        deleted_path = cleaner.deleted_output_path if output_path else None
+        
+        summary.update(
+            ok=output_path is not None,
+            rows=cleaner.original_row_count,
+            removed=cleaner.rows_removed,
+            remaining=cleaner.remaining_row_count,
+            output=str(output_path) if output_path else None,
+            deleted_output=str(deleted_path) if deleted_path else None,
+            cached=cleaner.cache_hit,
+            frame_cached=cleaner.frame_cache_hit,
+            engine=cleaner.engine,
+            engine_reason=cleaner.engine_reason,
+            sheets=cleaner.sheet_stats,
+            rules=cleaner.describe_rule_stats(),
+            memory_mb=cleaner.memory_mb,
+        )
+        if cleaner.errors:
+            summary["error"] = " | ".join(
+                f"{error.title}: {error.message}".replace("\n", " ") for error in cleaner.errors
+            )
+    except Exception as e:
+        summary["error"] = str(e)
+    summary["seconds"] = time.perf_counter() - started
+    return summary
+
+
+def preview_file(path, sample_rows=ExcelCleaner.PREVIEW_SAMPLE_ROWS, rules_file=None, **options):
+    """Count the rows one file would lose without writing anything, as a summary dict like clean_file's
+    
+    Options that only matter when writing (engine, caches, formats...) are ignored.
+    """
+    started = time.perf_counter()
+    summary = {"file": str(path), "ok": False, "rows": 0, "removed": 0, "remaining": 0,
+               "rules": [], "sample": [], "seconds": 0.0, "error": None}
+    try:
+        cleaner = ExcelCleaner(path, rules_file=rules_file)
+        preview = cleaner.preview(sample_rows)
+        if preview is not None:
+            summary.update(ok=True, rows=preview["rows"], removed=preview["removed"],
+                           remaining=preview["remaining"], rules=preview["rules"], sample=preview["sample"])
+        if cleaner.errors:
+            summary["error"] = " | ".join(
+                f"{error.title}: {error.message}".replace("\n", " ") for error in cleaner.errors
+            )
+    except Exception as e:
+        summary["error"] = str(e)
+    summary["seconds"] = time.perf_counter() - started
+    return summary
+
+
+def format_preview(summary):
+    """Counts of a preview for the console: the file, one line per rule and the sample rows"""
+    status = "OK  " if summary["ok"] else "FAIL"
+    line = (
+        f"{status} {summary['file']}  rows {summary['rows']}  would remove {summary['removed']}  "
+        f"remaining {summary['remaining']}  {summary['seconds']:.2f}s"
+    )
+    for rule in summary["rules"]:
+        line += (f"\n     rule {rule['rule']} (column {rule['column']}): matches {rule['matches']} rows, "
+                 f"removes {rule['removed']}")
+    for record in summary["sample"]:
+        cells = ", ".join(f"{name}={value!r}" for name, value in record.items() if name != "row" and value is not None)
+        line += f"\n     row {record['row']}: {cells}"
+    if summary["error"]:
+        line += f"\n     {summary['error']}"
+    return line
+
+
+def format_summary(summary, rule_stats=False):
+    """One line per file for the console, plus one per rule with rule_stats"""
+    status = "OK  " if summary["ok"] else "FAIL"
+    line = (
+        f"{status} {summary['file']}  rows {summary['rows']}  removed {summary['removed']}  "
+        f"remaining {summary['remaining']}  {summary['seconds']:.2f}s"
+    )
+    if summary["cached"]:
+        line += "  (cached)"
+    elif summary["frame_cached"]:
+        line += "  (rows from the frame cache)"
+    for name, stats in summary["sheets"].items():
+        line += f"\n     sheet {name}: rows {stats['rows']}  removed {stats['removed']}  remaining {stats['remaining']}"
+    if summary["memory_mb"]:
+        line += (f"\n     rows in memory: {summary['memory_mb']['loaded']:.1f} MB loaded, "
+                 f"{summary['memory_mb']['compact']:.1f} MB compacted")
+        if summary["memory_mb"].get("peak_rss") is not None:
+            line += f", {summary['memory_mb']['peak_rss']:.1f} MB peak resident"
+    if rule_stats:
+        for rule_line in summary["rules"]:
+            line += f"\n     rule {rule_line}"
+    if summary["engine_reason"]:
+        line += f"\n     {summary['engine']} engine: {summary['engine_reason']}"
+    if summary["error"]:
+        line += f"\n     {summary['error']}"
+    return line
+
+
+def run_batch(files, workers=None, engine="auto", save_deleted=False,
+              chunk_size=ExcelCleaner.CHUNK_SIZE, cache=None, incremental=False, profile=None,
+              save_report=False, memory_budget_mb=None, match_workers=1, sheets=None, sheet_workers=None,
+              output_formats=None, frame_cache=None, rules_file=None, rule_stats=False, compact=False,
+              preview=False, report=print):
+    """Clean all files with a pool of worker processes, reporting each one as it finishes
+    
+    With preview, the files are only counted (preview_file) and nothing is written.
+    """
+    options = {"engine": engine, "save_deleted": save_deleted, "chunk_size": chunk_size, "cache": cache,
+               "incremental": incremental, "profile": profile, "save_report": save_report,
+               "memory_budget_mb": memory_budget_mb, "match_workers": match_workers, "sheets": sheets,
+               "sheet_workers": sheet_workers, "output_formats": output_formats, "frame_cache": frame_cache,
+               "rules_file": rules_file, "compact": compact}
+    if preview:
+        task, describe = preview_file, format_preview
+    else:
+        task, describe = clean_file, partial(format_summary, rule_stats=rule_stats)
+    summaries = []
+    
+    if workers == 1:
+        for path in files:
+            summary = task(path, **options)
+            report(describe(summary))
+            summaries.append(summary)
+        return summaries
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(task, path, **options) for path in files]
+        for future in as_completed(futures):
+            summary = future.result()
+            report(describe(summary))
+            summaries.append(summary)
+    return summaries
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Remove test data and FOC entries from Excel files without the GUI."
+    )
+    parser.add_argument("inputs", nargs="+", help=".xlsx, .csv or .parquet files, glob patterns or directories")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(),
+                        help="number of worker processes (default: number of CPUs)")
+    parser.add_argument("-e", "--engine", choices=ExcelCleaner.ENGINES, default="auto",
+                        help="processing engine (default: auto, chosen per file from the memory budget)")
+    parser.add_argument("--memory-budget", type=int,
+                        help="memory in MB the pandas engine may use per file with --engine auto "
+                             "(default: half of the available memory, shared by the workers)")
+    parser.add_argument("-p", "--preview", action="store_true",
+                        help="only count the rows each rule would remove, from the rule columns, "
+                             "and show a few of them, without writing any file")
+    parser.add_argument("-d", "--save-deleted", action="store_true",
+                        help="also write the removed rows to <name>_DELETED.xlsx")
+    parser.add_argument("-f", "--output-format", nargs="+", choices=ExcelCleaner.FILE_FORMATS, metavar="FORMAT",
+                        help="formats of the outputs: xlsx, csv and/or parquet (default: the input's format)")
+    parser.add_argument("-r", "--recursive", action="store_true",
+                        help="search directories (and ** in patterns) recursively")
+    parser.add_argument("--match-workers", type=int, default=1,
+                        help="processes matching the distinct values of the rule columns when they hold "
+                             "1,000,000 or more (default: 1; use with --workers 1 on very large files)")
+    parser.add_argument("--sheets", nargs="+", metavar="SHEET",
+                        help="clean these sheets (or 'all') into one workbook of each kind "
+                             "instead of only the first sheet")
+    parser.add_argument("--compact", action="store_true",
+                        help="hold the loaded rows in compact column types (categoricals, Arrow strings, "
+                             "smaller numbers) and print their memory before and after")
+    parser.add_argument("--rules", metavar="FILE",
+                        help="JSON or YAML file of the rules (column letters or header names and their patterns) "
+                             "instead of the built-in rules")
+    parser.add_argument("--rule-stats", action="store_true",
+                        help="print the rows examined, rows removed and time of every rule, in evaluation order")
+    parser.add_argument("--chunk-size", type=int, default=ExcelCleaner.CHUNK_SIZE,
+                        help="rows evaluated at once by the streaming and xml engines")
+    parser.add_argument("-i", "--incremental", action="store_true",
+                        help="reuse the decisions of rows seen in earlier runs and only match new rows")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="always clean the files, without reusing or storing cached results")
+    parser.add_argument("--cache-dir", help="folder of the result cache (default: per-user cache folder)")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_BYTES // (1 << 20),
+                        help="result cache size limit in MB, least recently used results go first")
+    parser.add_argument("--no-frame-cache", action="store_true",
+                        help="always read the input files, without reusing or storing their loaded rows")
+    parser.add_argument("--frame-cache-dir",
+                        help="folder of the frame cache (default: per-user cache folder)")
+    parser.add_argument("--frame-cache-size", type=int, default=DEFAULT_FRAME_MAX_BYTES // (1 << 20),
+                        help="frame cache size limit in MB, least recently used files go first")
+    parser.add_argument("--clear-cache", action="store_true",
+                        help="empty the result and frame caches before cleaning")
+    parser.add_argument("--report", action="store_true",
+                        help="write the timings, row and byte counts and memory of each phase to <name>_REPORT.json")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and clean the files dropped into the input folders as they arrive")
+    parser.add_argument("--poll-interval", type=float, default=2.0,
+                        help="seconds between two scans of the watched folders (default: 2)")
+    parser.add_argument("--settle", type=float, default=5.0,
+                        help="seconds a file must stay unchanged before it is cleaned (default: 5)")
+    parser.add_argument("--max-queue", type=int,
+                        help="files waiting for a worker at most, others wait in the folder (default: 4 per worker)")
+    parser.add_argument("--max-attempts", type=int, default=3,
+                        help="runs of a failing file before it is left as failed (default: 3)")
+    parser.add_argument("--journal", metavar="FILE",
+                        help="file of the status of the watched files, kept across restarts "
+                             "(default: per-user cache folder)")
+    parser.add_argument("--profile", choices=PROFILE_MODES,
+                        help="profile the run with cProfile or measure exact memory with tracemalloc (implies --report)")
+    return parser
+
+
+def file_options(args, workers, cache, frame_cache):
+    """Options of clean_file for every file of a run with the given number of workers"""
+    memory_budget_mb = args.memory_budget
+    if memory_budget_mb is None and workers > 1:
+        # The workers load their files at the same time, so they share the budget
+        available = available_memory_mb()
+        if available:
+            memory_budget_mb = available * ExcelCleaner.MEMORY_BUDGET_SHARE / workers
+    
+    sheets = args.sheets
+    if sheets == ["all"]:
+        sheets = "all"
+    
+    return {"engine": args.engine, "save_deleted": args.save_deleted, "chunk_size": args.chunk_size,
+            "cache": cache, "incremental": args.incremental, "profile": args.profile,
+            "save_report": args.report or args.profile is not None, "memory_budget_mb": memory_budget_mb,
+            "match_workers": args.match_workers, "sheets": sheets,
+            # Files cleaned in parallel already use the CPUs, so their sheets are cleaned one after another
+            "sheet_workers": None if workers == 1 else 1,
+            "output_formats": args.output_format, "frame_cache": frame_cache, "rules_file": args.rules,
+            "compact": args.compact}
+
+
+def watch(args, cache, frame_cache):
+    """Run the watch-folder mode of main until it is interrupted"""
+    from folder_watcher import FolderWatcher
+    
+    folders = [folder for folder in args.inputs if not Path(folder).is_dir()]
+    if folders:
+        print(f"Not a folder: {', '.join(folders)}", file=sys.stderr)
+        return 2
+    
+    workers = max(1, args.workers or 1)
+    options = file_options(args, workers, cache, frame_cache)
+    watcher = FolderWatcher(args.inputs, workers=workers, max_queue=args.max_queue,
+                            poll_seconds=args.poll_interval, settle_seconds=args.settle,
+                            max_attempts=args.max_attempts, journal_path=args.journal,
+                            recursive=args.recursive, options=options)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    counts = watcher.journal.counts()
+    print(f"\nStopped: {counts['done']} cleaned, {counts['failed']} failed, "
+          f"{counts['queued'] + counts['running']} left for the next run (journal {watcher.journal.path})")
+    return 0
+
+
+def main(argv=None):
+    """Command line entry point, returns the process exit code"""
+    args = build_parser().parse_args(argv)
+    
+    if args.rules:
+        # Checked once here, so a broken rules file is not reported by every file
+        try:
+            from rules_file import load_rules
+            load_rules(args.rules)
+        except RulesError as e:
+            print(f"{e.title}: {e.message}", file=sys.stderr)
+            return 2
+    
+    cache = None
+    if not args.no_cache:
+        cache = ResultCache(args.cache_dir, max_bytes=args.cache_size << 20)
+        if args.clear_cache:
+            print(f"Removed {cache.clear()} cached result(s)")
+    
+    frame_cache = None
+    if not args.no_frame_cache:
+        frame_cache = FrameCache(args.frame_cache_dir, max_bytes=args.frame_cache_size << 20)
+        if args.clear_cache:
+            print(f"Removed {frame_cache.clear()} cached frame(s)")
+    
+    if args.watch:
+        return watch(args, cache, frame_cache)
+    
+    files = collect_files(args.inputs, recursive=args.recursive)
+    if not files:
+        print("No .xlsx, .csv or .parquet files found.", file=sys.stderr)
+        return 2
+    
+    workers = max(1, min(args.workers or 1, len(files)))
+    action = "Previewing" if args.preview else "Cleaning"
+    print(f"{action} {len(files)} file(s) with {workers} worker(s)...")
+    
+    started = time.perf_counter()
+    summaries = run_batch(files, workers=workers, rule_stats=args.rule_stats, preview=args.preview,
+                          **file_options(args, workers, cache, frame_cache))
+    elapsed = time.perf_counter() - started
+    
+    failed = [summary for summary in summaries if not summary["ok"]]
+    total_rows = sum(summary["rows"] for summary in summaries)
+    total_removed = sum(summary["removed"] for summary in summaries)
+    print(
+        f"\nDone in {elapsed:.2f}s: {len(summaries) - len(failed)} {'previewed' if args.preview else 'cleaned'}, "
+        f"{len(failed)} failed, {total_rows} rows read, {total_removed} rows "
+        f"{'would be removed' if args.preview else 'removed'}"
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2006 @@
+"""
+Excel Data Cleaner - Cleaning core
+Rules, matching and the processing engines, importable without any GUI modules
+"""
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import infer_dtype
+from pandas.io.parsers import TextParser
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import ERROR_CODES
+from openpyxl.styles import Alignment, Border, Font, Side
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from multiprocessing import get_context
+import importlib.util
+import os
+import re
+import itertools
+import time
+
+from xlsx_stream import XlsxPackage, FilteredCopyWriter, index_to_column_letter
+from aho_corasick import Automaton
+from row_index import RowIndex, row_fingerprints
+from instrumentation import RunRecorder, available_memory_mb, peak_rss_mb
+
+
+# Strings pandas' read_excel turns into NaN by default; the engines that read
+# cells themselves treat them the same way so every engine removes the same rows
+NA_STRINGS = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+    '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a',
+    'nan', 'null'
+])
+
+
+# Header style of DataFrame.to_excel, kept for the files the pandas engine writes
+HEADER_FONT = Font(bold=True)
+HEADER_BORDER = Border(left=Side(style='thin'), right=Side(style='thin'),
+                       top=Side(style='thin'), bottom=Side(style='thin'))
+HEADER_ALIGNMENT = Alignment(horizontal='center', vertical='top')
+
+
+# Names of the file formats in messages
+FORMAT_NAMES = {'xlsx': 'Excel', 'csv': 'CSV', 'parquet': 'Parquet'}
+
+
+# Text columns whose distinct values are at most this share of their cells become categoricals in compact mode
+CATEGORY_MAX_SHARE = 0.5
+
+
+def pyarrow_available():
+    """True when pyarrow is installed, for Arrow-backed text columns"""
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def parquet_available():
+    """True when pandas can read and write Parquet, which needs pyarrow (or fastparquet)"""
+    return any(importlib.util.find_spec(name) for name in ('pyarrow', 'fastparquet'))
+
+
+def parquet_frame(frame):
+    """frame as Parquet can store it: text column names, and text in columns whose cells mix types
+    
+    Excel columns often mix numbers and text, which a Parquet column cannot hold.
+    """
+    mixed = [position for position, (_, column) in enumerate(frame.items())
+             if column.dtype == object and infer_dtype(column, skipna=True) in ('mixed', 'mixed-integer')]
+    if not mixed and all(isinstance(name, str) for name in frame.columns):
+        return frame
+    frame = frame.copy(deep=False)
+    for position in mixed:
+        column = frame.iloc[:, position]
+        frame.isetitem(position, column.where(column.isna(), column.astype(str)))
+    frame.columns = [str(name) for name in frame.columns]
+    return frame
+
+
+def frame_memory_mb(frame):
+    """Memory of frame's cells in MB, including the Python objects of object columns"""
+    return frame.memory_usage(index=False, deep=True).sum() / (1 << 20)
+
+
+def compact_column(column):
+    """column holding the same cells in less memory, or column itself when it does not shrink
+    
+    Text columns with few distinct values become categoricals, other text columns
+    Arrow strings (with pyarrow), and numbers the smallest integer or float type that
+    holds every value exactly. Columns mixing text and numbers stay as they are: as
+    categories, 1, 1.0 and True would become one value.
+    """
+    dtype = column.dtype
+    if isinstance(dtype, np.dtype) and dtype.kind in 'iu':
+        return pd.to_numeric(column, downcast='integer' if dtype.kind == 'i' else 'unsigned')
+    if isinstance(dtype, np.dtype) and dtype.kind == 'f' and dtype.itemsize > 4:
+        small = column.astype(np.float32)
+        exact = (small.astype(dtype) == column) | column.isna()
+        return small if exact.all() else column
+    if dtype == object or isinstance(dtype, pd.StringDtype):
+        if infer_dtype(column, skipna=True) not in ('string', 'empty'):
+            return column
+        if column.nunique() <= len(column) * CATEGORY_MAX_SHARE:
+            return column.astype('category')
+        if dtype == object and pyarrow_available():
+            return column.astype('string[pyarrow]')
+    return column
+
+
+def pack_cells(values):
+    """A run of a column's cells (None where empty) held in less memory than a list of Python objects
+    
+    Numbers become a float64 array (NaN where empty), text Arrow strings (with pyarrow)
+    or a categorical; runs mixing types, or holding integers a float cannot hold
+    exactly, stay an object array. unpack_cells gives the cells back.
+    """
+    kinds = {type(value) for value in values if value is not None}
+    if kinds <= {int, float} and not any(type(value) is int and abs(value) > 2 ** 53 for value in values):
+        return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+    if kinds == {str}:
+        if pyarrow_available():
+            import pyarrow
+            return pyarrow.array(values, type=pyarrow.string())
+        return pd.Categorical(values)
+    cells = np.empty(len(values), dtype=object)
+    cells[:] = values
+    return cells
+
+
+def unpack_cells(piece):
+    """The cells of a pack_cells piece as read_excel hands them to its parser: "" where empty, whole numbers as int"""
+    if isinstance(piece, pd.Categorical):
+        cells = np.asarray(piece, dtype=object)
+        cells[piece.codes < 0] = ""
+        return cells
+    if not isinstance(piece, np.ndarray):
+        return piece.fill_null("").to_numpy(zero_copy_only=False)
+    if piece.dtype == object:
+        cells = piece.copy()
+        cells[np.equal(cells, None)] = ""
+        return cells
+    cells = piece.astype(object)
+    whole = np.floor(piece) == piece
+    cells[whole] = [int(value) for value in piece[whole]]
+    cells[np.isnan(piece)] = ""
+    return cells
+
+
+def parse_cells(pieces, rows, name):
+    """Column name of rows cells, typed the way pd.read_excel types it, from its (first row, pack_cells piece) pairs
+    
+    Rows no piece covers are empty. Columns of numbers only are typed here; all others
+    go through the parser read_excel uses, which also turns numeric text into numbers.
+    """
+    if pieces and all(isinstance(piece, np.ndarray) and piece.dtype == np.float64 for _, piece in pieces):
+        numbers = np.full(rows, np.nan)
+        for first, piece in pieces:
+            numbers[first:first + len(piece)] = piece
+        # The parser makes int64 of whole numbers without gaps, float64 of anything else
+        if not np.isnan(numbers).any() and (np.floor(numbers) == numbers).all() and np.abs(numbers).max() < 2 ** 63:
+            return pd.Series(numbers.astype(np.int64), name=name)
+        return pd.Series(numbers, name=name)
+    cells = np.full(rows, "", dtype=object)
+    for first, piece in pieces:
+        cells[first:first + len(piece)] = unpack_cells(piece)
+    parsed = TextParser([[cell] for cell in cells], names=[name], header=None, skip_blank_lines=False).read()
+    return parsed.iloc[:, 0]
+
+
+def pack_rows(chunk):
+    """(first row, {column index: pack_cells piece}) of a chunk of (row position, read_row cells) pairs"""
+    first = chunk[0][0]
+    length = chunk[-1][0] - first + 1
+    columns = {}
+    for position, cells in chunk:
+        for col_index, value in cells.items():
+            column = columns.get(col_index)
+            if column is None:
+                column = columns[col_index] = [None] * length
+            column[position - first] = value
+    return first, {col_index: pack_cells(column) for col_index, column in columns.items()}
+
+
+def normalize_cell(value):
+    """Convert an openpyxl cell value to what pandas' read_excel would hold for it"""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and (value in NA_STRINGS or value in ERROR_CODES):
+        return None
+    return value
+
+
+class CleanerError(Exception):
+    """A cleaning failure, with a title and message suitable for showing to the user"""
+    
+    title = "Error"
+    
+    def __init__(self, message, path=None, title=None):
+        super().__init__(message)
+        self.message = message
+        self.path = path
+        if title is not None:
+            self.title = title
+
+
+class ReadError(CleanerError):
+    """The input file could not be opened or read"""
+
+
+class WriteError(CleanerError):
+    """An output file could not be written"""
+
+
+class MissingColumnsError(CleanerError):
+    """The sheet does not reach one or more of the rule columns"""
+    
+    title = "Missing Columns"
+    
+    def __init__(self, missing_columns, path=None, sheet_name=None):
+        self.missing_columns = list(missing_columns)
+        self.sheet_name = sheet_name
+        where = f" from sheet '{sheet_name}'" if sheet_name is not None else ""
+        super().__init__(
+            f"The following required columns are missing{where}:\n" + "\n".join(self.missing_columns), path
+        )
+
+
+class MissingSheetsError(CleanerError):
+    """One or more of the sheets asked for are not in the workbook"""
+    
+    title = "Missing Sheets"
+    
+    def __init__(self, missing_sheets, path=None):
+        self.missing_sheets = list(missing_sheets)
+        super().__init__(
+            "The following sheets are not in the workbook:\n" + "\n".join(self.missing_sheets), path
+        )
+
+
+class RulesError(CleanerError):
+    """A rules file could not be read or does not describe valid rules"""
+    
+    title = "Invalid Rules"
+
+
+class PatternMatcher:
+    """Case-insensitive substring matcher compiled once for a list of patterns"""
+    
+    # Patterns from which an Aho-Corasick automaton replaces the regex alternation. The
+    # regex tries every pattern at every position, so its cost grows with the list,
+    # while the automaton's does not; they break even at about 30 patterns
+    AUTOMATON_MIN_PATTERNS = 30
+    
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        # Searching lowered text for the lowered patterns is equivalent
+        # to "any(p.lower() in str(value).lower())"
+        lowered = list(dict.fromkeys(pattern.lower() for pattern in self.patterns))
+        self.regex = None
+        self.automaton = None
+        if len(lowered) >= self.AUTOMATON_MIN_PATTERNS:
+            self.automaton = Automaton(lowered)
+        elif lowered:
+            # A single alternation of the patterns
+            self.regex = re.compile("|".join(re.escape(pattern) for pattern in lowered))
+    
+    def matches(self, value):
+        """Check a single value (same result as ExcelCleaner.contains_pattern)"""
+        if (self.regex is None and self.automaton is None) or pd.isna(value):
+            return False
+        if self.automaton is not None:
+            return self.automaton.search(str(value).lower())
+        return self.regex.search(str(value).lower()) is not None
+    
+    def match_series(self, series):
+        """Check a whole column, returns a boolean Series (NaN never matches)
+        
+        The patterns are searched once per distinct value of the column and the
+        result is broadcast back to the rows through the factorized codes.
+        Counts of rows, distinct values and matched rows are left in self.stats.
+        """
+        if self.regex is None and self.automaton is None:
+            self.stats = {'rows': len(series), 'distinct': 0, 'matched': 0}
+            return pd.Series(False, index=series.index)
+        
+        codes, uniques, distinct = self.factorize(series)
+        # Missing text gets code -1, which picks the trailing False
+        hits = np.append(self.match_uniques(uniques), False)[codes] & series.notna().to_numpy()
+        
+        self.stats = {'rows': len(series), 'distinct': distinct, 'matched': int(hits.sum())}
+        return pd.Series(hits, index=series.index)
+    
+    @staticmethod
+    def factorize(series):
+        """(codes, distinct text, number of distinct values in use) of a column as match_series matches it
+        
+        The text is an object Series; missing cells get code -1.
+        """
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Compact frames: the categories are the distinct text already, matched without
+            # materializing the rows; unused categories (of rows removed before) are not counted
+            codes = series.cat.codes.to_numpy()
+            uniques = series.cat.categories
+            distinct = int(np.count_nonzero(np.bincount(codes[codes >= 0], minlength=len(uniques))))
+        elif isinstance(series.dtype, pd.StringDtype):
+            # Text columns (Arrow strings) are factorized as they are
+            codes, uniques = pd.factorize(series)
+            distinct = len(uniques)
+        elif isinstance(series.dtype, np.dtype) and series.dtype.kind == 'f':
+            # Whole numbers are the text of the int read from the cell (12, not 12.0), so a
+            # column made float by its blanks matches like one without, or a chunk of it
+            codes, numbers = pd.factorize(series)
+            uniques = [str(int(number)) if number.is_integer() else str(number)
+                       for number in numbers.astype(np.float64).tolist()]
+            distinct = len(uniques)
+        else:
+            # Going through object dtype makes every cell go through str() exactly
+            # like contains_pattern does (e.g. datetimes keep their time part). The
+            # distinct values are taken from that text so 1, 1.0 and True stay apart.
+            # Missing cells are left out, as factorize leaves them out of text columns
+            text = series.astype(object).astype(str).where(series.notna())
+            codes, uniques = pd.factorize(text)
+            distinct = len(uniques)
+        return codes, pd.Series(uniques, dtype=object), distinct
+    
+    def match_uniques(self, uniques):
+        """Hit flags (a bool array) of the distinct text of a column, an object Series from factorize"""
+        if self.regex is None and self.automaton is None:
+            return np.zeros(len(uniques), bool)
+        lowered = uniques.str.lower()
+        if self.automaton is not None:
+            return np.fromiter(map(self.automaton.search, lowered), bool, len(lowered))
+        return lowered.str.contains(self.regex.pattern, regex=True, na=False).to_numpy(dtype=bool)
+
+
+def match_kept_rows(matcher, column, keep, remaining):
+    """Match a rule on the rows of column still kept and clear the keep flags of those it hits
+    
+    remaining holds the positions of the kept rows, or None while every row is kept
+    (so the column is matched as it is, without a take). Returns the new remaining
+    and the matcher's stats plus the seconds the rule took.
+    """
+    started = time.perf_counter()
+    if remaining is None:
+        hits = matcher.match_series(column).to_numpy()
+        if hits.any():
+            keep &= ~hits
+            remaining = np.flatnonzero(keep)
+    else:
+        hits = matcher.match_series(column.take(remaining)).to_numpy()
+        keep[remaining[hits]] = False
+        remaining = remaining[~hits]
+    return remaining, dict(matcher.stats, seconds=time.perf_counter() - started)
+
+
+class ExcelCleaner:
+    """Handles Excel file cleaning operations"""
+    
+    # Column mappings (Excel column letters to 0-based indices)
+    COLUMNS = {
+        'Order': 'H',           # Column H (index 7)
+        'Buyer PO Number': 'I', # Column I (index 8)
+        'Comment': 'BO',        # Column BO (index 66)
+        'ShipmentID': 'BV'      # Column BV (index 73)
+    }
+    
+    # Patterns that cause a row to be removed, in the order the rules are applied
+    RULES = [
+        ('ShipmentID', ['FOC']),
+        ('Order', ['test', 'testing', 'M88', 'GB Test', 'GB Testing', 'GB']),
+        ('Buyer PO Number', ['test', 'testing', 'FOC']),
+        ('Comment', ['FOC', 'M88']),
+    ]
+    
+    # Rules whose column is found by its header text rather than a letter: {column name: header}.
+    # Their letters are added to COLUMNS from the first row of each file (set by rules files)
+    RULE_HEADERS = {}
+    
+    # Processing engines:
+    #   auto      - pandas when its estimated memory fits the memory budget, xml otherwise (default)
+    #   pandas    - load the whole sheet into a DataFrame
+    #   projected - decide from the rule columns only, then copy the kept <row> elements as they are
+    #   streaming - single pass over the rows in chunks, memory bounded by chunk_size
+    #   xml       - copy kept <row> elements of the sheet XML as-is, keeping the formatting
+    ENGINES = ('auto', 'pandas', 'projected', 'streaming', 'xml')
+    
+    # File formats read and written, by suffix (inputs with other suffixes are read as .xlsx).
+    # CSV and Parquet always go through the pandas engine, and are read and written many times faster
+    FILE_FORMATS = ('xlsx', 'csv', 'parquet')
+    
+    # Rows evaluated at once by the streaming engine
+    CHUNK_SIZE = 10000
+    
+    # Rows the pre-flight check parses to estimate the row count when the sheet declares none
+    PREFLIGHT_SAMPLE_ROWS = 200
+    
+    # Peak memory of loading one cell with pd.read_excel (measured about 80 bytes, plus headroom)
+    BYTES_PER_CELL = 100
+    
+    # Peak memory of reading one cell in compact mode, which packs the cells as they arrive
+    # (measured at 40% of pd.read_excel's peak on the benchmark workbook, plus headroom)
+    COMPACT_BYTES_PER_CELL = 40
+    
+    # Peak memory of pd.read_excel per byte of .xlsx, for sheets the pre-flight check cannot read
+    # (measured about 22, the ratio depends on how well the sheet compresses)
+    BYTES_PER_FILE_BYTE = 25
+    
+    # Distinct values of the rule columns from which match_workers > 1 matches them in
+    # worker processes. Matching takes about a microsecond per value, and starting the
+    # pool over half a second per process, so below it the pool only slows the run down
+    PARALLEL_MIN_VALUES = 1_000_000
+    
+    # Rows, spread over the frame, each rule is matched on to measure its hit rate for the evaluation plan
+    PLAN_SAMPLE_ROWS = 1000
+    
+    # Share of the available memory engine='auto' lets the pandas engine use, and the
+    # budget when the available memory cannot be measured (MB)
+    MEMORY_BUDGET_SHARE = 0.5
+    DEFAULT_MEMORY_BUDGET_MB = 1024
+    
+    # Removed rows preview() returns as a sample, with their rule cells
+    PREVIEW_SAMPLE_ROWS = 20
+
+    def __init__(self, input_file, progress_callback=None, save_deleted=False, engine='auto',
+                 chunk_size=CHUNK_SIZE, error_callback=None, raise_errors=False, cache=None,
+                 incremental=False, index_dir=None, event_callback=None, profile=None, save_report=False,
+                 memory_budget_mb=None, match_workers=1, sheets=None, sheet_workers=None, output_formats=None,
+                 frame_cache=None, rules_file=None, compact=False):
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of: {', '.join(self.ENGINES)}")
+        if sheets is not None and engine not in ('auto', 'pandas'):
+            raise ValueError(f"The {engine} engine cleans the first sheet only, use 'auto' or 'pandas' with sheets")
+        if sheets is not None and incremental:
+            raise ValueError("The incremental index covers the first sheet only, leave incremental off with sheets")
+        if sheets is not None and match_workers > 1:
+            raise ValueError("Several sheets are matched one sheet per process, "
+                             "use sheet_workers rather than match_workers with sheets")
+        self.input_file = Path(input_file)
+        self.input_format = self.input_file.suffix.lower().lstrip('.')
+        if self.input_format not in self.FILE_FORMATS:
+            self.input_format = 'xlsx'
+        # Formats of the CLEANED (and DELETED) outputs, the input's format by default
+        self.output_formats = tuple(output_formats) if output_formats else (self.input_format,)
+        for output_format in self.output_formats:
+            if output_format not in self.FILE_FORMATS:
+                raise ValueError(f"Unknown output format '{output_format}', "
+                                 f"expected one of: {', '.join(self.FILE_FORMATS)}")
+        if self.uses_columnar_files() and engine not in ('auto', 'pandas'):
+            raise ValueError(f"The {engine} engine reads and writes .xlsx files only, "
+                             f"use 'auto' or 'pandas' with CSV or Parquet files")
+        if sheets is not None and self.uses_columnar_files():
+            raise ValueError("Several sheets can only be cleaned from and into .xlsx files")
+        if 'parquet' in (self.input_format,) + self.output_formats and not parquet_available():
+            raise ValueError("Parquet files need the pyarrow package: pip install pyarrow")
+        self.rules_file = rules_file
+        if rules_file is not None:
+            # Raises RulesError, like the ValueErrors above, before anything is read
+            from rules_file import load_rules
+            self.COLUMNS, self.RULES, self.RULE_HEADERS = load_rules(rules_file)
+        self.df = None
+        self.rows_removed = 0
+        self.original_row_count = 0
+        self.remaining_row_count = 0
+        self.progress_callback = progress_callback
+        self.event_callback = event_callback
+        self.recorder = RunRecorder(self.handle_event, profile)
+        self.save_report = save_report
+        self.report_path = None
+        self.error_callback = error_callback
+        self.raise_errors = raise_errors
+        self.errors = []
+        self.cache = cache
+        self.cache_hit = False
+        self.frame_cache = frame_cache
+        self.frame_cache_hit = False
+        # Compact mode shrinks the loaded frame; memory_mb holds its size before and after
+        self.compact = compact
+        self.memory_mb = None
+        self.loaded_dtypes = {}
+        self.incremental = incremental
+        self.index_dir = index_dir
+        self.row_index = None
+        self.rows_reused = 0
+        self.save_deleted = save_deleted
+        self.engine = engine
+        self.chunk_size = chunk_size
+        self.keep_mask = None
+        self.deleted_output_path = None
+        self.rule_stats = {}
+        # Evaluation plan: rule positions in the order they are matched, made on the first frame
+        self.rule_order = None
+        self.rule_plan = []
+        self.rule_frame = None
+        self.column_count = 0
+        self.last_data_row = 0
+        self.estimated_rows = None
+        self.estimated_memory_mb = None
+        self.preflight_passed = False
+        self.memory_budget_mb = memory_budget_mb
+        self.match_workers = match_workers
+        self.engine_reason = None
+        # None cleans the first sheet; 'all' or a list of names writes a workbook of those sheets
+        self.sheets = sheets if sheets is None or sheets == 'all' else list(sheets)
+        self.sheet_workers = sheet_workers
+        self.sheet_stats = {}
+        self.sheet_estimates = {}
+        self.sheet_columns = {}
+    
+    def uses_columnar_files(self):
+        """True when the input or an output is CSV or Parquet rather than .xlsx"""
+        return self.input_format != 'xlsx' or self.output_formats != ('xlsx',)
+    
+    def handle_event(self, event):
+        """Pass a run event to event_callback, and its message (if any) to progress_callback"""
+        if self.event_callback:
+            self.event_callback(event)
+        if self.progress_callback and event.get('message'):
+            self.progress_callback(event['message'])
+    
+    def phase(self, name, message=None):
+        """Context manager timing a phase of the run, see RunRecorder.phase"""
+        return self.recorder.phase(name, message)
+    
+    def update_progress(self, message=None, **fields):
+        """Report progress within the current phase, optionally as done out of total"""
+        self.recorder.progress(message, **fields)
+    
+    def report_error(self, error):
+        """Record a CleanerError, pass it to error_callback and raise it if raise_errors is set"""
+        self.errors.append(error)
+        self.recorder.fail()
+        if self.error_callback:
+            self.error_callback(error.title, error.message)
+        if self.raise_errors:
+            raise error
+    
+    def read_error(self, exc):
+        """ReadError describing why the input file could not be read"""
+        if isinstance(exc, FileNotFoundError):
+            return ReadError(f"File not found: {self.input_file}", self.input_file)
+        if isinstance(exc, PermissionError):
+            return ReadError(f"Permission denied. File may be open in another program:\n{self.input_file}", self.input_file)
+        return ReadError(f"Failed to read {FORMAT_NAMES[self.input_format]} file:\n{str(exc)}", self.input_file)
+    
+    def write_error(self, exc, output_path, description):
+        """WriteError describing why an output file could not be saved"""
+        if isinstance(exc, PermissionError):
+            return WriteError(f"Cannot write to file. It may be open in another program:\n{output_path}", output_path)
+        return WriteError(f"Failed to save {description}:\n{str(exc)}", output_path)
+    
+    def column_letter_to_index(self, col_letter):
+        """Convert Excel column letter to 0-based index"""
+        col_letter = col_letter.upper()
+        result = 0
+        for char in col_letter:
+            result = result * 26 + (ord(char) - ord('A') + 1)
+        return result - 1
+    
+    def load_file(self):
+        """Load Excel file into pandas DataFrame"""
+        with self.phase('read', f"Loading {FORMAT_NAMES[self.input_format]} file...") as phase:
+            frame_key = None
+            if self.frame_cache is not None and self.input_format != 'parquet':
+                frame_key = self.frame_cache.key_for(self.input_file, options=self.read_options())
+                self.df = self.frame_cache.load(frame_key)
+            if self.df is not None:
+                self.frame_cache_hit = True
+                self.original_row_count = len(self.df)
+                phase.update(rows=self.original_row_count,
+                             message=f"Loaded {self.original_row_count} rows from the frame cache")
+                return True
+            
+            try:
+                self.df = self.read_input()
+            except Exception as e:
+                self.report_error(self.read_error(e))
+                return False
+            if frame_key is not None:
+                self.update_progress("Storing the rows in the frame cache...")
+                self.frame_cache.store(frame_key, self.df)
+            self.original_row_count = len(self.df)
+            phase.update(rows=self.original_row_count, bytes_read=self.input_file.stat().st_size,
+                         message=f"Loaded {self.original_row_count} rows")
+            return True
+    
+    def compact_frame(self):
+        """Replace the columns of self.df by their compact_column versions, measuring its memory
+        
+        Sets memory_mb to the frame's size before and after, and loaded_dtypes to the
+        types of the changed columns, which the CSV and Parquet outputs get back.
+        """
+        with self.phase('compact', "Compacting the loaded rows...") as phase:
+            before = after = 0
+            self.loaded_dtypes = {}
+            for position, (name, column) in enumerate(list(self.df.items())):
+                size = column.memory_usage(index=False, deep=True)
+                before += size
+                compact = compact_column(column)
+                if compact is column:
+                    after += size
+                    continue
+                after += compact.memory_usage(index=False, deep=True)
+                self.loaded_dtypes[name] = column.dtype
+                self.df.isetitem(position, compact)
+            self.memory_mb = {'loaded': before / (1 << 20), 'compact': after / (1 << 20)}
+            phase['message'] = (f"Compacted {len(self.loaded_dtypes)} of {len(self.df.columns)} columns: "
+                                f"{self.memory_mb['loaded']:.1f} MB to {self.memory_mb['compact']:.1f} MB")
+    
+    def compact_loaded(self):
+        """Compact self.df, or take the sizes and types read_compact_xlsx kept in its attrs
+        
+        Either way adds the peak resident memory of the process so far (None where
+        it cannot be measured) to memory_mb as 'peak_rss'.
+        """
+        compacted = self.df.attrs.get('compacted')
+        if compacted is None:
+            self.compact_frame()
+        else:
+            with self.phase('compact') as phase:
+                self.loaded_dtypes = {self.df.columns[position]: dtype
+                                      for position, dtype in compacted['loaded_dtypes']}
+                self.memory_mb = dict(compacted['memory_mb'])
+                phase['message'] = (f"Compacted {len(self.loaded_dtypes)} of {len(self.df.columns)} columns "
+                                    f"while reading: {self.memory_mb['loaded']:.1f} MB to "
+                                    f"{self.memory_mb['compact']:.1f} MB")
+        self.memory_mb['peak_rss'] = peak_rss_mb()
+    
+    def read_compact_xlsx(self, sheet_name=None):
+        """The first sheet (or sheet_name) of the .xlsx input as a compact frame, read row by row
+        
+        pd.read_excel holds every cell as a Python object before the frame exists, so
+        compacting it afterwards still peaks at the sheet's full size. Here the cells of
+        every chunk_size rows are packed per column as they arrive (pack_cells); then
+        each column in turn is typed exactly as read_excel types it (parse_cells) and
+        compacted, so only one column is ever held as Python objects.
+        
+        The frame's attrs keep its memory_mb and the loaded types of the compacted
+        columns, by position, for compact_loaded; the frame cache stores them along.
+        """
+        with XlsxPackage(self.input_file) as package:
+            names = [name for name, _ in package.sheets]
+            sheet = package.open_sheet(0 if sheet_name is None else names.index(sheet_name))
+            header = {}
+            pieces = {}
+            chunk = []
+            rows = 0
+            for row_number, row_xml in sheet.rows():
+                cells = sheet.read_row(row_xml)
+                if row_number == 1:
+                    header = cells
+                elif cells:
+                    # Positions below the header; rows without values in between stay empty
+                    chunk.append((row_number - 2, cells))
+                    rows = row_number - 1
+                    if len(chunk) == self.chunk_size:
+                        first, packed = pack_rows(chunk)
+                        for col_index, piece in packed.items():
+                            pieces.setdefault(col_index, []).append((first, piece))
+                        chunk = []
+                        self.update_progress(f"Read {rows} rows...",
+                                             done=sheet.position, total=sheet.size, unit='bytes')
+            if chunk:
+                first, packed = pack_rows(chunk)
+                for col_index, piece in packed.items():
+                    pieces.setdefault(col_index, []).append((first, piece))
+        
+        width = max([*header, *pieces], default=-1) + 1
+        if not width:
+            return pd.DataFrame()
+        # Header texts the way read_excel makes them ("Unnamed: 3", numbered duplicates)
+        header_row = [header.get(col_index, "") for col_index in range(width)]
+        columns = TextParser([header_row], header=0, skip_blank_lines=False).read().columns
+        
+        compact = []
+        loaded_dtypes = []
+        before = after = 0
+        for col_index, name in enumerate(columns):
+            column = parse_cells(pieces.pop(col_index, []), rows, name)
+            size = column.memory_usage(index=False, deep=True)
+            before += size
+            small = compact_column(column)
+            if small is column:
+                after += size
+            else:
+                after += small.memory_usage(index=False, deep=True)
+                loaded_dtypes.append([col_index, str(column.dtype)])
+            compact.append(small)
+        frame = pd.concat(compact, axis=1)
+        frame.columns = columns
+        frame.attrs['compacted'] = {'loaded_dtypes': loaded_dtypes,
+                                    'memory_mb': {'loaded': before / (1 << 20), 'compact': after / (1 << 20)}}
+        return frame
+    
+    def read_input(self, sheet_name=None):
+        """The input file (or sheet_name of it) as a DataFrame, read with the reader of its format
+        
+        CSV cells are read as text, so CSV outputs hold them exactly as they were
+        (leading zeros, number formats); empty and NA cells are missing either way.
+        """
+        if self.input_format == 'csv':
+            return pd.read_csv(self.input_file, **self.read_options())
+        if self.input_format == 'parquet':
+            return pd.read_parquet(self.input_file, **self.read_options())
+        if self.compact:
+            return self.read_compact_xlsx(sheet_name)
+        return pd.read_excel(self.input_file, sheet_name=0 if sheet_name is None else sheet_name,
+                             **self.read_options())
+    
+    def read_options(self):
+        """Keyword arguments of the reader read_input uses, part of the frame cache key
+        
+        Frames read with other options (e.g. CSV text as Arrow strings in compact mode)
+        are different frames, so they are cached apart.
+        """
+        if self.input_format == 'csv':
+            # Compact mode reads the text straight into Arrow strings rather than Python objects;
+            # utf-8-sig also reads the byte order mark Excel writes in front of CSV exports
+            return {'dtype': 'string[pyarrow]' if self.compact and pyarrow_available() else 'str',
+                    'encoding': 'utf-8-sig'}
+        if self.input_format == 'parquet':
+            return {}
+        if self.compact:
+            # read_compact_xlsx takes no options, this only keeps its frames apart
+            return {'reader': 'read_compact_xlsx'}
+        return {'engine': 'openpyxl'}
+    
+    def get_output_path(self, suffix):
+        """Output file next to the input, e.g. <name>_CLEANED.xlsx"""
+        return self.input_file.parent / (self.input_file.stem + suffix)
+    
+    def output_paths(self, kind):
+        """Output file of each output format for kind ('_CLEANED' or '_DELETED'), the first is the main one"""
+        return [self.get_output_path(f"{kind}.{output_format}") for output_format in self.output_formats]
+    
+    def validate_columns(self, column_count=None, sheet_name=None, columns=None):
+        """Verify that required columns exist (those of COLUMNS, or of columns when given)"""
+        with self.phase('validate', "Validating columns...") as phase:
+            if column_count is None:
+                column_count = len(self.df.columns)
+            required_indices = []
+            missing_columns = []
+            
+            for col_name, col_letter in (self.COLUMNS if columns is None else columns).items():
+                col_index = self.column_letter_to_index(col_letter)
+                required_indices.append(col_index)
+                
+                if col_index >= column_count:
+                    missing_columns.append(f"{col_name} (Column {col_letter})")
+            
+            if missing_columns:
+                self.report_error(MissingColumnsError(missing_columns, self.input_file, sheet_name))
+                return False
+            phase['message'] = "Column validation complete"
+            return True
+    
+    def read_header(self):
+        """Values of the input's first row (its header), read without loading the rows"""
+        if self.input_format == 'csv':
+            return list(pd.read_csv(self.input_file, nrows=0, encoding='utf-8-sig').columns)
+        if self.input_format == 'parquet':
+            import pyarrow.parquet
+            return pyarrow.parquet.read_schema(self.input_file).names
+        with XlsxPackage(self.input_file) as package:
+            return self.sheet_header(package)
+    
+    def sheet_header(self, package, index=0):
+        """Values of a sheet's first row, None for empty cells; a sheet without rows has no header"""
+        sheet = package.open_sheet(index)
+        rows = sheet.rows()
+        first = next(rows, None)
+        rows.close()
+        if first is None:
+            return []
+        row_number, row_xml = first
+        width = sheet.row_width(row_xml)
+        cells = sheet.read_cells(row_number, row_xml, range(width))
+        return [cells.get(position) for position in range(width)]
+    
+    def header_columns(self, header, sheet_name=None):
+        """COLUMNS plus the letter of every RULE_HEADERS rule, found by its header text in header
+        
+        Header text is compared without case and surrounding spaces, and the first
+        matching column wins. Reports a MissingColumnsError and returns None when a
+        header is not in the row.
+        """
+        positions = {}
+        for position, text in enumerate(header):
+            if text is not None:
+                positions.setdefault(str(text).strip().lower(), position)
+        
+        columns = dict(self.COLUMNS)
+        missing_columns = []
+        for col_name, text in self.RULE_HEADERS.items():
+            position = positions.get(str(text).strip().lower())
+            if position is None:
+                missing_columns.append(f"{col_name} (header '{text}')")
+            else:
+                columns[col_name] = index_to_column_letter(position)
+        if missing_columns:
+            self.report_error(MissingColumnsError(missing_columns, self.input_file, sheet_name))
+            return None
+        return columns
+    
+    def resolve_columns(self):
+        """Add the letters of the RULE_HEADERS rules to COLUMNS from the input's header row"""
+        with self.phase('validate', "Finding rule columns by header...") as phase:
+            try:
+                header = self.read_header()
+            except Exception as e:
+                self.report_error(self.read_error(e))
+                return False
+            columns = self.header_columns(header)
+            if columns is None:
+                return False
+            self.COLUMNS = columns
+            phase['message'] = "Found " + ", ".join(
+                f"{col_name} in column {columns[col_name]}" for col_name in self.RULE_HEADERS
+            )
+            return True
+    
+    def preflight(self):
+        """Check the required columns from the sheet's <dimension> and header row only
+        
+        Also estimates the row count and the memory the pandas engine needs
+        (estimated_rows, estimated_memory_mb). Reading only the start of the sheet
+        takes milliseconds; a package that cannot be read this way is left to the
+        engine, which reports its own error.
+        """
+        if self.preflight_passed:
+            return True
+        with self.phase('preflight', "Checking file...") as phase:
+            try:
+                if self.input_format == 'xlsx':
+                    with XlsxPackage(self.input_file) as package:
+                        column_count, rows, bytes_read = self.inspect_sheet(package)
+                else:
+                    column_count, rows, bytes_read = self.inspect_table()
+            except Exception:
+                phase['message'] = "Skipped file check"
+                return True
+            
+            if not self.validate_columns(column_count):
+                return False
+            
+            self.estimated_rows = rows
+            self.estimated_memory_mb = self.estimate_memory_mb(rows, column_count)
+            self.preflight_passed = True
+            phase.update(rows=self.estimated_rows, bytes_read=bytes_read,
+                         message=f"About {self.estimated_rows} rows, {self.estimated_memory_mb:.0f} MB in memory")
+            return True
+    
+    def inspect_sheet(self, package, index=0):
+        """(column count, estimated data rows, bytes read) of a sheet from its <dimension> and first rows
+        
+        A sheet without any rows has no columns.
+        """
+        sheet = package.open_sheet(index)
+        dimension = sheet.dimension()
+        rows = sheet.rows()
+        sample = list(itertools.islice(rows, self.PREFLIGHT_SAMPLE_ROWS))
+        rows.close()
+        if not sample:
+            return 0, 0, sheet.bytes_read
+        
+        column_count = dimension[1] if dimension else 0
+        if sample[0][0] == 1:
+            column_count = max(column_count, sheet.row_width(sample[0][1]))
+        
+        if len(sample) < self.PREFLIGHT_SAMPLE_ROWS:
+            estimated_rows = len(sample) - 1
+        elif dimension and dimension[0] > 1:
+            estimated_rows = dimension[0] - 1
+        else:
+            # No usable <dimension>: extrapolate from the bytes per row of the sample
+            estimated_rows = int(sheet.size * len(sample) / max(sheet.position, 1)) - 1
+        return column_count, estimated_rows, sheet.bytes_read
+    
+    def inspect_table(self):
+        """(column count, estimated data rows, bytes read) of a CSV or Parquet input, like inspect_sheet
+        
+        CSV rows are extrapolated from the bytes of the first lines; Parquet keeps the
+        counts in its footer (read with pyarrow).
+        """
+        if self.input_format == 'parquet':
+            import pyarrow.parquet
+            metadata = pyarrow.parquet.read_metadata(self.input_file)
+            return metadata.num_columns, metadata.num_rows, metadata.serialized_size
+        
+        with open(self.input_file, 'rb') as source:
+            sample = list(itertools.islice(source, self.PREFLIGHT_SAMPLE_ROWS))
+        if not sample:
+            return 0, 0, 0
+        sample_bytes = sum(len(line) for line in sample)
+        column_count = len(pd.read_csv(self.input_file, nrows=0, encoding='utf-8-sig').columns)
+        if len(sample) < self.PREFLIGHT_SAMPLE_ROWS:
+            estimated_rows = len(sample) - 1
+        else:
+            estimated_rows = int(self.input_file.stat().st_size * len(sample) / sample_bytes) - 1
+        return column_count, estimated_rows, sample_bytes
+    
+    def estimate_memory_mb(self, rows, column_count):
+        """Memory in MB the pandas engine needs to read a sheet of this size, compacted as it arrives with compact"""
+        bytes_per_cell = self.COMPACT_BYTES_PER_CELL if self.compact else self.BYTES_PER_CELL
+        return rows * column_count * bytes_per_cell / (1 << 20)
+    
+    def memory_budget(self):
+        """memory_budget_mb, or by default a share of the available memory (MB)"""
+        if self.memory_budget_mb is not None:
+            return self.memory_budget_mb
+        available = available_memory_mb()
+        return available * self.MEMORY_BUDGET_SHARE if available else self.DEFAULT_MEMORY_BUDGET_MB
+    
+    def choose_engine(self):
+        """Pick the engine for engine='auto' from the estimated memory and the memory budget
+        
+        Sets engine_reason; returns None when the pre-flight check rejects the file.
+        """
+        if not self.preflight():
+            return None
+        
+        if self.uses_columnar_files():
+            # The chunked engines only read and write .xlsx
+            self.engine_reason = "CSV and Parquet files are read and written by the pandas engine"
+            self.update_progress(f"Using the pandas engine: {self.engine_reason}")
+            return 'pandas'
+        
+        budget = self.memory_budget()
+        
+        if self.estimated_memory_mb is not None:
+            needed = self.estimated_memory_mb
+            chunked_engine = 'xml'
+        else:
+            # The sheet XML could not be inspected, so neither can the xml engine read it
+            try:
+                needed = self.input_file.stat().st_size * self.BYTES_PER_FILE_BYTE / (1 << 20)
+            except OSError:
+                return 'pandas'  # Missing or unreadable: the engine reports the read error
+            chunked_engine = 'streaming'
+        
+        if needed <= budget:
+            engine = 'pandas'
+            self.engine_reason = f"about {needed:.0f} MB needed, within the {budget:.0f} MB memory budget"
+        else:
+            engine = chunked_engine
+            self.engine_reason = (f"about {needed:.0f} MB needed in memory, over the {budget:.0f} MB "
+                                  f"memory budget, so rows are processed in chunks")
+        self.update_progress(f"Using the {engine} engine: {self.engine_reason}")
+        return engine
+    
+    def contains_pattern(self, value, patterns):
+        """Check if value contains any of the patterns (case-insensitive substring match)"""
+        if pd.isna(value):
+            return False
+        
+        value_str = str(value).lower()
+        for pattern in patterns:
+            if pattern.lower() in value_str:
+                return True
+        return False
+    
+    def rule_names(self):
+        """Name of each rule in RULES, which keys its rule_stats: its column name, numbered
+        from the second rule on the same column on ("Order #2"), so every rule counts apart"""
+        seen = {}
+        names = []
+        for col_name, _ in self.RULES:
+            seen[col_name] = seen.get(col_name, 0) + 1
+            names.append(col_name if seen[col_name] == 1 else f"{col_name} #{seen[col_name]}")
+        return names
+    
+    def compile_rules(self):
+        """Build one matcher per rule as (rule name, column index, matcher) tuples, see rule_names"""
+        return [
+            (name, self.column_letter_to_index(self.COLUMNS[col_name]), PatternMatcher(patterns))
+            for name, (col_name, patterns) in zip(self.rule_names(), self.RULES)
+        ]
+    
+    def evaluate_rules(self, frame, column_positions=None, rules=None):
+        """Return the keep mask (True = keep, False = remove) for the rows of frame
+        
+        column_positions maps a sheet column index to its position in frame; by
+        default frame holds the whole sheet and columns are found by index.
+        Passing precompiled rules (for chunk after chunk) skips the per-column progress messages.
+        """
+        if column_positions is None:
+            column_positions = {idx: idx for idx in range(len(frame.columns))}
+        
+        report_progress = rules is None
+        if rules is None:
+            rules = self.compile_rules()
+        
+        with self.phase('match') as phase:
+            phase['rows'] = len(frame)
+            if self.row_index is not None:
+                return self.evaluate_incremental(frame, column_positions, rules, report_progress)
+            return self.match_rules(frame, column_positions, rules, report_progress)
+    
+    def plan_rules(self, frame, column_positions, rules):
+        """The rules in evaluation order: the highest hit rate on a sample of frame first
+        
+        Every rule only looks at the rows the rules before it kept, so the rules
+        removing the most rows go first and leave the fewest rows to the others.
+        The order is measured on the first frame with rows and kept for the run
+        (chunk after chunk); rules with equal rates keep their order in RULES.
+        """
+        if self.rule_order is None or len(self.rule_order) != len(rules):
+            step = max(len(frame) // self.PLAN_SAMPLE_ROWS, 1)
+            sample = frame.iloc[::step].iloc[:self.PLAN_SAMPLE_ROWS]
+            if not len(sample):
+                return rules  # Nothing to measure the rules on yet
+            rates = []
+            for col_name, col_idx, matcher in rules:
+                hits = 0
+                if col_idx in column_positions:
+                    hits = int(matcher.match_series(sample.iloc[:, column_positions[col_idx]]).sum())
+                rates.append(hits / len(sample))
+            self.rule_order = sorted(range(len(rules)), key=lambda position: -rates[position])
+            self.rule_plan = [{'rule': rules[position][0], 'sample_hit_rate': rates[position]}
+                              for position in self.rule_order]
+        return [rules[position] for position in self.rule_order]
+    
+    def match_rules(self, frame, column_positions, rules, report_progress=False):
+        """Keep mask of frame from matching the rules in plan order, each on the rows still kept
+        
+        Rather than matching every rule on the whole column and combining the masks,
+        a rule only sees the rows the rules before it kept. rule_stats count per rule
+        the rows it looked at, their distinct values, the rows it removed and its seconds.
+        """
+        rules = self.plan_rules(frame, column_positions, rules)
+        # A rule column never has more distinct values than rows
+        if self.match_workers > 1 and len(frame) * len(rules) >= self.PARALLEL_MIN_VALUES:
+            return self.match_rules_parallel(frame, column_positions, rules)
+        
+        keep = np.ones(len(frame), bool)
+        remaining = None
+        
+        # Each rule removes rows whose cell contains any of its patterns
+        for done, (col_name, col_idx, matcher) in enumerate(rules):
+            if report_progress:
+                self.update_progress(f"Cleaning {col_name} column...", done=done, total=len(rules), unit='rules')
+            if col_idx in column_positions:
+                remaining, stats = match_kept_rows(matcher, frame.iloc[:, column_positions[col_idx]], keep, remaining)
+                self.add_rule_stats(col_name, stats)
+        return pd.Series(keep, index=frame.index)
+    
+    def match_rules_parallel(self, frame, column_positions, rules):
+        """match_rules with the distinct values of the rule columns matched by match_workers processes
+        
+        See parallel_match; columns with fewer than PARALLEL_MIN_VALUES distinct values
+        in all are matched in this process. The seconds of each rule are summed over the processes.
+        """
+        from parallel_match import match_parallel
+        
+        self.update_progress(f"Cleaning rows in {self.match_workers} processes...")
+        keep, rule_stats = match_parallel(
+            frame, column_positions, rules, self.match_workers, self.PARALLEL_MIN_VALUES,
+            lambda done, total: self.update_progress(done=done, total=total, unit='values')
+        )
+        for col_name, counts in rule_stats:
+            self.add_rule_stats(col_name, counts)
+        return pd.Series(keep, index=frame.index)
+    
+    def add_rule_stats(self, col_name, counts):
+        """Add the counts of a rule on one frame, chunk or sheet to rule_stats"""
+        stats = self.rule_stats.setdefault(col_name, dict.fromkeys(counts, 0))
+        for key, count in counts.items():
+            stats[key] = stats.get(key, 0) + count
+    
+    def evaluate_incremental(self, frame, column_positions, rules, report_progress=False):
+        """Keep mask of frame, taking the decisions of rows seen before from row_index
+        
+        Only rows whose rule cells are new to the index are matched; their decisions
+        are added to it. rule_stats therefore only count the matched rows.
+        """
+        rule_positions = sorted({column_positions[col_idx] for _, col_idx, _ in rules if col_idx in column_positions})
+        fingerprints = row_fingerprints(frame, rule_positions)
+        known, keep = self.row_index.lookup(fingerprints)
+        
+        new_rows = np.flatnonzero(~known)
+        self.rows_reused += len(fingerprints) - len(new_rows)
+        if len(new_rows):
+            # Match the new rows on a frame of just their rule cells
+            new_frame = frame.iloc[new_rows, rule_positions]
+            new_positions = {col_idx: rule_positions.index(position)
+                             for col_idx, position in column_positions.items() if position in rule_positions}
+            new_keep = self.match_rules(new_frame, new_positions, rules, report_progress).to_numpy()
+            keep[new_rows] = new_keep
+            self.row_index.add(fingerprints[new_rows], new_keep)
+        return pd.Series(keep, index=frame.index)
+    
+    def describe_rule_stats(self):
+        """One line per rule column in evaluation order: rows checked, distinct values, rows removed, time
+        
+        Chunked engines factorize each chunk separately, so their distinct counts add up per chunk.
+        """
+        lines = []
+        for col_name, stats in self.rule_stats.items():
+            rows = stats['rows'] or 1
+            lines.append(
+                f"{col_name}: {stats['rows']} rows, {stats['distinct']} distinct values "
+                f"({stats['distinct'] / rows:.1%}), {stats['matched']} rows removed ({stats['matched'] / rows:.1%}), "
+                f"{stats.get('seconds', 0):.3f}s"
+            )
+        return lines
+    
+    def clean_data(self):
+        """Apply all cleaning rules and mark the rows to remove
+        
+        self.df keeps every row; keep_mask selects the cleaned ones and its inverse the
+        deleted ones, so neither set is copied out of the frame.
+        """
+        keep_mask = self.evaluate_rules(self.df)
+        
+        self.update_progress("Applying filters...")
+        self.keep_mask = keep_mask.to_numpy()
+        
+        self.remaining_row_count = int(self.keep_mask.sum())
+        self.rows_removed = len(self.df) - self.remaining_row_count
+        self.update_progress(f"Removed {self.rows_removed} rows")
+    
+    def new_output_sheet(self, header, workbook=None, title='Sheet1'):
+        """Write-only sheet whose first row is header, in workbook or a new one; returns (workbook, sheet)"""
+        if workbook is None:
+            workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet(title)
+        self.append_header(sheet, header)
+        return workbook, sheet
+    
+    def append_header(self, sheet, header):
+        """Append header to a write-only sheet, styled like pandas' to_excel header"""
+        cells = []
+        for name in header:
+            cell = WriteOnlyCell(sheet, value=name)
+            cell.font = HEADER_FONT
+            cell.border = HEADER_BORDER
+            cell.alignment = HEADER_ALIGNMENT
+            cells.append(cell)
+        sheet.append(cells)
+    
+    def save_workbooks(self, workbooks):
+        """Save {path: workbook} at the same time, one thread each
+        
+        Write-only workbooks have serialized their rows already; saving compresses
+        them into the .xlsx, which releases the GIL so the files overlap.
+        """
+        if len(workbooks) == 1:
+            for path, workbook in workbooks.items():
+                workbook.save(path)
+            return
+        with ThreadPoolExecutor(max_workers=len(workbooks)) as executor:
+            futures = [executor.submit(workbook.save, path) for path, workbook in workbooks.items()]
+            for future in futures:
+                future.result()
+    
+    def write_outputs(self, selections):
+        """Write the rows of self.df to several files in a single pass over the frame
+        
+        selections maps an output path to the boolean array of the rows it receives.
+        CSV and Parquet paths are written by pandas' own writers, the .xlsx ones together.
+        """
+        columnar = {path: selection for path, selection in selections.items()
+                    if Path(path).suffix in ('.csv', '.parquet')}
+        for path, selection in columnar.items():
+            self.update_progress(f"Saving {Path(path).name}...")
+            # Back to the types the rows were loaded with, so compact mode writes the same files
+            rows = self.df[selection].astype(self.loaded_dtypes) if self.loaded_dtypes else self.df[selection]
+            if Path(path).suffix == '.csv':
+                rows.to_csv(path, index=False)
+            else:
+                parquet_frame(rows).to_parquet(path, index=False)
+        
+        header = list(self.df.columns)
+        sheets = {path: self.new_output_sheet(header) for path in selections if path not in columnar}
+        if sheets:
+            self.append_rows(self.df, [(sheets[path][1], selections[path]) for path in sheets])
+            self.save_workbooks({path: workbook for path, (workbook, _) in sheets.items()})
+    
+    def append_rows(self, frame, targets, report_progress=True):
+        """Append the rows of frame to write-only sheets in a single pass over the frame
+        
+        targets are (sheet, boolean array of the rows it receives) pairs.
+        """
+        for start in range(0, len(frame), self.chunk_size):
+            block = frame.iloc[start:start + self.chunk_size]
+            # NaN/NaT become empty cells, as with to_excel
+            rows = block.astype(object).where(block.notna(), None).to_numpy().tolist()
+            for sheet, selection in targets:
+                for row in itertools.compress(rows, selection[start:start + self.chunk_size]):
+                    sheet.append(row)
+            if report_progress:
+                self.update_progress(done=start + len(rows), total=len(frame), unit='rows')
+    
+    def record_written(self, phase, paths, rows):
+        """Set the rows and bytes written by a write phase"""
+        phase['rows'] = rows
+        phase['bytes_written'] = sum(Path(path).stat().st_size for path in paths)
+    
+    def row_selection(self, keep):
+        """Boolean array of the rows of self.df kept (or removed) by clean_data"""
+        if self.keep_mask is None:
+            return np.full(len(self.df), keep)
+        return self.keep_mask if keep else ~self.keep_mask
+    
+    def save_outputs(self):
+        """Write the cleaned file and, with save_deleted, the deleted rows file in one stage (in every output format)"""
+        output_paths = self.output_paths("_CLEANED")
+        deleted_paths = self.output_paths("_DELETED")
+        output_path = output_paths[0]
+        deleted_path = deleted_paths[0]
+        selections = {path: self.row_selection(True) for path in output_paths}
+        if self.save_deleted and self.rows_removed:
+            selections.update((path, self.row_selection(False)) for path in deleted_paths)
+        
+        if deleted_path in selections:
+            message = "Saving cleaned and deleted rows files..."
+        else:
+            message = "Saving cleaned file..."
+        with self.phase('write', message) as phase:
+            try:
+                self.write_outputs(selections)
+            except Exception as e:
+                self.report_error(self.write_error(e, output_path, "cleaned file"))
+                return None
+            
+            if deleted_path in selections:
+                self.deleted_output_path = deleted_path
+            self.record_written(phase, selections, sum(int(selection.sum()) for selection in selections.values()))
+            phase['message'] = "File saved successfully!"
+            return output_path
+    
+    def save_cleaned_file(self):
+        """Save cleaned data to a new Excel file (and/or the other output formats)"""
+        output_paths = self.output_paths("_CLEANED")
+        output_path = output_paths[0]
+        
+        with self.phase('write', "Saving cleaned file...") as phase:
+            try:
+                self.write_outputs({path: self.row_selection(True) for path in output_paths})
+            except Exception as e:
+                self.report_error(self.write_error(e, output_path, "cleaned file"))
+                return None
+            self.record_written(phase, output_paths, self.remaining_row_count * len(output_paths))
+            phase['message'] = "File saved successfully!"
+            return output_path
+    
+    def save_deleted_file(self):
+        """Save deleted rows to a separate Excel file"""
+        if self.deleted_output_path is not None:
+            # Already written together with the cleaned file
+            return self.deleted_output_path
+        
+        if self.df is None or self.keep_mask is None or self.keep_mask.all():
+            return None
+        
+        output_paths = self.output_paths("_DELETED")
+        output_path = output_paths[0]
+        
+        with self.phase('write', "Saving deleted rows file...") as phase:
+            try:
+                self.write_outputs({path: self.row_selection(False) for path in output_paths})
+            except Exception as e:
+                self.report_error(self.write_error(e, output_path, "deleted rows file"))
+                return None
+            self.deleted_output_path = output_path
+            self.record_written(phase, output_paths, self.rows_removed * len(output_paths))
+            phase['message'] = "Deleted rows file saved!"
+            return output_path
+    
+    def build_rule_frame(self, records, rule_indices, index=None):
+        """DataFrame of the rule columns from {column index: value} dicts, NA strings as NaN
+        
+        The columns hold the cells as read (object dtype), so each cell is matched as the
+        text of its own value, whatever the other cells of its chunk are.
+        """
+        rule_frame = pd.DataFrame([[record.get(col_idx) for col_idx in rule_indices] for record in records],
+                                  index=index, columns=rule_indices, dtype=object)
+        return rule_frame.mask(rule_frame.isin(list(NA_STRINGS)))
+    
+    def load_rule_columns(self):
+        """Read only the rule columns straight from the sheet XML (projected engine, phase 1)"""
+        rule_indices = sorted({self.column_letter_to_index(letter) for letter in self.COLUMNS.values()})
+        
+        with self.phase('read', "Reading rule columns...") as phase:
+            try:
+                with XlsxPackage(self.input_file) as package:
+                    sheet = package.open_sheet()
+                    dimension = sheet.dimension()
+                    column_count = dimension[1] if dimension else 0
+                    last_data_row = 1
+                    row_numbers = []
+                    records = []
+                    
+                    for row_number, row_xml in sheet.rows():
+                        if row_number % self.chunk_size == 0:
+                            self.update_progress(done=sheet.position, total=sheet.size, unit='bytes')
+                        if row_number == 1:
+                            column_count = max(column_count, sheet.row_width(row_xml))
+                            continue
+                        if not sheet.has_values(row_xml):
+                            continue
+                        last_data_row = row_number
+                        cells = sheet.read_cells(row_number, row_xml, rule_indices)
+                        if cells:
+                            column_count = max(column_count, max(cells) + 1)
+                            row_numbers.append(row_number)
+                            records.append(cells)
+            except Exception as e:
+                self.report_error(self.read_error(e))
+                return False
+            
+            # Rule columns only, indexed by Excel row number, with a row (NaN where empty) for every
+            # data row like the pandas engine's frame, so the rules count the same rows
+            self.rule_frame = self.build_rule_frame(records, rule_indices, row_numbers).reindex(
+                range(2, last_data_row + 1))
+            self.column_count = column_count
+            self.last_data_row = last_data_row
+            self.original_row_count = last_data_row - 1
+            phase.update(rows=self.original_row_count, bytes_read=self.input_file.stat().st_size,
+                         message=f"Loaded {self.original_row_count} rows")
+            return True
+    
+    def copy_rows(self, removed_rows):
+        """Copy kept rows to the cleaned file, and removed ones to the deleted file (projected engine, phase 2)
+        
+        The <row> elements are copied as they are with FilteredCopyWriter, like the xml
+        engine does, so no cell is decoded or rebuilt on this pass either.
+        """
+        output_path = self.get_output_path("_CLEANED.xlsx")
+        deleted_path = self.get_output_path("_DELETED.xlsx")
+        write_deleted = self.save_deleted and len(removed_rows) > 0
+        
+        with self.phase('write', "Saving cleaned file...") as phase:
+            writers = []
+            try:
+                with XlsxPackage(self.input_file) as package:
+                    sheet = package.open_sheet()
+                    rows = sheet.rows()
+                    header = next(rows, None)
+                    cleaned = FilteredCopyWriter(package, sheet, output_path)
+                    writers.append(cleaned)
+                    deleted = None
+                    if write_deleted:
+                        deleted = FilteredCopyWriter(package, sheet, deleted_path)
+                        writers.append(deleted)
+                    
+                    if header is not None:
+                        rows = itertools.chain([header], rows)
+                    for row_number, row_xml in rows:
+                        if row_number % self.chunk_size == 0:
+                            self.update_progress(done=sheet.position, total=sheet.size, unit='bytes')
+                        if row_number == 1:
+                            for writer in writers:
+                                writer.write_row(row_number, row_xml)
+                        elif row_number not in removed_rows:
+                            cleaned.write_row(row_number, row_xml)
+                            if deleted is not None:
+                                deleted.drop_row(row_number)
+                        else:
+                            cleaned.drop_row(row_number)
+                            if deleted is not None:
+                                deleted.write_row(row_number, row_xml)
+                    for writer in writers:
+                        writer.close()
+                if write_deleted:
+                    self.deleted_output_path = deleted_path
+            except Exception as e:
+                for writer in writers:
+                    writer.abort()
+                self.report_error(self.write_error(e, output_path, "cleaned file"))
+                return None
+            
+            # The second pass reads the whole sheet again
+            phase['bytes_read'] = self.input_file.stat().st_size
+            self.record_written(phase, [writer.path for writer in writers],
+                                self.original_row_count if write_deleted else self.remaining_row_count)
+            phase['message'] = "File saved successfully!"
+            return output_path
+    
+    def process_projected(self):
+        """Two-phase pipeline: decide from the four rule columns, then copy the kept rows' XML without parsing their cells"""
+        if not self.preflight():
+            return None
+        
+        if not self.load_rule_columns():
+            return None
+        
+        if not self.validate_columns(self.column_count):
+            return None
+        
+        positions = {col_idx: pos for pos, col_idx in enumerate(self.rule_frame.columns)
+                     if col_idx < self.column_count}
+        keep_mask = self.evaluate_rules(self.rule_frame, positions)
+        removed_rows = set(self.rule_frame.index[~keep_mask])
+        self.rule_frame = None
+        
+        self.rows_removed = len(removed_rows)
+        self.remaining_row_count = self.original_row_count - self.rows_removed
+        self.update_progress(f"Removed {self.rows_removed} rows")
+        
+        return self.copy_rows(removed_rows)
+    
+    def iter_chunks(self, rows):
+        """Group row tuples into lists of at most chunk_size rows
+        
+        Blank rows are kept in place, except trailing ones which pandas drops as well.
+        """
+        chunk = []
+        pending_blank_rows = 0
+        for row in rows:
+            if all(value is None or value == '' for value in row):
+                pending_blank_rows += 1
+                continue
+            chunk.extend([()] * pending_blank_rows)
+            pending_blank_rows = 0
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    
+    def evaluate_chunk(self, rows, rules):
+        """Keep flags for a list of row tuples, looking only at the rule columns"""
+        rule_indices = sorted({col_idx for _, col_idx, _ in rules})
+        # Object columns, as in build_rule_frame: every cell matches as the text of its own value
+        frame = pd.DataFrame({
+            col_idx: [normalize_cell(row[col_idx]) if col_idx < len(row) else None for row in rows]
+            for col_idx in rule_indices
+        }, dtype=object)
+        positions = {col_idx: pos for pos, col_idx in enumerate(rule_indices)}
+        return self.evaluate_rules(frame, positions, rules).values
+    
+    def process_streaming(self):
+        """Single-pass pipeline: read rows, evaluate them chunk by chunk and route them to the outputs"""
+        output_path = self.get_output_path("_CLEANED.xlsx")
+        deleted_path = self.get_output_path("_DELETED.xlsx")
+        
+        try:
+            with self.phase('open', "Opening Excel file..."):
+                source = load_workbook(self.input_file, read_only=True, data_only=True)
+        except Exception as e:
+            self.report_error(self.read_error(e))
+            return None
+        
+        try:
+            sheet = source.worksheets[0]
+            declared_columns = sheet.max_column or 0
+            # Data rows per the sheet's dimension, only an estimate for the progress bar
+            declared_rows = max((sheet.max_row or 0) - 1, 0) or None
+            sheet.reset_dimensions()
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, ())
+            
+            header_width = len(header)
+            while header_width and header[header_width - 1] in (None, ''):
+                header_width -= 1
+            if not self.validate_columns(max(declared_columns, header_width)):
+                return None
+            
+            rules = self.compile_rules()
+            cleaned = Workbook(write_only=True)
+            cleaned_sheet = cleaned.create_sheet(sheet.title)
+            cleaned_sheet.append(header)
+            deleted = None
+            
+            with self.phase('clean', "Cleaning rows...") as phase:
+                for chunk in self.iter_chunks(rows):
+                    keep_flags = self.evaluate_chunk(chunk, rules)
+                    for row, keep in zip(chunk, keep_flags):
+                        if keep:
+                            cleaned_sheet.append(row)
+                            continue
+                        self.rows_removed += 1
+                        if self.save_deleted:
+                            if deleted is None:
+                                deleted = Workbook(write_only=True)
+                                deleted_sheet = deleted.create_sheet(sheet.title)
+                                deleted_sheet.append(header)
+                            deleted_sheet.append(row)
+                    self.original_row_count += len(chunk)
+                    self.update_progress(f"Processed {self.original_row_count} rows...",
+                                         done=self.original_row_count, total=declared_rows, unit='rows')
+                phase.update(rows=self.original_row_count, bytes_read=self.input_file.stat().st_size)
+        except Exception as e:
+            self.report_error(self.read_error(e))
+            return None
+        finally:
+            source.close()
+        
+        self.remaining_row_count = self.original_row_count - self.rows_removed
+        self.update_progress(f"Removed {self.rows_removed} rows")
+        
+        with self.phase('write', "Saving cleaned file...") as phase:
+            try:
+                workbooks = {output_path: cleaned}
+                if deleted is not None:
+                    workbooks[deleted_path] = deleted
+                self.save_workbooks(workbooks)
+                if deleted is not None:
+                    self.deleted_output_path = deleted_path
+            except Exception as e:
+                self.report_error(self.write_error(e, output_path, "cleaned file"))
+                return None
+            self.record_written(phase, workbooks, self.original_row_count if deleted is not None else self.remaining_row_count)
+            phase['message'] = "File saved successfully!"
+            return output_path
+    
+    def iter_xml_chunks(self, sheet, rows, rule_indices):
+        """Group raw rows into (rows, rule column records) chunks of at most chunk_size rows"""
+        self.last_data_row = 1
+        chunk = []
+        records = []
+        for row_number, row_xml in rows:
+            cells = {}
+            if sheet.has_values(row_xml):
+                self.last_data_row = row_number
+                cells = sheet.read_cells(row_number, row_xml, rule_indices)
+            chunk.append((row_number, row_xml))
+            records.append(cells)
+            if len(chunk) >= self.chunk_size:
+                yield chunk, records
+                chunk = []
+                records = []
+        if chunk:
+            yield chunk, records
+    
+    def process_xml(self):
+        """Row filter on the raw sheet XML: kept rows are copied byte for byte with their formatting"""
+        output_path = self.get_output_path("_CLEANED.xlsx")
+        deleted_path = self.get_output_path("_DELETED.xlsx")
+        rule_indices = sorted({self.column_letter_to_index(letter) for letter in self.COLUMNS.values()})
+        
+        try:
+            with self.phase('open', "Opening Excel file..."):
+                package = XlsxPackage(self.input_file)
+        except Exception as e:
+            self.report_error(self.read_error(e))
+            return None
+        
+        writers = []
+        try:
+            with package:
+                sheet = package.open_sheet()
+                dimension = sheet.dimension()
+                rows = sheet.rows()
+                header = next(rows, None)
+                
+                column_count = dimension[1] if dimension else 0
+                if header is not None and header[0] == 1:
+                    column_count = max(column_count, sheet.row_width(header[1]))
+                if not self.validate_columns(column_count):
+                    return None
+                
+                cleaned = FilteredCopyWriter(package, sheet, output_path)
+                writers.append(cleaned)
+                deleted = None
+                if self.save_deleted:
+                    deleted = FilteredCopyWriter(package, sheet, deleted_path)
+                    writers.append(deleted)
+                
+                rules = self.compile_rules()
+                positions = {col_idx: pos for pos, col_idx in enumerate(rule_indices)}
+                
+                with self.phase('clean', "Cleaning rows...") as phase:
+                    if header is not None:
+                        if header[0] == 1:
+                            for writer in writers:
+                                writer.write_row(*header)
+                        else:
+                            # No header row: the first row element already holds data
+                            rows = itertools.chain([header], rows)
+                    
+                    for chunk, records in self.iter_xml_chunks(sheet, rows, rule_indices):
+                        keep_mask = self.evaluate_rules(self.build_rule_frame(records, rule_indices), positions, rules)
+                        for (row_number, row_xml), keep in zip(chunk, keep_mask.values):
+                            if keep:
+                                cleaned.write_row(row_number, row_xml)
+                                if deleted is not None:
+                                    deleted.drop_row(row_number)
+                            else:
+                                cleaned.drop_row(row_number)
+                                if deleted is not None:
+                                    deleted.write_row(row_number, row_xml)
+                        self.update_progress(f"Processed {self.last_data_row - 1} rows...",
+                                             done=sheet.position, total=sheet.size, unit='bytes')
+                    
+                    for writer in writers:
+                        writer.close()
+                    # Rows are copied while they are read, so the pass both reads and writes
+                    phase.update(rows=self.last_data_row - 1, bytes_read=self.input_file.stat().st_size,
+                                 bytes_written=sum(writer.path.stat().st_size for writer in writers))
+        except PermissionError as e:
+            for writer in writers:
+                writer.abort()
+            self.report_error(self.write_error(e, output_path, "cleaned file"))
+            return None
+        except Exception as e:
+            for writer in writers:
+                writer.abort()
+            self.report_error(CleanerError(f"Failed to clean Excel file:\n{str(e)}", self.input_file))
+            return None
+        
+        self.original_row_count = self.last_data_row - 1
+        self.rows_removed = cleaned.rows_dropped
+        self.remaining_row_count = self.original_row_count - self.rows_removed
+        self.update_progress(f"Removed {self.rows_removed} rows")
+        
+        if deleted is not None:
+            if deleted.rows_written > 1:
+                self.deleted_output_path = deleted_path
+            else:
+                deleted_path.unlink(missing_ok=True)
+        self.update_progress("File saved successfully!")
+        return output_path
+    
+    def process_pandas(self):
+        """Whole-sheet pipeline: load into a DataFrame, filter it and write the outputs"""
+        if not self.preflight():
+            return None
+        
+        if not self.load_file():
+            return None
+        
+        if not self.validate_columns():
+            return None
+        
+        if self.compact:
+            self.compact_loaded()
+        self.clean_data()
+        return self.save_outputs()
+    
+    def select_sheets(self):
+        """Names of the sheets to clean in workbook order, each checked the way preflight checks the first sheet
+        
+        Sets estimated_rows and estimated_memory_mb to the totals of the sheets and
+        sheet_estimates to the memory of each, and sheet_columns to the rule columns of
+        each sheet when rules name their column by header. Returns None when a sheet
+        asked for is not in the workbook or lacks the rule columns; sheets without rows are kept.
+        """
+        with self.phase('preflight', "Checking sheets...") as phase:
+            inspected = {}
+            headers = {}
+            try:
+                with XlsxPackage(self.input_file) as package:
+                    names = [name for name, _ in package.sheets]
+                    for index, name in enumerate(names):
+                        if self.sheets != 'all' and name not in self.sheets:
+                            continue
+                        try:
+                            inspected[name] = self.inspect_sheet(package, index)
+                            if self.RULE_HEADERS:
+                                headers[name] = self.sheet_header(package, index)
+                        except Exception:
+                            inspected[name] = None  # Validated once read
+            except Exception as e:
+                self.report_error(self.read_error(e))
+                return None
+            
+            if self.sheets != 'all':
+                missing = [name for name in self.sheets if name not in names]
+                if missing:
+                    self.report_error(MissingSheetsError(missing, self.input_file))
+                    return None
+            
+            self.estimated_rows = 0
+            self.sheet_estimates = {}
+            self.sheet_columns = {}
+            for name, found in inspected.items():
+                if found is None:
+                    if self.RULE_HEADERS:
+                        self.report_error(ReadError(f"Cannot read the header row of sheet '{name}'", self.input_file))
+                        return None
+                    continue
+                column_count, rows, _ = found
+                if column_count and self.RULE_HEADERS:
+                    self.sheet_columns[name] = self.header_columns(headers[name], name)
+                    if self.sheet_columns[name] is None:
+                        return None
+                if column_count and not self.validate_columns(column_count, name, self.sheet_columns.get(name)):
+                    return None
+                self.estimated_rows += rows
+                self.sheet_estimates[name] = self.estimate_memory_mb(rows, column_count)
+            self.estimated_memory_mb = sum(self.sheet_estimates.values())
+            self.preflight_passed = True
+            phase.update(rows=self.estimated_rows,
+                         message=f"{len(inspected)} sheets, about {self.estimated_rows} rows, "
+                                 f"{self.estimated_memory_mb:.0f} MB in memory")
+            return list(inspected)
+    
+    def sheet_worker_count(self, sheet_count):
+        """Processes cleaning sheets at once: sheet_workers, or as many as the CPUs and the memory budget allow"""
+        workers = self.sheet_workers
+        if workers is None:
+            workers = os.cpu_count() or 1
+            largest = max(self.sheet_estimates.values(), default=0)
+            if largest:
+                workers = min(workers, int(self.memory_budget() // largest))
+        return max(1, min(workers, sheet_count))
+    
+    def process_sheets(self):
+        """Multi-sheet pipeline: read and filter the sheets concurrently into one workbook of each kind
+        
+        Every sheet is read and matched by clean_sheet, in worker processes when more
+        than one sheet fits at a time. The rows of each finished sheet are appended to its
+        sheet of the CLEANED (and DELETED) workbook right away, so only the sheets in
+        flight are held in memory; the workbooks keep the order of the input's sheets.
+        """
+        names = self.select_sheets()
+        if names is None:
+            return None
+        # Every sheet is loaded whole, the memory budget only limits how many at once
+        budget = self.memory_budget()
+        over = [name for name in names if self.sheet_estimates.get(name, 0) > budget]
+        if over:
+            warning = (f"sheet{'s' if len(over) > 1 else ''} {', '.join(over)} need{'' if len(over) > 1 else 's'} "
+                       f"more than the {budget:.0f} MB memory budget, but several sheets are always "
+                       f"loaded whole by the pandas engine")
+            self.engine_reason = f"{self.engine_reason}; {warning}" if self.engine_reason else warning
+            self.update_progress(f"Warning: {warning}")
+        workers = self.sheet_worker_count(len(names))
+        
+        output_path = self.get_output_path("_CLEANED.xlsx")
+        deleted_path = self.get_output_path("_DELETED.xlsx")
+        cleaned = Workbook(write_only=True)
+        deleted = Workbook(write_only=True) if self.save_deleted else None
+        targets = {}
+        for name in names:
+            targets[name] = [cleaned.create_sheet(name)]
+            if deleted is not None:
+                targets[name].append(deleted.create_sheet(name))
+        
+        settings = {name: (type(self), self.input_file, self.sheet_columns.get(name, self.COLUMNS),
+                           self.RULES, self.frame_cache, self.compact, name) for name in names}
+        with self.phase('clean', f"Cleaning {len(names)} sheets in {workers} processes..."
+                        if workers > 1 else f"Cleaning {len(names)} sheets...") as phase:
+            try:
+                if workers == 1:
+                    for name in names:
+                        if not self.add_sheet_result(name, *clean_sheet(*settings[name]), targets[name], len(names)):
+                            return None
+                else:
+                    # spawn, as for parallel matching: the cleaner often runs in a GUI worker thread
+                    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn')) as executor:
+                        futures = {executor.submit(clean_sheet, *settings[name]): name for name in names}
+                        for future in as_completed(futures):
+                            name = futures[future]
+                            if not self.add_sheet_result(name, *future.result(), targets[name], len(names)):
+                                executor.shutdown(cancel_futures=True)
+                                return None
+            except CleanerError:
+                raise
+            except Exception as e:
+                self.report_error(self.read_error(e))
+                return None
+            # In the order of the sheets rather than the order they finished in
+            self.sheet_stats = {name: self.sheet_stats[name] for name in names}
+            phase.update(rows=self.original_row_count, bytes_read=self.input_file.stat().st_size,
+                         message=f"Removed {self.rows_removed} rows")
+        
+        workbooks = {output_path: cleaned}
+        if deleted is not None and self.rows_removed:
+            workbooks[deleted_path] = deleted
+        with self.phase('write', "Saving cleaned and deleted rows files..."
+                        if len(workbooks) > 1 else "Saving cleaned file...") as phase:
+            try:
+                self.save_workbooks(workbooks)
+            except Exception as e:
+                self.report_error(self.write_error(e, output_path, "cleaned file"))
+                return None
+            if deleted_path in workbooks:
+                self.deleted_output_path = deleted_path
+            written = self.original_row_count if deleted_path in workbooks else self.remaining_row_count
+            self.record_written(phase, workbooks, written)
+            phase['message'] = "File saved successfully!"
+            return output_path
+    
+    def add_sheet_result(self, name, frame, keep, rule_stats, memory_mb, sheets, sheet_count):
+        """Append a cleaned sheet's rows to its output sheets (cleaned, then deleted) and count them"""
+        if len(frame.columns):
+            if not self.validate_columns(len(frame.columns), name, self.sheet_columns.get(name)):
+                return False
+            for sheet in sheets:
+                self.append_header(sheet, list(frame.columns))
+        self.append_rows(frame, list(zip(sheets, (keep, ~keep))), report_progress=False)
+        
+        remaining = int(keep.sum())
+        self.sheet_stats[name] = {'rows': len(frame), 'removed': len(frame) - remaining, 'remaining': remaining}
+        self.original_row_count += len(frame)
+        self.remaining_row_count += remaining
+        self.rows_removed += len(frame) - remaining
+        for col_name, counts in rule_stats.items():
+            self.add_rule_stats(col_name, counts)
+        if memory_mb is not None:
+            # Sizes add up over the sheets; the peak resident memory is the highest of the processes
+            totals = dict(self.memory_mb or {})
+            for key, size in memory_mb.items():
+                if key == 'peak_rss':
+                    totals[key] = max(filter(None, (totals.get(key), size)), default=None)
+                else:
+                    totals[key] = totals.get(key, 0) + size
+            self.memory_mb = totals
+        self.update_progress(f"Sheet {name}: removed {len(frame) - remaining} of {len(frame)} rows",
+                             done=len(self.sheet_stats), total=sheet_count, unit='sheets')
+        return True
+    
+    def load_preview_columns(self):
+        """Read the rule columns into rule_frame, indexed by sheet row number (header = row 1)
+        
+        .xlsx cells come straight from the sheet XML like in the projected engine;
+        CSV and Parquet inputs are read with usecols / columns.
+        """
+        if self.input_format == 'xlsx':
+            return self.load_rule_columns() and self.validate_columns(self.column_count)
+        
+        rule_indices = sorted({self.column_letter_to_index(letter) for letter in self.COLUMNS.values()})
+        with self.phase('read', "Reading rule columns...") as phase:
+            try:
+                if self.input_format == 'csv':
+                    frame = pd.read_csv(self.input_file, usecols=rule_indices, dtype=str, encoding='utf-8-sig')
+                else:
+                    import pyarrow.parquet
+                    names = pyarrow.parquet.read_schema(self.input_file).names
+                    frame = pd.read_parquet(self.input_file, columns=[names[col_idx] for col_idx in rule_indices])
+            except Exception as e:
+                self.report_error(self.read_error(e))
+                return False
+            frame.columns = rule_indices
+            frame.index = pd.RangeIndex(2, len(frame) + 2)
+            self.rule_frame = frame
+            self.original_row_count = len(frame)
+            phase.update(rows=self.original_row_count, bytes_read=self.input_file.stat().st_size,
+                         message=f"Loaded {self.original_row_count} rows")
+            return True
+    
+    def preview(self, sample_rows=PREVIEW_SAMPLE_ROWS):
+        """Count the rows the rules would remove from the rule columns only, without writing anything
+        
+        Returns {'rows', 'removed', 'remaining', 'rules', 'sample'}: 'rules' has one
+        dict per rule in RULES order with its name (see rule_names), column letter,
+        the rows it matches on its own ('matches') and the rows it removes in the
+        evaluation order ('removed', these add up to the total); 'sample' holds the first sample_rows
+        removed rows as {'row': sheet row number, column name: cell}. Like the
+        single-sheet engines it covers the first sheet. Returns None when the file
+        cannot be read or lacks a rule column (the error is in errors).
+        """
+        with self.recorder.run():
+            if self.RULE_HEADERS and not self.resolve_columns():
+                return None
+            if not self.preflight() or not self.load_preview_columns():
+                return None
+            
+            frame = self.rule_frame
+            self.rule_frame = None
+            positions = {col_idx: pos for pos, col_idx in enumerate(frame.columns)}
+            keep = self.evaluate_rules(frame, positions).to_numpy()
+            self.rows_removed = int(np.count_nonzero(~keep))
+            self.remaining_row_count = self.original_row_count - self.rows_removed
+            
+            with self.phase('preview', "Counting the rows of each rule...") as phase:
+                rules = []
+                for (col_name, _), (name, col_idx, matcher) in zip(self.RULES, self.compile_rules()):
+                    rules.append({
+                        'rule': name,
+                        'column': self.COLUMNS[col_name],
+                        'matches': int(matcher.match_series(frame.iloc[:, positions[col_idx]]).sum()),
+                        'removed': self.rule_stats.get(name, {}).get('matched', 0),
+                    })
+                
+                sample = frame[~keep].head(sample_rows)
+                sample_positions = {col_name: positions[self.column_letter_to_index(letter)]
+                                    for col_name, letter in self.COLUMNS.items()}
+                samples = []
+                for row_number, values in zip(sample.index, sample.itertuples(index=False, name=None)):
+                    record = {'row': int(row_number)}
+                    for col_name, position in sample_positions.items():
+                        record[col_name] = None if pd.isna(values[position]) else values[position]
+                    samples.append(record)
+                phase.update(rows=len(frame),
+                             message=f"Would remove {self.rows_removed} of {self.original_row_count} rows")
+            
+            return {'rows': self.original_row_count, 'removed': self.rows_removed,
+                    'remaining': self.remaining_row_count, 'rules': rules, 'sample': samples}
+    
+    def process(self):
+        """Main processing pipeline"""
+        with self.recorder.run():
+            output_path = self.run_pipeline()
+        if self.save_report:
+            self.write_report(output_path)
+        return output_path
+    
+    def run_pipeline(self):
+        """Cache lookup, the engine's pipeline, then the index and cache updates"""
+        if self.sheets is not None and self.engine == 'auto':
+            # Only the pandas engine writes several sheets; the memory budget limits how many load at once
+            self.engine = 'pandas'
+            self.engine_reason = "several sheets are cleaned at once with the pandas engine"
+        elif self.engine == 'auto' and self.cache is not None:
+            # Engines write different outputs (the xml engine keeps formatting), so the
+            # cache is keyed by the engine 'auto' picks for this file
+            engine = self.choose_engine()
+            if engine is None:
+                return None
+            self.engine = engine
+        
+        cache_key = None
+        if self.cache is not None:
+            with self.phase('cache', "Checking result cache...") as phase:
+                cache_key = self.cache.key_for(self)
+                output_path = self.cache.restore(cache_key, self)
+                if output_path is not None:
+                    self.cache_hit = True
+                    phase['message'] = "Loaded result from cache"
+                    return output_path
+        
+        if self.sheets is not None:
+            output_path = self.process_sheets()
+        else:
+            output_path = self.run_engine()
+        
+        if output_path is not None and self.row_index is not None:
+            with self.phase('index', f"Reused {self.rows_reused} earlier row decisions"):
+                try:
+                    self.row_index.save()
+                except OSError:
+                    pass  # Only the next run's speed depends on the index
+        if output_path is not None and self.cache is not None:
+            with self.phase('cache'):
+                self.cache.store(cache_key, self, output_path)
+        return output_path
+    
+    def run_engine(self):
+        """Find the rule columns named by header, pick the engine for engine='auto', then run its single-sheet pipeline"""
+        if self.RULE_HEADERS and not self.resolve_columns():
+            return None
+        
+        if self.engine == 'auto':
+            engine = self.choose_engine()
+            if engine is None:
+                return None
+            self.engine = engine
+        
+        if self.incremental:
+            self.row_index = RowIndex.for_cleaner(self, self.index_dir)
+        
+        if self.engine == 'projected':
+            return self.process_projected()
+        if self.engine == 'streaming':
+            return self.process_streaming()
+        if self.engine == 'xml':
+            return self.process_xml()
+        return self.process_pandas()
+    
+    def write_report(self, output_path=None):
+        """Write the run's events and phase totals to <name>_REPORT.json next to the input
+        
+        Profiling with cProfile also leaves <name>_REPORT.prof for pstats or snakeviz.
+        """
+        report_path = self.get_output_path("_REPORT.json")
+        try:
+            self.recorder.write_report(
+                report_path,
+                input_file=self.input_file,
+                output_file=output_path,
+                engine=self.engine,
+                original_row_count=self.original_row_count,
+                rows_removed=self.rows_removed,
+                cache_hit=self.cache_hit,
+                frame_cache_hit=self.frame_cache_hit,
+                memory_mb=self.memory_mb,
+                sheets=self.sheet_stats or None,
+                rule_plan=self.rule_plan or None,
+                rule_stats=self.rule_stats or None,
+                errors=[f"{error.title}: {error.message}" for error in self.errors],
+            )
+        except OSError:
+            return None  # The report is a diagnostic, it never fails the run
+        self.report_path = report_path
+        return report_path
+
+
+def clean_sheet(cleaner_class, input_file, columns, rules, frame_cache, compact, sheet_name):
+    """Read one sheet and match the rules on it, in a worker process of ExcelCleaner.process_sheets
+    
+    Returns (frame, keep mask, rule stats, memory before and after compacting or None); a
+    sheet without rows reads as an empty frame, which is not matched (rules found by
+    header have no column in it).
+    """
+    cleaner = cleaner_class(input_file, compact=compact)
+    cleaner.COLUMNS = columns
+    cleaner.RULES = rules
+    frame_key = frame_cache.key_for(input_file, sheet_name, cleaner.read_options()) if frame_cache is not None else None
+    frame = frame_cache.load(frame_key) if frame_key is not None else None
+    if frame is None:
+        frame = cleaner.read_input(sheet_name)
+        if frame_key is not None:
+            frame_cache.store(frame_key, frame)
+    if not len(frame.columns):
+        return frame, np.ones(len(frame), bool), {}, None
+    if compact:
+        # Also makes the frame smaller to send back from a worker process
+        cleaner.df = frame
+        cleaner.compact_loaded()
+        frame = cleaner.df
+    keep = cleaner.evaluate_rules(frame).to_numpy()
+    return frame, keep, cleaner.rule_stats, cleaner.memory_mb
@@ -0,0 +1,831 @@
+"""
+Excel Data Cleaner - Graphical interface
+Drag & drop window and progress display around the cleaning core
+"""
+
+import sys
+import os
+import tkinter as tk
+from tkinter import filedialog, messagebox, ttk
+from tkinterdnd2 import DND_FILES, TkinterDnD
+import threading
+import math
+
+from cleaner_core import ExcelCleaner, FORMAT_NAMES, parquet_available
+from instrumentation import ProgressChannel, ProgressEstimator, PROGRESS_POLL_MS, format_eta
+from frame_cache import FrameCache
+from result_cache import ResultCache
+
+
+def supported_formats():
+    """Input formats the cleaner reads here: Parquet only when pyarrow (or fastparquet) is installed"""
+    return [file_format for file_format in ExcelCleaner.FILE_FORMATS
+            if file_format != 'parquet' or parquet_available()]
+
+
+def describe_formats(formats):
+    """'.xlsx, .csv and .parquet' for a list of formats"""
+    suffixes = [f".{file_format}" for file_format in formats]
+    return ", ".join(suffixes[:-1]) + " and " + suffixes[-1] if len(suffixes) > 1 else suffixes[0]
+
+
+def is_supported_file(path):
+    """True for the input formats the cleaner reads"""
+    return path.lower().endswith(tuple(f".{file_format}" for file_format in supported_formats()))
+
+
+def unsupported_file_message():
+    """Error shown for a file of another format"""
+    formats = supported_formats()
+    names = [FORMAT_NAMES[file_format] for file_format in formats]
+    return (f"Please select a valid {', '.join(names[:-1])} or {names[-1]} file "
+            f"({', '.join(f'.{file_format}' for file_format in formats)})")
+
+
+def describe_failure(cleaner):
+    """Title and message of the error that stopped a cleaner"""
+    if cleaner.errors:
+        error = cleaner.errors[-1]
+        return error.title, error.message
+    return "Error", "Cleaning process failed."
+
+
+def describe_preview(preview):
+    """Confirmation text with the counts of ExcelCleaner.preview"""
+    lines = [
+        f"Original rows: {preview['rows']}",
+        f"Rows to remove: {preview['removed']}",
+        f"Remaining rows: {preview['remaining']}",
+        "",
+    ]
+    for rule in preview['rules']:
+        lines.append(f"{rule['rule']} (column {rule['column']}): {rule['matches']} matching rows")
+    lines += ["", "Save the cleaned file?"]
+    return "\n".join(lines)
+
+
+class ProgressWindow:
+    """Progress window to show cleaning status with circular loading animation"""
+    
+    def __init__(self, parent):
+        self.channel = ProgressChannel()
+        self.estimator = ProgressEstimator()
+        self.window = tk.Toplevel(parent)
+        self.window.title("Processing...")
+        self.window.geometry("500x400")
+        self.window.resizable(False, False)
+        self.window.configure(bg='white')
+        
+        # Center the window
+        self.window.update_idletasks()
+        x = (self.window.winfo_screenwidth() // 2) - (500 // 2)
+        y = (self.window.winfo_screenheight() // 2) - (400 // 2)
+        self.window.geometry(f"500x400+{x}+{y}")
+        
+        # Make it modal
+        self.window.transient(parent)
+        self.window.grab_set()
+        
+        # Canvas for circular loading animation
+        self.canvas = tk.Canvas(
+            self.window,
+            width=80,
+            height=80,
+            bg='white',
+            highlightthickness=0
+        )
+        self.canvas.pack(pady=20)
+        
+        # Progress label
+        self.label = tk.Label(
+            self.window,
+            text="Initializing...",
+            font=("Segoe UI", 11),
+            wraplength=450,
+            bg='white',
+            fg='#2c3e50'
+        )
+        self.label.pack(pady=10)
+        
+        # Progress bar of the current phase, filled when the phase reports how far it is
+        self.progress_bar = ttk.Progressbar(self.window, length=400, mode='determinate', maximum=1.0)
+        self.progress_bar.pack(pady=(0, 5))
+        
+        # Remaining time label
+        self.eta_label = tk.Label(
+            self.window,
+            text="",
+            font=("Segoe UI", 9),
+            bg='white',
+            fg='#7f8c8d'
+        )
+        self.eta_label.pack()
+        
+        # Warning label
+        warning_label = tk.Label(
+            self.window,
+            text="⚠ Warning! Please wait until this loading screen is gone\nbefore opening the _cleaned Excel file.",
+            font=("Segoe UI", 11, "bold"),
+            wraplength=450,
+            bg='white',
+            fg='#e74c3c',
+            justify=tk.CENTER
+        )
+        warning_label.pack(pady=15)
+        
+        # Animation properties
+        self.angle = 0
+        self.num_bars = 12
+        self.bar_length = 15
+        self.bar_width = 4
+        self.radius = 25
+        self.animation_running = True
+        
+        # Start animation and the progress updates from the worker thread
+        self.animate()
+        self.poll()
+    
+    def draw_spinner(self):
+        """Draw the circular loading spinner"""
+        self.canvas.delete("all")
+        
+        for i in range(self.num_bars):
+            # Calculate angle for this bar
+            bar_angle = (360 / self.num_bars) * i + self.angle
+            rad = math.radians(bar_angle)
+            
+            # Calculate start and end points
+            x1 = 40 + (self.radius - self.bar_length) * math.cos(rad)
+            y1 = 40 + (self.radius - self.bar_length) * math.sin(rad)
+            x2 = 40 + self.radius * math.cos(rad)
+            y2 = 40 + self.radius * math.sin(rad)
+            
+            # Calculate opacity based on position (fade effect)
+            opacity_index = (i - int(self.angle / (360 / self.num_bars))) % self.num_bars
+            opacity = int(255 * (1 - opacity_index / self.num_bars))
+            color = f'#{opacity:02x}{opacity:02x}{opacity:02x}'
+            
+            # Draw the bar
+            self.canvas.create_line(
+                x1, y1, x2, y2,
+                width=self.bar_width,
+                fill=color,
+                capstyle=tk.ROUND
+            )
+    
+    def animate(self):
+        """Animate the spinner"""
+        if self.animation_running:
+            self.draw_spinner()
+            self.angle = (self.angle + 30) % 360
+            self.window.after(100, self.animate)
+    
+    def update_message(self, message):
+        """Post a progress message, safe to call from any thread"""
+        self.channel.post(message)
+    
+    def update_event(self, event):
+        """Turn a run event into the bar state, safe to call from any thread"""
+        self.channel.post_progress(*self.estimator.update(event))
+    
+    def run_later(self, function):
+        """Run function on the GUI thread, safe to call from any thread"""
+        self.channel.call(function)
+    
+    def poll(self):
+        """Show the latest posted message and run the posted calls, then check again"""
+        if not self.animation_running:
+            return
+        message, calls = self.channel.drain()
+        if message is not None and message != self.label.cget("text"):
+            self.label.config(text=message)
+        fraction, eta = self.channel.progress
+        self.progress_bar['value'] = fraction or 0
+        eta_text = ""
+        if fraction is not None:
+            eta_text = f"{fraction:.0%}"
+            if eta is not None and fraction < 1:
+                eta_text += f" - {format_eta(eta)}"
+        if eta_text != self.eta_label.cget("text"):
+            self.eta_label.config(text=eta_text)
+        for function in calls:
+            function()
+        if self.animation_running:
+            self.window.after(PROGRESS_POLL_MS, self.poll)
+    
+    def close_and_show(self, dialog, *args):
+        """Close the window and then show a messagebox dialog, safe to call from any thread
+        
+        Both happen in one posted call: poll stops once the window is closed, so a
+        dialog posted separately after the close could be dropped.
+        """
+        def finish():
+            self.close()
+            dialog(*args)
+        self.run_later(finish)
+    
+    def close(self):
+        """Close the progress window"""
+        self.animation_running = False
+        self.window.destroy()
+
+
+class RoundedButton(tk.Canvas):
+    """Custom rounded button widget"""
+    def __init__(self, parent, text, command, bg_color="#6366f1", hover_color="#4f46e5", 
+                 fg_color="white", width=200, height=50, font_size=12, parent_bg="#0f172a", **kwargs):
+        tk.Canvas.__init__(self, parent, width=width, height=height, bg=parent_bg, 
+                          highlightthickness=0, relief=tk.FLAT, **kwargs)
+        self.command = command
+        self.bg_color = bg_color
+        self.hover_color = hover_color
+        self.fg_color = fg_color
+        self.text = text
+        self.font_size = font_size
+        self.current_color = bg_color
+        self.width = width
+        self.height = height
+        self.parent_bg = parent_bg
+        
+        self.bind("<Button-1>", lambda e: self.command() if self.command else None)
+        self.bind("<Enter>", self.on_enter)
+        self.bind("<Leave>", self.on_leave)
+        
+        self.draw()
+    
+    def draw(self):
+        self.delete("all")
+        self.create_rounded_rectangle(2, 2, self.width-2, self.height-2, 
+                                     radius=12, fill=self.current_color, outline="")
+        self.create_text(self.width//2, self.height//2, text=self.text, 
+                        fill=self.fg_color, font=("Segoe UI", self.font_size, "bold"))
+    
+    def create_rounded_rectangle(self, x1, y1, x2, y2, radius=20, **kwargs):
+        points = [
+            x1+radius, y1,
+            x1+radius, y1,
+            x2-radius, y1,
+            x2-radius, y1,
+            x2, y1,
+            x2, y1+radius,
+            x2, y1+radius,
+            x2, y2-radius,
+            x2, y2-radius,
+            x2, y2,
+            x2-radius, y2,
+            x2-radius, y2,
+            x1+radius, y2,
+            x1+radius, y2,
+            x1, y2,
+            x1, y2-radius,
+            x1, y2-radius,
+            x1, y1+radius,
+            x1, y1+radius,
+            x1, y1
+        ]
+        return self.create_polygon(points, **kwargs, smooth=True)
+    
+    def on_enter(self, event):
+        self.current_color = self.hover_color
+        self.draw()
+        self.config(cursor="hand2")
+    
+    def on_leave(self, event):
+        self.current_color = self.bg_color
+        self.draw()
+
+
+class ExcelCleanerGUI:
+    """Main GUI application for Excel Cleaner"""
+    
+    def __init__(self):
+        self.root = TkinterDnD.Tk()
+        self.root.title("Excel Cleaner")
+        self.root.geometry("700x630")
+        self.root.resizable(False, False)
+        self.root.configure(bg="#0f172a")
+        
+        # Center the window
+        self.root.update_idletasks()
+        x = (self.root.winfo_screenwidth() // 2) - (700 // 2)
+        y = (self.root.winfo_screenheight() // 2) - (630 // 2)
+        self.root.geometry(f"700x630+{x}+{y}")
+        
+        self.current_screen = "main"
+        self.save_deleted_var = tk.BooleanVar(value=False)
+        self.preview_var = tk.BooleanVar(value=False)
+        # The caches keep plain copies of the cleaned rows on disk, so they are opt-in
+        self.cache_var = tk.BooleanVar(value=False)
+        self.setup_ui()
+    
+    def setup_ui(self):
+        """Setup the user interface"""
+        # Clear the root window
+        for widget in self.root.winfo_children():
+            widget.destroy()
+        
+        self.root.configure(bg="#0f172a")
+        
+        # Main container
+        main_container = tk.Frame(self.root, bg="#0f172a")
+        main_container.pack(fill=tk.BOTH, expand=True, padx=40, pady=40)
+        
+        # Title
+        title = tk.Label(
+            main_container,
+            text="Excel Data Cleaner",
+            font=("Segoe UI", 32, "bold"),
+            fg="#ffffff",
+            bg="#0f172a"
+        )
+        title.pack(pady=(0, 10))
+        
+        # Subtitle
+        subtitle = tk.Label(
+            main_container,
+            text="Remove test data and FOC entries from Excel files",
+            font=("Segoe UI", 12),
+            fg="#94a3b8",
+            bg="#0f172a"
+        )
+        subtitle.pack(pady=(0, 40))
+        
+        # Drop zone frame with gradient-like appearance
+        self.drop_frame = tk.Frame(
+            main_container,
+            bg="#1e293b",
+            relief=tk.FLAT,
+            borderwidth=0,
+            highlightthickness=2,
+            highlightbackground="#334155",
+            highlightcolor="#6366f1"
+        )
+        self.drop_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 30))
+        
+        # Drop zone label
+        self.drop_label = tk.Label(
+            self.drop_frame,
+            text="📁",
+            font=("Segoe UI", 48),
+            bg="#1e293b",
+            fg="#64748b"
+        )
+        self.drop_label.pack(expand=True, pady=(30, 10))
+        
+        # Drag & drop text
+        drag_text = tk.Label(
+            self.drop_frame,
+            text="Drag & Drop Excel File Here",
+            font=("Segoe UI", 14, "bold"),
+            bg="#1e293b",
+            fg="#e2e8f0"
+        )
+        drag_text.pack(pady=(0, 5))
+        
+        # Or text
+        or_text = tk.Label(
+            self.drop_frame,
+            text="or",
+            font=("Segoe UI", 11),
+            bg="#1e293b",
+            fg="#94a3b8"
+        )
+        or_text.pack(pady=(5, 20))
+        
+        # Browse button with custom rounded style
+        browse_btn = RoundedButton(
+            self.drop_frame,
+            text="Browse Files",
+            command=self.browse_file,
+            bg_color="#6366f1",
+            hover_color="#4f46e5",
+            fg_color="white",
+            width=180,
+            height=48,
+            font_size=12
+        )
+        browse_btn.pack(pady=(0, 30))
+        
+        # Enable drag and drop
+        self.drop_frame.drop_target_register(DND_FILES)
+        self.drop_frame.dnd_bind('<<Drop>>', self.on_drop)
+        
+        # Checkbox frame
+        checkbox_frame = tk.Frame(main_container, bg="#0f172a")
+        checkbox_frame.pack(fill=tk.X, pady=(15, 0))
+        
+        # Create delete data checkbox
+        checkbox = tk.Checkbutton(
+            checkbox_frame,
+            text="Create separate file for deleted data",
+            variable=self.save_deleted_var,
+            font=("Segoe UI", 10),
+            bg="#0f172a",
+            fg="#e2e8f0",
+            activebackground="#0f172a",
+            activeforeground="#6366f1",
+            selectcolor="#0f172a",
+            highlightthickness=0,
+            bd=0
+        )
+        checkbox.pack(side=tk.LEFT, padx=5)
+        
+        # Create preview checkbox
+        preview_checkbox = tk.Checkbutton(
+            checkbox_frame,
+            text="Preview removals before saving",
+            variable=self.preview_var,
+            font=("Segoe UI", 10),
+            bg="#0f172a",
+            fg="#e2e8f0",
+            activebackground="#0f172a",
+            activeforeground="#6366f1",
+            selectcolor="#0f172a",
+            highlightthickness=0,
+            bd=0
+        )
+        preview_checkbox.pack(side=tk.LEFT, padx=5)
+        
+        # Cache checkbox and the action emptying the caches
+        cache_frame = tk.Frame(main_container, bg="#0f172a")
+        cache_frame.pack(fill=tk.X, pady=(5, 0))
+        
+        cache_checkbox = tk.Checkbutton(
+            cache_frame,
+            text="Cache the rows on this computer (unencrypted) for faster repeat runs",
+            variable=self.cache_var,
+            font=("Segoe UI", 10),
+            bg="#0f172a",
+            fg="#e2e8f0",
+            activebackground="#0f172a",
+            activeforeground="#6366f1",
+            selectcolor="#0f172a",
+            highlightthickness=0,
+            bd=0
+        )
+        cache_checkbox.pack(side=tk.LEFT, padx=5)
+        
+        clear_btn = tk.Button(
+            cache_frame,
+            text="Clear cache",
+            command=self.clear_cache,
+            font=("Segoe UI", 9, "underline"),
+            bg="#0f172a",
+            fg="#818cf8",
+            relief=tk.FLAT,
+            cursor="hand2",
+            activebackground="#0f172a",
+            activeforeground="#6366f1",
+            bd=0,
+            highlightthickness=0
+        )
+        clear_btn.pack(side=tk.RIGHT, padx=5)
+        
+        # Bottom info frame
+        bottom_frame = tk.Frame(main_container, bg="#0f172a", height=60)
+        bottom_frame.pack(fill=tk.X, pady=(20, 0))
+        
+        # Info label
+        info = tk.Label(
+            bottom_frame,
+            text=f"✓ Supported formats: {describe_formats(supported_formats())} files",
+            font=("Segoe UI", 10),
+            fg="#64748b",
+            bg="#0f172a"
+        )
+        info.pack(side=tk.LEFT, pady=10)
+        
+        # Info button in bottom right corner
+        info_btn = RoundedButton(
+            self.root,
+            text="ℹ",
+            command=self.show_info_screen,
+            bg_color="#6366f1",
+            hover_color="#4f46e5",
+            fg_color="white",
+            width=55,
+            height=55,
+            font_size=20
+        )
+        info_btn.place(relx=0.95, rely=0.98, anchor=tk.SE)
+    
+    def clear_cache(self):
+        """Remove the cached results and loaded rows of earlier runs from this computer"""
+        result_cache = ResultCache()
+        frame_cache = FrameCache()
+        removed = result_cache.clear() + frame_cache.clear()
+        messagebox.showinfo(
+            "Cache",
+            f"Removed {removed} cached files from:\n{result_cache.directory}\n{frame_cache.directory}"
+        )
+    
+    def on_drop(self, event):
+        """Handle file drop event"""
+        file_path = event.data
+        # Remove curly braces if present (Windows drag-drop adds them)
+        file_path = file_path.strip('{}')
+        self.process_file(file_path)
+    
+    def browse_file(self):
+        """Open file browser dialog"""
+        file_path = filedialog.askopenfilename(
+            title="Select Excel File to Clean",
+            filetypes=[
+                ("Excel files", "*.xlsx"),
+                (" and ".join(FORMAT_NAMES[file_format] for file_format in supported_formats()[1:]) + " files",
+                 " ".join(f"*.{file_format}" for file_format in supported_formats()[1:])),
+                ("All files", "*.*")
+            ]
+        )
+        if file_path:
+            self.process_file(file_path)
+    
+    def process_file(self, file_path):
+        """Process the selected file"""
+        # Validate file
+        if not os.path.exists(file_path):
+            messagebox.showerror("Error", f"File does not exist:\n{file_path}")
+            return
+        
+        if not is_supported_file(file_path):
+            messagebox.showerror("Error", unsupported_file_message())
+            return
+        
+        if self.preview_var.get():
+            self.preview_file(file_path)
+        else:
+            self.clean_file(file_path)
+    
+    def preview_file(self, file_path):
+        """Count the rows the rules would remove, then clean the file if the user confirms"""
+        progress_window = ProgressWindow(self.root)
+        
+        def confirm(preview):
+            progress_window.close()
+            if messagebox.askyesno("Preview", describe_preview(preview)):
+                self.clean_file(file_path)
+        
+        def preview_thread():
+            try:
+                cleaner = ExcelCleaner(
+                    file_path,
+                    progress_callback=progress_window.update_message,
+                    event_callback=progress_window.update_event
+                )
+                preview = cleaner.preview()
+                if preview is not None:
+                    progress_window.run_later(lambda: confirm(preview))
+                else:
+                    progress_window.close_and_show(messagebox.showerror, *describe_failure(cleaner))
+            except Exception as e:
+                progress_window.close_and_show(messagebox.showerror, "Error", f"An error occurred:\n{str(e)}")
+        
+        threading.Thread(target=preview_thread, daemon=True).start()
+    
+    def clean_file(self, file_path):
+        """Clean the file in a worker thread and report the result"""
+        # Create progress window
+        progress_window = ProgressWindow(self.root)
+        
+        # Tk variables are only read on the GUI thread
+        save_deleted = self.save_deleted_var.get()
+        use_cache = self.cache_var.get()
+        
+        # Process in separate thread to keep UI responsive
+        def process_thread():
+            try:
+                cleaner = ExcelCleaner(
+                    file_path,
+                    progress_callback=progress_window.update_message,
+                    event_callback=progress_window.update_event,
+                    save_deleted=save_deleted,
+                    cache=ResultCache() if use_cache else None,
+                    frame_cache=FrameCache() if use_cache else None
+                )
+                # With "save deleted" checked, the deleted rows file is written together with the cleaned one
+                output_path = cleaner.process()
+                deleted_path = cleaner.deleted_output_path
+                
+                # The progress window is closed together with the result dialog, on the GUI thread
+                if output_path:
+                    message = (
+                        f"✓ Cleaning completed successfully!\n\n"
+                        f"Original rows: {cleaner.original_row_count}\n"
+                        f"Rows removed: {cleaner.rows_removed}\n"
+                        f"Remaining rows: {cleaner.remaining_row_count}\n\n"
+                        f"Cleaned file saved to:\n{output_path}"
+                    )
+                    
+                    if cleaner.cache_hit:
+                        message += "\n\n(Same file as a previous run: result taken from the cache)"
+                    
+                    if deleted_path:
+                        message += f"\n\nDeleted rows file saved to:\n{deleted_path}"
+                    
+                    progress_window.close_and_show(messagebox.showinfo, "Success", message)
+                else:
+                    progress_window.close_and_show(messagebox.showerror, *describe_failure(cleaner))
+            except Exception as e:
+                progress_window.close_and_show(messagebox.showerror, "Error", f"An error occurred:\n{str(e)}")
+        
+        thread = threading.Thread(target=process_thread, daemon=True)
+        thread.start()
+    
+    def show_info_screen(self):
+        """Display the information screen with data cleaning rules"""
+        self.current_screen = "info"
+        
+        # Clear the root window
+        for widget in self.root.winfo_children():
+            widget.destroy()
+        
+        self.root.configure(bg="#0f172a")
+        
+        # Header frame
+        header_frame = tk.Frame(self.root, bg="#1e293b", relief=tk.FLAT, borderwidth=0)
+        header_frame.pack(fill=tk.X, padx=0, pady=0)
+        
+        # Back button in top left with improved styling
+        back_btn = tk.Button(
+            header_frame,
+            text="← Back",
+            command=self.back_to_main,
+            font=("Segoe UI", 10, "bold"),
+            bg="#6366f1",
+            fg="white",
+            padx=20,
+            pady=12,
+            relief=tk.FLAT,
+            cursor="hand2",
+            activebackground="#4f46e5",
+            activeforeground="white",
+            bd=0,
+            highlightthickness=0
+        )
+        back_btn.pack(anchor=tk.NW, padx=15, pady=12)
+        
+        # Bind hover effects to back button
+        back_btn.bind("<Enter>", lambda e: back_btn.config(bg="#4f46e5"))
+        back_btn.bind("<Leave>", lambda e: back_btn.config(bg="#6366f1"))
+        
+        # Title
+        title = tk.Label(
+            self.root,
+            text="Data Cleaning Rules",
+            font=("Segoe UI", 24, "bold"),
+            fg="#ffffff",
+            bg="#0f172a"
+        )
+        title.pack(pady=20)
+        
+        # Create a scrollable frame for the information
+        canvas = tk.Canvas(self.root, bg="#0f172a", highlightthickness=0, relief=tk.FLAT)
+        scrollbar = ttk.Scrollbar(self.root, orient="vertical", command=canvas.yview)
+        scrollable_frame = tk.Frame(canvas, bg="#0f172a")
+        
+        scrollable_frame.bind(
+            "<Configure>",
+            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
+        )
+        
+        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
+        canvas.configure(yscrollcommand=scrollbar.set)
+        
+        # Bind mouse wheel scrolling
+        def _on_mousewheel(event):
+            canvas.yview_scroll(int(-1*(event.delta/120)), "units")
+        
+        def _on_mousewheel_linux(event):
+            if event.num == 5:
+                canvas.yview_scroll(3, "units")
+            elif event.num == 4:
+                canvas.yview_scroll(-3, "units")
+        
+        canvas.bind_all("<MouseWheel>", _on_mousewheel)
+        canvas.bind_all("<Button-4>", _on_mousewheel_linux)
+        canvas.bind_all("<Button-5>", _on_mousewheel_linux)
+        
+        # Information content
+        info_text = f"""The tool removes entire rows based on substring matches (case-insensitive) in specific columns:
+
+1. ShipmentID (Column BV)
+   • Removes rows containing: "FOC"
+
+2. Order (Column H)
+   • Removes rows containing any of:
+     - "test" or "testing"
+     - "M88" (including variants like "M880123")
+     - "GB Test", "GB Testing", or "GB" alone
+
+3. Buyer PO Number (Column I)
+   • Removes rows containing:
+     - "test" or "testing"
+     - "FOC"
+
+4. Comment (Column BO)
+   • Removes rows containing:
+     - "FOC"
+     - "M88"
+
+Output:
+   • Creates a new file: <original_filename>_CLEANED.xlsx
+     ({describe_formats(supported_formats()[1:])} inputs give {describe_formats(supported_formats()[1:])} outputs)
+   • Saved in the same directory as the input file
+   • Displays statistics: original rows, rows removed, remaining rows
+
+Note: All matching is case-insensitive and works on substrings.
+Example: "M880123" will match "M88" and be removed."""
+        
+        info_label = tk.Label(
+            scrollable_frame,
+            text=info_text,
+            font=("Segoe UI", 10),
+            fg="#e2e8f0",
+            justify=tk.LEFT,
+            wraplength=600,
+            bg="#0f172a"
+        )
+        info_label.pack(padx=30, pady=20, anchor="w")
+        
+        # Pack canvas and scrollbar
+        canvas.pack(side="left", fill="both", expand=True, padx=0, pady=10)
+        scrollbar.pack(side="right", fill="y", padx=5)
+    
+    def back_to_main(self):
+        """Return to the main screen"""
+        self.current_screen = "main"
+        self.setup_ui()
+    
+    def run(self):
+        """Start the GUI application"""
+        self.root.mainloop()
+
+
+def main():
+    """Main entry point for the application"""
+    # Check if file was provided via command line (for backward compatibility)
+    if len(sys.argv) > 1:
+        input_file = sys.argv[1]
+        
+        # Verify file exists and is an Excel file
+        if not os.path.exists(input_file):
+            messagebox.showerror("Error", f"File does not exist:\n{input_file}")
+            return
+        
+        if not is_supported_file(input_file):
+            messagebox.showerror("Error", unsupported_file_message())
+            return
+        
+        # Create a temporary root for progress window
+        root = tk.Tk()
+        root.withdraw()
+        
+        # Create progress window
+        progress_window = ProgressWindow(root)
+        
+        # Process the file in a worker thread while the event loop draws the progress
+        try:
+            cleaner = ExcelCleaner(
+                input_file,
+                progress_callback=progress_window.update_message,
+                event_callback=progress_window.update_event
+            )
+        except ValueError as e:
+            # e.g. a Parquet file without pyarrow installed
+            progress_window.close()
+            messagebox.showerror("Error", str(e))
+            root.destroy()
+            return
+        
+        def finish(output_path, error=None):
+            progress_window.close()
+            if error is not None:
+                messagebox.showerror("Error", f"An error occurred:\n{error}")
+            elif output_path:
+                message = (
+                    f"✓ Cleaning completed successfully!\n\n"
+                    f"Original rows: {cleaner.original_row_count}\n"
+                    f"Rows removed: {cleaner.rows_removed}\n"
+                    f"Remaining rows: {cleaner.remaining_row_count}\n\n"
+                    f"Cleaned file saved to:\n{output_path}"
+                )
+                messagebox.showinfo("Success", message)
+            else:
+                messagebox.showerror(*describe_failure(cleaner))
+            root.destroy()
+        
+        def process_thread():
+            try:
+                output_path = cleaner.process()
+            except Exception as e:
+                error = str(e)
+                progress_window.run_later(lambda: finish(None, error))
+                return
+            progress_window.run_later(lambda: finish(output_path))
+        
+        threading.Thread(target=process_thread, daemon=True).start()
+        root.mainloop()
+    else:
+        # No file provided, launch GUI
+        app = ExcelCleanerGUI()
+        app.run()
@@ -27,7 +27,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=datas,
-    hiddenimports=['openpyxl', 'pandas', 'tkinter', 'tkinterdnd2'],
+    hiddenimports=['openpyxl', 'pandas', 'tkinter', 'tkinterdnd2', 'cleaner_gui', 'parallel_match', 'rules_file'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
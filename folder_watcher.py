@@ -0,0 +1,262 @@
+"""
+Excel Data Cleaner - Watch folder
+Cleans the exports dropped into folders as they arrive, with a bounded pool of worker processes
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from cleaner_cli import clean_file, collect_files, format_summary
+from result_cache import default_cache_dir
+
+
+# Seconds between two scans of the watched folders
+DEFAULT_POLL_SECONDS = 2.0
+
+# Seconds a file's size and modification time must stay the same before it is cleaned.
+# Copies keep the source's modification time, so the time alone does not show the copy is done
+DEFAULT_SETTLE_SECONDS = 5.0
+
+# Runs of a failing file (including worker crashes) before it is left as failed
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Files waiting for a worker, per worker; ready files beyond this stay in the folder until the next scans
+QUEUE_PER_WORKER = 4
+
+
+def default_journal_path(folders):
+    """Journal of a set of watched folders, in the per-user cache folder"""
+    key = hashlib.sha256("\n".join(sorted(str(Path(folder).resolve()) for folder in folders)).encode("utf-8"))
+    return default_cache_dir().parent / "watch" / f"{key.hexdigest()[:32]}.json"
+
+
+def file_signature(path):
+    """[size, modification time in ns] of a file, or None when it is gone"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def is_complete(path):
+    """True when the file can be opened and, for .xlsx, ends with its zip directory
+    
+    An .xlsx still being written lacks the directory at its end, and a file the
+    writer holds open (on Windows) cannot be opened.
+    """
+    try:
+        if Path(path).suffix.lower() == ".xlsx":
+            return zipfile.is_zipfile(path)
+        with open(path, "rb"):
+            return True
+    except OSError:
+        return False
+
+
+class WatchJournal:
+    """Status of every file the watcher has taken, kept in a JSON file across restarts
+    
+    Entries are keyed by path and hold the file's signature, its status ('queued',
+    'running', 'done' or 'failed'), the attempts so far, timestamps and the summary
+    of the last run. A file is only 'done' once its outputs are written, so files
+    queued or running when the watcher stopped are cleaned again after a restart
+    (at least once), and a file replaced by a new export is cleaned again.
+    """
+    
+    STATUSES = ("queued", "running", "done", "failed")
+    
+    def __init__(self, path, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.path = Path(path)
+        self.max_attempts = max_attempts
+        self.entries = self._read()
+    
+    def _read(self):
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+    
+    def save(self):
+        """Write the journal through a temporary file, so a crash never leaves half of it"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        handle, temp_path = tempfile.mkstemp(prefix=".journal-", dir=self.path.parent)
+        try:
+            with os.fdopen(handle, "w", encoding="utf-8") as journal:
+                json.dump(self.entries, journal, indent=1)
+            os.replace(temp_path, self.path)
+        except OSError:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+    
+    def needs_cleaning(self, path, signature):
+        """True for files not cleaned yet in this version, including ones a stopped run left queued or running"""
+        entry = self.entries.get(str(path))
+        if entry is None or entry["signature"] != signature:
+            return True
+        return entry["status"] in ("queued", "running")
+    
+    def update(self, path, **fields):
+        entry = self.entries.setdefault(str(path), {"status": None, "attempts": 0})
+        entry.update(fields)
+        self.save()
+        return entry
+    
+    def queued(self, path, signature):
+        entry = self.entries.get(str(path))
+        if entry is not None and entry["signature"] != signature:
+            entry["attempts"] = 0  # A new export under the same name
+        return self.update(path, signature=signature, status="queued", queued=time.time())
+    
+    def started(self, path):
+        entry = self.entries[str(path)]
+        return self.update(path, status="running", started=time.time(), attempts=entry["attempts"] + 1)
+    
+    def finished(self, path, summary):
+        """Record a run; a failed file goes back to 'queued' until it used max_attempts"""
+        entry = self.entries[str(path)]
+        if summary["ok"]:
+            status = "done"
+        else:
+            status = "queued" if entry["attempts"] < self.max_attempts else "failed"
+        return self.update(path, status=status, finished=time.time(), summary=summary)
+    
+    def forget_missing(self):
+        """Drop the entries of files no longer in the folders, returns how many"""
+        missing = [path for path in self.entries if not os.path.exists(path)]
+        for path in missing:
+            del self.entries[path]
+        if missing:
+            self.save()
+        return len(missing)
+    
+    def counts(self):
+        """Number of files per status"""
+        counts = dict.fromkeys(self.STATUSES, 0)
+        for entry in self.entries.values():
+            counts[entry["status"]] += 1
+        return counts
+
+
+class FolderWatcher:
+    """Scans folders for new input files and cleans them with clean_file in a process pool
+    
+    A file is taken once its signature held for settle_seconds and it is complete.
+    At most one file per worker is in the pool and at most max_queue wait for a
+    worker; the others are left in the folder until there is room (backpressure).
+    options are passed to clean_file (engine, save_deleted, caches...).
+    """
+    
+    def __init__(self, folders, workers=1, max_queue=None, poll_seconds=DEFAULT_POLL_SECONDS,
+                 settle_seconds=DEFAULT_SETTLE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS, journal_path=None,
+                 recursive=False, options=None, report=print):
+        self.folders = [str(folder) for folder in folders]
+        self.workers = max(1, workers)
+        self.max_queue = max_queue if max_queue is not None else self.workers * QUEUE_PER_WORKER
+        self.poll_seconds = poll_seconds
+        self.settle_seconds = settle_seconds
+        self.recursive = recursive
+        self.options = options or {}
+        self.report = report
+        self.journal = WatchJournal(journal_path or default_journal_path(self.folders), max_attempts)
+        self.queue = deque()
+        self.running = {}
+        # Path -> (signature, time it was first seen with it), for the settle time
+        self.seen = {}
+    
+    def scan(self):
+        """Queue the files that settled and are complete, while the queue has room"""
+        now = time.monotonic()
+        queued = set(self.queue) | set(self.running.values())
+        files = collect_files(self.folders, recursive=self.recursive)
+        for path in set(self.seen) - set(files):
+            del self.seen[path]  # Removed before it settled
+        for path in files:
+            if len(self.queue) >= self.max_queue:
+                break
+            if path in queued:
+                continue
+            signature = file_signature(path)
+            if signature is None or not self.journal.needs_cleaning(path, signature):
+                self.seen.pop(path, None)
+                continue
+            if path not in self.seen or self.seen[path][0] != signature:
+                self.seen[path] = (signature, now)
+            if now - self.seen[path][1] < self.settle_seconds or not is_complete(path):
+                continue
+            del self.seen[path]
+            self.journal.queued(path, signature)
+            self.queue.append(path)
+    
+    def settling(self):
+        """True while a file seen in the folders may still be taken after its settle time
+        
+        Files that settled but stay incomplete (e.g. a broken .xlsx) wait for a change.
+        """
+        now = time.monotonic()
+        return any(now - since < self.settle_seconds for _, since in self.seen.values())
+    
+    def submit(self, executor):
+        """Hand queued files to the pool until every worker has one"""
+        while self.queue and len(self.running) < self.workers:
+            path = self.queue.popleft()
+            if file_signature(path) is None:
+                continue  # Removed while it waited
+            self.journal.started(path)
+            self.running[executor.submit(clean_file, path, **self.options)] = path
+    
+    def collect(self, futures):
+        """Record the finished runs and report them with their time in the queue"""
+        for future in futures:
+            summary = future.result()  # Raises BrokenProcessPool with the file still in running
+            path = self.running.pop(future)
+            entry = self.journal.finished(path, summary)
+            line = format_summary(summary) + f"\n     queued {entry['started'] - entry['queued']:.2f}s"
+            if entry["status"] == "queued":
+                line += f", will retry (attempt {entry['attempts']} of {self.journal.max_attempts})"
+            self.report(line)
+    
+    def crashed(self):
+        """Count a worker crash as a failed attempt of every running file"""
+        for path in self.running.values():
+            summary = {"file": str(path), "ok": False, "error": "The worker process stopped unexpectedly"}
+            entry = self.journal.finished(path, summary)
+            self.report(f"FAIL {path}\n     {summary['error']} ({entry['status']})")
+        self.running = {}
+    
+    def run(self, stop=None, until_idle=False):
+        """Watch until stop (a threading.Event) is set, or with until_idle until nothing is left to clean
+        
+        Files that were queued or running when an earlier run stopped are taken again.
+        Interrupting it (Ctrl+C) leaves the journal as it is, for the next run.
+        """
+        self.journal.forget_missing()
+        self.report(f"Watching {', '.join(self.folders)} with {self.workers} worker(s)...")
+        executor = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            while stop is None or not stop.is_set():
+                self.scan()
+                self.submit(executor)
+                if not self.running:
+                    if until_idle and not self.queue and not self.settling():
+                        break
+                    time.sleep(self.poll_seconds)
+                    continue
+                done, _ = wait(self.running, timeout=self.poll_seconds, return_when=FIRST_COMPLETED)
+                try:
+                    self.collect(done)
+                except BrokenProcessPool:
+                    self.crashed()
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    executor = ProcessPoolExecutor(max_workers=self.workers)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return self.journal.counts()
@@ -0,0 +1,202 @@
+"""
+Excel Data Cleaner - Frame cache
+Keeps the DataFrame of every loaded input file, so loading it again skips openpyxl
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+from pandas.api.types import infer_dtype
+
+from result_cache import default_cache_dir
+
+
+# Bump when the way inputs are read changes, so older frames are not reused
+FRAME_CACHE_VERSION = 2
+
+# Total size of the stored frames before the least recently used ones are evicted
+DEFAULT_MAX_BYTES = 2 << 30
+
+# Stored as Arrow IPC (memory-mapped when loaded) or, for frames Arrow cannot hold as they are, pickled
+SUFFIXES = (".arrow", ".pkl")
+
+# Schema metadata key of the frame's attrs in Arrow entries
+ATTRS_KEY = b"excel_cleaner.attrs"
+
+
+def default_frame_dir():
+    """Folder of the frame cache, next to the result cache"""
+    return default_cache_dir().parent / "frames"
+
+
+def arrow_table(frame):
+    """frame as an Arrow table, or None when pyarrow is missing or the round trip would change it
+    
+    Arrow turns column names into text and cannot hold object columns that mix
+    types (numbers and text in one Excel column); such frames are pickled instead.
+    """
+    try:
+        import pyarrow
+    except ImportError:
+        return None
+    if not all(isinstance(name, str) for name in frame.columns):
+        return None
+    for _, column in frame.items():
+        if column.dtype == object and infer_dtype(column, skipna=True) not in ("string", "empty"):
+            return None
+    try:
+        table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+    except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError, pyarrow.ArrowNotImplementedError):
+        return None
+    if frame.attrs:
+        # Arrow leaves DataFrame.attrs out, they go in the schema's metadata
+        try:
+            attrs = json.dumps(frame.attrs).encode("utf-8")
+        except TypeError:
+            return None
+        table = table.replace_schema_metadata({**table.schema.metadata, ATTRS_KEY: attrs})
+    return table
+
+
+class FrameCache:
+    """DataFrames of input files, stored per path, reader options, modification time and size
+    
+    Every entry is one file named <path key>-<state key> plus its format's suffix.
+    A changed file gets a new state key, and storing its frame removes the entry of
+    the old content, so stale frames are never loaded. The modification time of an
+    entry records its last use, and the least recently used are evicted beyond max_bytes.
+    """
+    
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = Path(directory) if directory else default_frame_dir()
+        self.max_bytes = max_bytes
+    
+    def key_for(self, path, sheet=None, options=None):
+        """Cache key of a file's current state (and sheet), or None if the file cannot be read
+        
+        options are the reader's keyword arguments (dtype...): frames read with other
+        options are kept as entries of their own.
+        """
+        path = Path(path)
+        try:
+            stat = path.stat()
+            path = path.resolve()
+        except OSError:
+            return None
+        identity = [str(path), sheet, {name: str(value) for name, value in sorted((options or {}).items())}]
+        path_key = hashlib.sha256(json.dumps(identity).encode("utf-8")).hexdigest()[:16]
+        state = [FRAME_CACHE_VERSION, stat.st_mtime_ns, stat.st_size]
+        return path_key + "-" + hashlib.sha256(json.dumps(state).encode("utf-8")).hexdigest()[:16]
+    
+    def entries(self):
+        """Entry files, least recently used first"""
+        if not self.directory.is_dir():
+            return []
+        entries = []
+        for path in self.directory.iterdir():
+            if path.suffix not in SUFFIXES or path.name.startswith("."):
+                continue
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except OSError:
+                continue
+        return [path for _, path in sorted(entries)]
+    
+    def size(self):
+        """Total bytes held by the cache"""
+        return sum(path.stat().st_size for path in self.entries())
+    
+    def load(self, key):
+        """The stored frame of key, or None on a miss
+        
+        Arrow entries are memory-mapped, so only the columns' buffers are read as
+        pandas needs them rather than the file being copied into memory first.
+        Without pyarrow every entry is pickled, which reads the whole file into
+        memory before unpickling it.
+        """
+        if key is None:
+            return None
+        for suffix in SUFFIXES:
+            path = self.directory / (key + suffix)
+            if not path.exists():
+                continue
+            try:
+                if suffix == ".arrow":
+                    import pyarrow.feather
+                    table = pyarrow.feather.read_table(path, memory_map=True)
+                    attrs = (table.schema.metadata or {}).get(ATTRS_KEY)
+                    # One block per column, so pandas does not copy the columns again to
+                    # consolidate them, and Arrow releases what it can as each is converted
+                    frame = table.to_pandas(split_blocks=True, self_destruct=True)
+                    del table
+                    if attrs is not None:
+                        frame.attrs = json.loads(attrs)
+                else:
+                    frame = pd.read_pickle(path)
+                os.utime(path)
+            except Exception:
+                # Unreadable (e.g. written by a newer pandas or evicted meanwhile): read the input again
+                return None
+            return frame
+        return None
+    
+    def store(self, key, frame):
+        """Add the frame of key, replacing the entries of the file's earlier content, then evict beyond max_bytes"""
+        if key is None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        table = arrow_table(frame)
+        suffix = SUFFIXES[0] if table is not None else SUFFIXES[1]
+        
+        # Written next to its final place and renamed, so readers never see a partial entry
+        handle, temp_path = tempfile.mkstemp(prefix=".staging-", suffix=suffix, dir=self.directory)
+        try:
+            with os.fdopen(handle, "wb") as target:
+                if table is not None:
+                    import pyarrow.feather
+                    # Uncompressed, so loads can memory-map the columns
+                    pyarrow.feather.write_feather(table, target, compression="uncompressed")
+                else:
+                    pickle.dump(frame, target, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.directory / (key + suffix))
+        except OSError:
+            Path(temp_path).unlink(missing_ok=True)
+            return
+        
+        path_key = key.split("-")[0]
+        for path in self.entries():
+            if path.name.startswith(path_key + "-") and path.name != key + suffix:
+                self.remove(path)
+        self.evict()
+    
+    def remove(self, path):
+        try:
+            path.unlink()
+        except OSError:
+            pass  # Still mapped by a running load (Windows), goes on a later eviction
+    
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = self.entries()
+        sizes = {path: path.stat().st_size for path in entries}
+        total = sum(sizes.values())
+        for path in entries:
+            if total <= self.max_bytes:
+                break
+            self.remove(path)
+            total -= sizes[path]
+    
+    def clear(self):
+        """Remove all entries (and leftovers of interrupted stores), returns how many entries"""
+        entries = self.entries()
+        for path in entries:
+            self.remove(path)
+        if self.directory.is_dir():
+            for path in self.directory.glob(".staging-*"):
+                self.remove(path)
+        return len(entries)
@@ -0,0 +1,321 @@
+"""
+Excel Data Cleaner - Run instrumentation
+Phase events with durations, row and byte counts and memory use, plus optional profiling
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import queue
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# cProfile records where the time went, tracemalloc the exact peak memory of each phase
+PROFILE_MODES = ('cprofile', 'tracemalloc')
+
+# Functions listed in the report when profiling with cProfile
+PROFILE_TOP_FUNCTIONS = 25
+
+# How often the GUI takes the pending progress off a ProgressChannel, in ms
+PROGRESS_POLL_MS = 50
+
+# Seconds of a phase before its throughput is trusted for an ETA
+ETA_WARMUP_SECONDS = 1.0
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far in MB, None where it cannot be measured"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def available_memory_mb():
+    """Physical memory available to new allocations in MB, None where it cannot be measured"""
+    if sys.platform == "win32":
+        import ctypes
+        
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [
+                ("dwLength", ctypes.c_ulong),
+                ("dwMemoryLoad", ctypes.c_ulong),
+                ("ullTotalPhys", ctypes.c_ulonglong),
+                ("ullAvailPhys", ctypes.c_ulonglong),
+                ("ullTotalPageFile", ctypes.c_ulonglong),
+                ("ullAvailPageFile", ctypes.c_ulonglong),
+                ("ullTotalVirtual", ctypes.c_ulonglong),
+                ("ullAvailVirtual", ctypes.c_ulonglong),
+                ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+            ]
+        
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(status)
+        if not ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return None
+        return status.ullAvailPhys / (1 << 20)
+    
+    # Linux: MemAvailable counts the page cache that can be reclaimed, unlike free pages
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / (1 << 20)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+class RunRecorder:
+    """Records the phases of a cleaner run as a list of event dicts
+    
+    Every event has 'event' ('start', 'end' or 'progress'), 'phase' and 'time' (seconds
+    since the recorder was created); the ones with a 'message' are the progress texts.
+    End events add 'duration', 'peak_memory_mb' and, when the phase set them, 'rows',
+    'bytes_read' and 'bytes_written'. Phases can nest (e.g. matching inside a pass).
+    """
+    
+    def __init__(self, listener=None, profile=None):
+        if profile not in (None,) + PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode '{profile}', expected one of: {', '.join(PROFILE_MODES)}")
+        self.listener = listener
+        self.profile = profile
+        self.events = []
+        self.started = time.perf_counter()
+        self.started_at = datetime.now()
+        self.profiler = None
+        self._stack = []
+    
+    @property
+    def tracing(self):
+        return self.profile == 'tracemalloc' and tracemalloc.is_tracing()
+    
+    @property
+    def current_phase(self):
+        return self._stack[-1]['phase'] if self._stack else None
+    
+    def emit(self, event_type, phase, **fields):
+        event = {'event': event_type, 'phase': phase, 'time': time.perf_counter() - self.started}
+        event.update(fields)
+        self.events.append(event)
+        if self.listener:
+            self.listener(event)
+        return event
+    
+    def progress(self, message=None, **fields):
+        """Progress inside the current phase, e.g. done=rows, total=rows, unit='rows'"""
+        if message is not None:
+            fields['message'] = message
+        self.emit('progress', self.current_phase, **fields)
+    
+    def fail(self):
+        """Mark the current phase as failed"""
+        if self._stack:
+            self._stack[-1]['failed'] = True
+    
+    @contextmanager
+    def phase(self, name, message=None):
+        """Time a phase; the yielded dict takes 'rows', 'bytes_read', 'bytes_written' and an end 'message'"""
+        stats = {'phase': name, 'failed': False, 'child_peak': 0}
+        if self.tracing:
+            if self._stack:
+                parent = self._stack[-1]
+                parent['child_peak'] = max(parent['child_peak'], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        self.emit('start', name, **({'message': message} if message else {}))
+        self._stack.append(stats)
+        started = time.perf_counter()
+        try:
+            yield stats
+        except BaseException:
+            stats['failed'] = True
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            self._stack.pop()
+            
+            if self.tracing:
+                peak = max(tracemalloc.get_traced_memory()[1], stats['child_peak'])
+                if self._stack:
+                    self._stack[-1]['child_peak'] = max(self._stack[-1]['child_peak'], peak)
+                peak_memory_mb = peak / (1 << 20)
+            else:
+                peak_memory_mb = peak_rss_mb()
+            
+            fields = {key: stats[key] for key in ('rows', 'bytes_read', 'bytes_written', 'message') if key in stats}
+            if stats['failed']:
+                fields['failed'] = True
+            self.emit('end', name, duration=duration, peak_memory_mb=peak_memory_mb, **fields)
+    
+    @contextmanager
+    def run(self):
+        """Apply the profile mode to everything run inside"""
+        started_tracing = False
+        if self.profile == 'cprofile':
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        elif self.profile == 'tracemalloc' and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+        try:
+            yield
+        finally:
+            if self.profiler is not None:
+                self.profiler.disable()
+            if started_tracing:
+                tracemalloc.stop()
+    
+    def phase_totals(self):
+        """Per phase name: how often it ran, total duration, rows, bytes and highest peak memory"""
+        totals = {}
+        for event in self.events:
+            if event['event'] != 'end':
+                continue
+            total = totals.setdefault(event['phase'], {'count': 0, 'duration': 0.0})
+            total['count'] += 1
+            total['duration'] += event['duration']
+            for key in ('rows', 'bytes_read', 'bytes_written'):
+                if key in event:
+                    total[key] = total.get(key, 0) + event[key]
+            if event['peak_memory_mb'] is not None:
+                total['peak_memory_mb'] = max(total.get('peak_memory_mb', 0), event['peak_memory_mb'])
+        return totals
+    
+    def profile_functions(self, limit=PROFILE_TOP_FUNCTIONS):
+        """The functions with the most cumulative time, when profiling with cProfile"""
+        if self.profiler is None:
+            return []
+        stats = pstats.Stats(self.profiler)
+        rows = []
+        for (filename, line, function), (_, calls, total, cumulative, _) in stats.stats.items():
+            rows.append({'function': f"{Path(filename).name}:{line}({function})", 'calls': calls,
+                         'total': total, 'cumulative': cumulative})
+        rows.sort(key=lambda row: row['cumulative'], reverse=True)
+        return rows[:limit]
+    
+    def report(self, **details):
+        """Everything recorded, as a JSON-serializable dict"""
+        return {
+            'started': self.started_at.isoformat(timespec='seconds'),
+            'duration': time.perf_counter() - self.started,
+            'memory': 'tracemalloc' if self.profile == 'tracemalloc' else 'peak_rss',
+            **details,
+            'phases': self.phase_totals(),
+            'events': self.events,
+            'profile': self.profile_functions(),
+        }
+    
+    def write_report(self, path, **details):
+        """Write report() as JSON; with cProfile the raw stats go next to it as .prof"""
+        path = Path(path)
+        path.write_text(json.dumps(self.report(**details), indent=2, default=str), encoding='utf-8')
+        if self.profiler is not None:
+            self.profiler.dump_stats(str(path.with_suffix('.prof')))
+        return path
+
+
+class ProgressChannel:
+    """Carries progress from the cleaning thread to the GUI thread without blocking either
+    
+    Any thread posts messages, and callables to run on the GUI thread; the GUI drains
+    them on a timer, so a burst of messages costs one redraw showing the latest and
+    the worker never waits for the window.
+    """
+    
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+        # Only the latest bar state matters, so it is replaced rather than queued
+        self.progress = (None, None)
+    
+    def post(self, message):
+        self._queue.put(('message', message))
+    
+    def post_progress(self, fraction, eta):
+        """Set the bar state: fraction done and seconds left, each None when unknown"""
+        self.progress = (fraction, eta)
+    
+    def call(self, function):
+        self._queue.put(('call', function))
+    
+    def drain(self):
+        """Everything posted since the last drain: (latest message or None, callables in order)"""
+        message = None
+        calls = []
+        while True:
+            try:
+                kind, item = self._queue.get_nowait()
+            except queue.Empty:
+                return message, calls
+            if kind == 'message':
+                message = item
+            else:
+                calls.append(item)
+
+
+def format_eta(seconds):
+    """Remaining time for the progress window, e.g. 'about 2 min 10 s left'"""
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"about {max(seconds, 1)} s left"
+    if seconds < 3600:
+        return f"about {seconds // 60} min {seconds % 60:02d} s left"
+    return f"about {seconds // 3600} h {seconds % 3600 // 60:02d} min left"
+
+
+class ProgressEstimator:
+    """Fraction done and ETA of the running phase, from progress events with done and total
+    
+    The estimate follows the phase that reported the totals (phases nested in it, like
+    matching inside a pass, do not interrupt it) and clears once that phase ends or a
+    phase beside it starts. The ETA assumes the throughput so far holds for the rest.
+    """
+    
+    def __init__(self):
+        self.fraction = None
+        self.eta = None
+        self._open = []
+        self._depth = None
+        self._started = None
+    
+    def reset(self):
+        self.fraction = None
+        self.eta = None
+        self._depth = None
+    
+    def update(self, event):
+        """Take one run event, return (fraction or None, seconds left or None)"""
+        kind = event['event']
+        if kind == 'start':
+            self._open.append(event['time'])
+            if self._depth is not None and len(self._open) <= self._depth:
+                self.reset()
+        elif kind == 'end':
+            if self._open:
+                self._open.pop()
+            if self._depth is not None and len(self._open) < self._depth:
+                self.reset()
+        elif event.get('total'):
+            if self._depth != len(self._open):
+                self._depth = len(self._open)
+                self._started = self._open[-1] if self._open else event['time']
+            done = event['done']
+            self.fraction = min(done / event['total'], 1.0)
+            elapsed = event['time'] - self._started
+            if done > 0 and elapsed >= ETA_WARMUP_SECONDS:
+                self.eta = elapsed * (1 - self.fraction) / self.fraction
+        return self.fraction, self.eta
@@ -0,0 +1,107 @@
+"""
+Excel Data Cleaner - Parallel rule matching
+Splits the matching of the distinct values of large rule columns between worker processes
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+
+import numpy as np
+
+from cleaner_core import PatternMatcher
+
+
+# Slices per worker, so workers that finish early pick up more, and the smallest slice
+CHUNKS_PER_WORKER = 4
+MIN_CHUNK_VALUES = 10_000
+
+# Worker: matchers by pattern list, compiled once per process
+_matchers = {}
+
+
+def match_values(patterns, values):
+    """Worker: hit flags of a slice of the distinct text of a rule column, and the seconds they took"""
+    started = time.perf_counter()
+    matcher = _matchers.get(tuple(patterns))
+    if matcher is None:
+        matcher = _matchers[tuple(patterns)] = PatternMatcher(patterns)
+    return matcher.match_uniques(values), time.perf_counter() - started
+
+
+def match_parallel(frame, column_positions, rules, workers, min_values=0, progress=None):
+    """Keep mask of frame with the distinct values of the rule columns matched by a pool of worker processes
+
+    Every rule column is factorized once here into the text match_series matches, so the
+    rows are never converted or pickled: only slices of the distinct text go to the
+    workers, and their hit flags come back to be broadcast to the rows through the codes.
+    With fewer than min_values distinct values in all, starting the pool would cost more
+    than it saves and they are matched in this process.
+
+    rules are (column name, sheet column index, PatternMatcher) as compiled by ExcelCleaner, in plan order;
+    progress(done values, total values) is called as slices finish. As in ExcelCleaner.match_rules,
+    each rule only counts the rows the rules before it kept. Returns the keep mask and
+    the (column name, matcher stats and seconds) of each rule.
+    """
+    rows = len(frame)
+    active = [(col_name, column_positions[col_idx], matcher)
+              for col_name, col_idx, matcher in rules if col_idx in column_positions]
+    if not active or not rows:
+        return np.ones(rows, bool), []
+
+    columns = {}
+    for _, position, _ in active:
+        if position not in columns:
+            codes, uniques, _ = PatternMatcher.factorize(frame.iloc[:, position])
+            columns[position] = (codes, uniques)
+
+    hits = [None] * len(active)
+    seconds = [0.0] * len(active)
+    values = sum(len(columns[position][1]) for _, position, _ in active)
+    if workers < 2 or values < min_values:
+        for number, (_, position, matcher) in enumerate(active):
+            started = time.perf_counter()
+            hits[number] = matcher.match_uniques(columns[position][1])
+            seconds[number] = time.perf_counter() - started
+    else:
+        chunk_values = max(-(-values // (workers * CHUNKS_PER_WORKER)), MIN_CHUNK_VALUES)
+        # spawn: the cleaner often runs in a GUI worker thread, which fork does not go well with
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as executor:
+            futures = {}
+            for number, (_, position, matcher) in enumerate(active):
+                uniques = columns[position][1]
+                hits[number] = np.zeros(len(uniques), bool)
+                for start in range(0, len(uniques), chunk_values):
+                    future = executor.submit(match_values, matcher.patterns, uniques.iloc[start:start + chunk_values])
+                    futures[future] = (number, start)
+            done = 0
+            for future in as_completed(futures):
+                number, start = futures[future]
+                chunk_hits, chunk_seconds = future.result()
+                hits[number][start:start + len(chunk_hits)] = chunk_hits
+                seconds[number] += chunk_seconds
+                done += len(chunk_hits)
+                if progress:
+                    progress(done, values)
+
+    keep = np.ones(rows, bool)
+    remaining = None
+    rule_stats = []
+    for number, (col_name, position, _) in enumerate(active):
+        started = time.perf_counter()
+        codes = columns[position][0]
+        if remaining is not None:
+            codes = codes[remaining]
+        # Missing text gets code -1, which picks the trailing False
+        rule_hits = np.append(hits[number], False)[codes]
+        distinct = int(np.count_nonzero(np.bincount(codes[codes >= 0], minlength=len(hits[number]))))
+        if remaining is None:
+            if rule_hits.any():
+                keep &= ~rule_hits
+                remaining = np.flatnonzero(keep)
+        else:
+            keep[remaining[rule_hits]] = False
+            remaining = remaining[~rule_hits]
+        rule_stats.append((col_name, {'rows': len(codes), 'distinct': distinct, 'matched': int(rule_hits.sum()),
+                                      'seconds': seconds[number] + time.perf_counter() - started}))
+    return keep, rule_stats
@@ -0,0 +1,213 @@
+"""
+Excel Data Cleaner - Result cache
+Keeps the outputs of cleaned files so dropping an unchanged export again is instant
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+
+# Bump when the outputs of the engines change, so older entries are not reused
+CACHE_VERSION = 1
+
+# Total size of the stored outputs before the least recently used entries are evicted
+DEFAULT_MAX_BYTES = 1 << 30
+
+# Size of the blocks read while hashing an input file
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def default_cache_dir():
+    """Per-user cache folder, EXCEL_CLEANER_CACHE overrides it"""
+    if os.environ.get("EXCEL_CLEANER_CACHE"):
+        return Path(os.environ["EXCEL_CLEANER_CACHE"])
+    base = os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "ExcelCleaner" / "results"
+
+
+def file_digest(path):
+    """SHA-256 of the file's content"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for block in iter(lambda: source.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def rules_fingerprint(cleaner):
+    """SHA-256 of everything besides the input that decides the outputs: columns, rules, engine, sheets and formats
+    
+    Rules found by header are keyed by their header text; the input's content decides their letters.
+    """
+    settings = {
+        "version": CACHE_VERSION,
+        "columns": cleaner.COLUMNS,
+        "rules": [[col_name, list(patterns)] for col_name, patterns in cleaner.RULES],
+        "engine": cleaner.engine,
+    }
+    if cleaner.RULE_HEADERS:
+        # Only set by rules files naming columns by header, so other keys stay the same
+        settings["rule_headers"] = cleaner.RULE_HEADERS
+    if cleaner.sheets is not None:
+        # Only set for multi-sheet runs, so the keys of first-sheet results stay the same
+        settings["sheets"] = cleaner.sheets
+    if cleaner.output_formats != ("xlsx",):
+        settings["output_formats"] = list(cleaner.output_formats)
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Cleaned (and deleted rows) outputs stored per input content and rule set
+    
+    Every entry is a folder named after its key holding the output files (CLEANED.xlsx,
+    DELETED.csv...) and an entry.json with the row counts. The modification time of
+    entry.json records the last use, and the least recently used entries are evicted
+    beyond max_bytes.
+    """
+    
+    ENTRY_FILE = "entry.json"
+    
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = Path(directory) if directory else default_cache_dir()
+        self.max_bytes = max_bytes
+    
+    def key_for(self, cleaner):
+        """Cache key of a cleaner's input file and settings, or None if the file cannot be read"""
+        try:
+            source_digest = file_digest(cleaner.input_file)
+        except OSError:
+            return None
+        return source_digest[:32] + rules_fingerprint(cleaner)[:32]
+    
+    def stored_name(self, output_path):
+        """Name an output file has in an entry: <name>_CLEANED.csv is stored as CLEANED.csv"""
+        return Path(output_path).name.rsplit("_", 1)[-1]
+    
+    def entries(self):
+        """Folders of the complete entries, least recently used first"""
+        if not self.directory.is_dir():
+            return []
+        entries = []
+        for folder in self.directory.iterdir():
+            if folder.name.startswith("."):
+                continue
+            try:
+                entries.append((os.stat(folder / self.ENTRY_FILE).st_mtime, folder))
+            except OSError:
+                continue
+        return [folder for _, folder in sorted(entries)]
+    
+    def entry_size(self, folder):
+        return sum(path.stat().st_size for path in folder.iterdir() if path.is_file())
+    
+    def size(self):
+        """Total bytes held by the cache"""
+        return sum(self.entry_size(folder) for folder in self.entries())
+    
+    def restore(self, key, cleaner):
+        """Copy a cached result to the cleaner's output paths and set its counts
+        
+        Returns the cleaned output path, or None on a miss (also when the deleted rows
+        file is wanted but the entry was stored without one).
+        """
+        if key is None:
+            return None
+        folder = self.directory / key
+        try:
+            entry = json.loads((folder / self.ENTRY_FILE).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        deleted_file = folder / self.stored_name(cleaner.output_paths("_DELETED")[0])
+        if cleaner.save_deleted and entry["rows_removed"] and not deleted_file.exists():
+            return None
+        
+        output_path = cleaner.output_paths("_CLEANED")[0]
+        try:
+            for path in cleaner.output_paths("_CLEANED"):
+                shutil.copyfile(folder / self.stored_name(path), path)
+            if cleaner.save_deleted and deleted_file.exists():
+                for path in cleaner.output_paths("_DELETED"):
+                    shutil.copyfile(folder / self.stored_name(path), path)
+                cleaner.deleted_output_path = cleaner.output_paths("_DELETED")[0]
+            os.utime(folder / self.ENTRY_FILE)
+        except FileNotFoundError:
+            # Evicted by another process in the meantime
+            return None
+        
+        cleaner.original_row_count = entry["original_row_count"]
+        cleaner.rows_removed = entry["rows_removed"]
+        cleaner.remaining_row_count = entry["remaining_row_count"]
+        cleaner.rule_stats = entry["rule_stats"]
+        cleaner.sheet_stats = entry.get("sheet_stats", {})
+        return output_path
+    
+    def store(self, key, cleaner, output_path):
+        """Add the outputs of a finished cleaner, then evict entries beyond max_bytes"""
+        if key is None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        
+        # Build the entry next to its final place and rename it, so readers
+        # (other worker processes) never see a partial entry
+        staging = Path(tempfile.mkdtemp(prefix=".staging-", dir=self.directory))
+        try:
+            for path in cleaner.output_paths("_CLEANED"):
+                shutil.copyfile(path, staging / self.stored_name(path))
+            if cleaner.deleted_output_path is not None:
+                for path in cleaner.output_paths("_DELETED"):
+                    shutil.copyfile(path, staging / self.stored_name(path))
+            entry = {
+                "source": str(cleaner.input_file),
+                "source_digest": key[:32],
+                "stored": time.time(),
+                "original_row_count": cleaner.original_row_count,
+                "rows_removed": cleaner.rows_removed,
+                "remaining_row_count": cleaner.remaining_row_count,
+                "rule_stats": cleaner.rule_stats,
+                "sheet_stats": cleaner.sheet_stats,
+            }
+            (staging / self.ENTRY_FILE).write_text(json.dumps(entry), encoding="utf-8")
+            
+            folder = self.directory / key
+            shutil.rmtree(folder, ignore_errors=True)
+            os.replace(staging, folder)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            return
+        self.evict()
+    
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = self.entries()
+        sizes = {folder: self.entry_size(folder) for folder in entries}
+        total = sum(sizes.values())
+        for folder in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(folder, ignore_errors=True)
+            total -= sizes[folder]
+    
+    def invalidate(self, input_file):
+        """Remove every entry of the given input file's current content, returns how many"""
+        source_digest = file_digest(input_file)[:32]
+        removed = 0
+        for folder in self.entries():
+            if folder.name.startswith(source_digest):
+                shutil.rmtree(folder, ignore_errors=True)
+                removed += 1
+        return removed
+    
+    def clear(self):
+        """Remove all entries (and leftovers of interrupted stores), returns how many entries"""
+        entries = self.entries()
+        for folder in entries:
+            shutil.rmtree(folder, ignore_errors=True)
+        if self.directory.is_dir():
+            for folder in self.directory.glob(".staging-*"):
+                shutil.rmtree(folder, ignore_errors=True)
+        return len(entries)
@@ -0,0 +1,137 @@
+"""
+Excel Data Cleaner - Row decision index
+Remembers the keep/remove decision of every row seen before, for incremental runs
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from result_cache import default_cache_dir, rules_fingerprint
+
+
+# Column hash of empty cells, which never match, so they cannot share a
+# fingerprint with a cell holding the text "nan"
+MISSING_HASH = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+# Multiplier folding the column hashes of a row into one fingerprint
+FINGERPRINT_PRIME = np.uint64(0x100000001B3)
+
+# Rows remembered per rule set; the rows not seen for the most runs go first
+DEFAULT_MAX_ENTRIES = 5_000_000
+
+
+def default_index_dir():
+    """Folder of the row indexes, next to the result cache"""
+    return default_cache_dir().parent / "row_index"
+
+
+def row_fingerprints(frame, positions):
+    """64-bit fingerprint per row of the rule cell text at the given column positions
+    
+    The rules only look at str(value) of those cells, so rows with equal text in
+    them always get the same decision, whatever the other columns hold.
+    """
+    fingerprints = np.zeros(len(frame), np.uint64)
+    for position in positions:
+        series = frame.iloc[:, position]
+        text = series.astype(object).astype(str).to_numpy(dtype=object)
+        hashes = pd.util.hash_array(text, categorize=False)
+        hashes[series.isna().to_numpy()] = MISSING_HASH
+        fingerprints = fingerprints * FINGERPRINT_PRIME ^ hashes
+    return fingerprints
+
+
+class RowIndex:
+    """Persistent map of row fingerprint to keep decision for one rule set
+    
+    Stored as sorted arrays in a .npz file; every run bumps a generation counter
+    and entries remember the last generation they were used in.
+    """
+    
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.fingerprints, self.keep, self.last_used, generation = self._read()
+        self.generation = generation + 1
+        self._new_fingerprints = []
+        self._new_keep = []
+    
+    @classmethod
+    def for_cleaner(cls, cleaner, directory=None, max_entries=DEFAULT_MAX_ENTRIES):
+        """The index of the cleaner's columns, rules and engine"""
+        directory = Path(directory) if directory else default_index_dir()
+        return cls(directory / f"{rules_fingerprint(cleaner)[:32]}.npz", max_entries)
+    
+    def _read(self):
+        try:
+            with np.load(self.path) as data:
+                return data["fingerprints"], data["keep"], data["last_used"], int(data["generation"])
+        except (OSError, KeyError, ValueError):
+            return np.empty(0, np.uint64), np.empty(0, bool), np.empty(0, np.uint32), 0
+    
+    def __len__(self):
+        return len(self.fingerprints)
+    
+    def lookup(self, fingerprints):
+        """Return (known, keep) boolean arrays; keep is only meaningful where known is True"""
+        if not len(self.fingerprints):
+            return np.zeros(len(fingerprints), bool), np.ones(len(fingerprints), bool)
+        # Searching in sorted order keeps the binary searches cache friendly
+        order = np.argsort(fingerprints)
+        positions = np.empty(len(fingerprints), np.intp)
+        positions[order] = np.searchsorted(self.fingerprints, fingerprints[order])
+        positions[positions == len(self.fingerprints)] = 0
+        known = self.fingerprints[positions] == fingerprints
+        self.last_used[positions[known]] = self.generation
+        keep = np.where(known, self.keep[positions], True)
+        return known, keep
+    
+    def add(self, fingerprints, keep):
+        """Remember the decisions of newly evaluated rows (written by save)"""
+        self._new_fingerprints.append(np.asarray(fingerprints, np.uint64))
+        self._new_keep.append(np.asarray(keep, bool))
+    
+    def save(self):
+        """Merge the new decisions into the index file, dropping the least recently used beyond max_entries"""
+        fingerprints = np.concatenate([self.fingerprints] + self._new_fingerprints)
+        keep = np.concatenate([self.keep] + self._new_keep)
+        last_used = np.concatenate(
+            [self.last_used] + [np.full(len(new), self.generation, np.uint32) for new in self._new_fingerprints]
+        )
+        
+        # One entry per fingerprint, the newest wins
+        order = np.lexsort((-last_used.astype(np.int64), fingerprints))
+        fingerprints, keep, last_used = fingerprints[order], keep[order], last_used[order]
+        first = np.ones(len(fingerprints), bool)
+        first[1:] = fingerprints[1:] != fingerprints[:-1]
+        fingerprints, keep, last_used = fingerprints[first], keep[first], last_used[first]
+        
+        if len(fingerprints) > self.max_entries:
+            newest = np.sort(np.argsort(-last_used.astype(np.int64), kind="stable")[:self.max_entries])
+            fingerprints, keep, last_used = fingerprints[newest], keep[newest], last_used[newest]
+        
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        handle, temp_path = tempfile.mkstemp(suffix=".npz", dir=self.path.parent)
+        try:
+            with os.fdopen(handle, "wb") as target:
+                np.savez(target, fingerprints=fingerprints, keep=keep, last_used=last_used,
+                         generation=np.int64(self.generation))
+            os.replace(temp_path, self.path)
+        except OSError:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+        
+        self.fingerprints, self.keep, self.last_used = fingerprints, keep, last_used
+        self._new_fingerprints = []
+        self._new_keep = []
+    
+    def clear(self):
+        """Forget every decision"""
+        self.path.unlink(missing_ok=True)
+        self.fingerprints = np.empty(0, np.uint64)
+        self.keep = np.empty(0, bool)
+        self.last_used = np.empty(0, np.uint32)
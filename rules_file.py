@@ -0,0 +1,115 @@
+"""
+Excel Data Cleaner - Rules files
+Reads the columns and patterns of the cleaning rules from a JSON or YAML file
+"""
+
+import json
+import re
+from pathlib import Path
+
+from cleaner_core import RulesError
+
+try:
+    import yaml  # PyYAML, only needed for .yaml and .yml rules files
+except ImportError:
+    yaml = None
+
+
+# Excel column letters
+COLUMN_LETTER_RE = re.compile(r"[A-Z]{1,3}")
+
+# Prefixes of the short form's keys saying whether they are a column letter or a header
+SHORT_KEY_RE = re.compile(r"(column|header):(.*)", re.S)
+
+
+def parse_rules(path):
+    """The data of a rules file, YAML for .yaml and .yml files and JSON otherwise"""
+    try:
+        text = Path(path).read_text(encoding="utf-8-sig")
+    except OSError as e:
+        raise RulesError(f"Cannot read the rules file:\n{e}", path)
+    
+    if Path(path).suffix.lower() in (".yaml", ".yml"):
+        if yaml is None:
+            raise RulesError("YAML rules files need the PyYAML package: pip install pyyaml", path)
+        try:
+            return yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise RulesError(f"The rules file is not valid YAML:\n{e}", path)
+    try:
+        return json.loads(text)
+    except ValueError as e:
+        raise RulesError(f"The rules file is not valid JSON:\n{e}", path)
+
+
+def short_rule(key, patterns, path):
+    """The rule of one key of the short form, see load_rules"""
+    key = str(key)
+    prefixed = SHORT_KEY_RE.fullmatch(key)
+    if prefixed:
+        return {prefixed.group(1): prefixed.group(2).strip(), "patterns": patterns}
+    if COLUMN_LETTER_RE.fullmatch(key.strip().upper()):
+        raise RulesError(f"'{key}' in the rules file could be a column letter or a header, "
+                         f"write 'column:{key}' or 'header:{key}'", path)
+    return {"header": key, "patterns": patterns}
+
+
+def load_rules(path):
+    """(COLUMNS, RULES, RULE_HEADERS) for ExcelCleaner from a rules file
+    
+    The file holds a list of rules under "rules", each with its "patterns" and
+    either a "column" letter or a "header" text, and optionally a "name" (the
+    column letter or header by default). For short, it can instead map each column
+    letter or header text straight to its patterns:
+        
+        {"column:BV": ["FOC"], "Buyer PO Number": ["test", "testing", "FOC"], "header:ID": ["test"]}
+    
+    A key without a prefix is a header; one that could also be a column letter
+    ("ID", "SKU") raises RulesError unless "column:" or "header:" says which.
+    
+    Rules are applied in the order of the file until the evaluation plan reorders them.
+    """
+    data = parse_rules(path)
+    if isinstance(data, dict) and "rules" in data:
+        entries = data["rules"]
+    elif isinstance(data, dict):
+        entries = [short_rule(key, patterns, path) for key, patterns in data.items()]
+    else:
+        raise RulesError('The rules file must hold a "rules" list or a mapping of columns to patterns', path)
+    if not isinstance(entries, list) or not entries:
+        raise RulesError('The "rules" of the rules file must be a list of at least one rule', path)
+    
+    columns = {}
+    headers = {}
+    places = {}
+    rules = []
+    for number, entry in enumerate(entries, start=1):
+        if not isinstance(entry, dict):
+            raise RulesError(f"Rule {number} of the rules file is not a mapping", path)
+        column = entry.get("column")
+        header = entry.get("header")
+        if (column is None) == (header is None):
+            raise RulesError(f'Rule {number} of the rules file needs either a "column" letter or a "header"', path)
+        if column is not None:
+            column = str(column).strip().upper()
+            if not COLUMN_LETTER_RE.fullmatch(column):
+                raise RulesError(f"Rule {number} of the rules file has no column letter like H or BV: "
+                                 f"'{entry['column']}'", path)
+        else:
+            header = str(header)
+        
+        patterns = entry.get("patterns")
+        if isinstance(patterns, (str, int, float)):
+            patterns = [patterns]
+        if not isinstance(patterns, list) or not all(isinstance(pattern, (str, int, float)) for pattern in patterns):
+            raise RulesError(f'The "patterns" of rule {number} of the rules file must be a list of text', path)
+        
+        col_name = str(entry.get("name") or column or header)
+        if places.setdefault(col_name, (column, header)) != (column, header):
+            raise RulesError(f"Rule {number} of the rules file gives '{col_name}' a second column", path)
+        if column is not None:
+            columns[col_name] = column
+        else:
+            headers[col_name] = header
+        rules.append((col_name, [str(pattern) for pattern in patterns]))
+    return columns, rules, headers
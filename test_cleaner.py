@@ -128,9 +128,963 @@ def test_cleaning_logic():
     
     return True
 
+def test_vectorized_matching():
+    """Check the compiled column matchers agree with contains_pattern cell by cell"""
+    from datetime import datetime
+    from excel_cleaner import ExcelCleaner, PatternMatcher
+    
+    cleaner = ExcelCleaner("unused.xlsx")
+    values = [None, float('nan'), pd.NaT, "FOC-PO", "xfocx", "M880123", "GB Order",
+              12, 12.5, 1.0, True, datetime(2024, 1, 1), "", "nan", "Valid"]
+    series = pd.Series(values, dtype=object)
+    
+    for _, patterns in ExcelCleaner.RULES + [('Extra', ['.0', '00:00', 'nan']), ('Empty', [])]:
+        matcher = PatternMatcher(patterns)
+        expected = [cleaner.contains_pattern(v, patterns) for v in values]
+        assert list(matcher.match_series(series)) == expected, patterns
+        assert [matcher.matches(v) for v in values] == expected, patterns
+    
+    # Repeated values are only matched once per distinct value
+    matcher = PatternMatcher(['FOC'])
+    hits = matcher.match_series(pd.Series(["FOC-1", "PO-2", "PO-2", None, "FOC-1", "PO-2"]))
+    assert list(hits) == [True, False, False, False, True, False]
+    assert matcher.stats == {'rows': 6, 'distinct': 2, 'matched': 2}
+    
+    print("✓ Vectorized matching agrees with contains_pattern")
+    return True
+
+def test_aho_corasick():
+    """Check the Aho-Corasick automaton (pure Python and, if installed, pyahocorasick) agrees with contains_pattern"""
+    import random
+    import aho_corasick
+    from excel_cleaner import ExcelCleaner, PatternMatcher
+    
+    cleaner = ExcelCleaner("unused.xlsx")
+    rng = random.Random(1)
+    values = ["ushers", "his hers", "she", "h", "", "ÄBC-ß", None, 12, 12.5, "nan"]
+    values += ["".join(rng.choices("abhrsüÄ-", k=rng.randint(0, 12))) for _ in range(300)]
+    series = pd.Series(values, dtype=object)
+    
+    pattern_lists = [['he', 'she', 'his', 'hers'], ['ab', 'b', 'bab', 'Ä-'], ['x'], ['', 'zz']]
+    pattern_lists.append(["".join(rng.choices("abhrsüÄ-", k=rng.randint(2, 5)))
+                          for _ in range(PatternMatcher.AUTOMATON_MIN_PATTERNS)])
+    native = aho_corasick.ahocorasick
+    try:
+        for module in {None, native}:
+            aho_corasick.ahocorasick = module
+            for patterns in pattern_lists:
+                automaton = aho_corasick.Automaton([pattern.lower() for pattern in patterns])
+                expected = [cleaner.contains_pattern(v, patterns) for v in values]
+                found = [not pd.isna(v) and automaton.search(str(v).lower()) for v in values]
+                assert found == expected, patterns
+            
+            # Long lists switch PatternMatcher to the automaton, with the same hits as the regex
+            matcher = PatternMatcher(pattern_lists[-1])
+            assert matcher.automaton is not None and matcher.regex is None
+            assert list(matcher.match_series(series)) == [cleaner.contains_pattern(v, pattern_lists[-1]) for v in values]
+    finally:
+        aho_corasick.ahocorasick = native
+    
+    print("✓ Aho-Corasick matching agrees with contains_pattern")
+    return True
+
+def run_engine(test_file, engine, save_deleted=True, **options):
+    """Run one engine on test_file and return (cleaner, cleaned frame, deleted frame)"""
+    from excel_cleaner import ExcelCleaner
+    
+    cleaner = ExcelCleaner(test_file, save_deleted=save_deleted, engine=engine, **options)
+    output_path = cleaner.process()
+    assert output_path, f"{engine} engine failed"
+    deleted_path = cleaner.save_deleted_file()
+    cleaned = pd.read_excel(output_path)
+    deleted = pd.read_excel(deleted_path) if deleted_path else None
+    return cleaner, cleaned, deleted
+
+def test_projected_engine():
+    """Check the projected engine removes exactly the rows the pandas engine does"""
+    test_file = create_test_excel()
+    
+    expected_cleaner, expected_cleaned, expected_deleted = run_engine(test_file, 'pandas')
+    cleaner, cleaned, deleted = run_engine(test_file, 'projected')
+    
+    assert cleaner.original_row_count == expected_cleaner.original_row_count
+    assert cleaner.rows_removed == expected_cleaner.rows_removed
+    assert cleaner.remaining_row_count == len(expected_cleaned)
+    pd.testing.assert_frame_equal(cleaned, expected_cleaned)
+    pd.testing.assert_frame_equal(deleted, expected_deleted)
+    
+    # Numbers in a column with blanks: pandas reads them as floats, the projected engine
+    # only the rule cells and the chunked engines a chunk at a time, yet 12 is "12" to all
+    from openpyxl import Workbook
+    from excel_cleaner import ExcelCleaner
+    
+    class OrderCleaner(ExcelCleaner):
+        COLUMNS = {'Order': 'B'}
+        RULES = [('Order', ['2.0', '20', '5.5'])]
+    
+    workbook = Workbook()
+    workbook.active.append(['Line', 'Order'])
+    for line, order in enumerate([12, None, 120, None, 5.5, 7, 3, None, 12, 8], start=1):
+        workbook.active.append([line, order])
+    numbers_file = Path("test_sample_numbers.xlsx")
+    workbook.save(numbers_file)
+    removed = {}
+    for engine, chunk_size in [('pandas', 10000), ('projected', 10000), ('streaming', 2), ('xml', 2), ('xml', 3)]:
+        numbers = OrderCleaner(numbers_file, engine=engine, chunk_size=chunk_size)
+        assert numbers.process()
+        removed[engine, chunk_size] = (numbers.rows_removed, numbers.rule_stats['Order']['rows'])
+    assert set(removed.values()) == {(2, 10)}, removed
+    for path in Path(".").glob("test_sample_numbers*"):
+        path.unlink()
+    
+    print(f"✓ Projected engine matches pandas engine ({cleaner.rows_removed} rows removed)")
+    return True
+
+def test_streaming_engine():
+    """Check the streaming engine gives the pandas engine's result, also across chunk boundaries"""
+    test_file = create_test_excel()
+    
+    expected_cleaner, expected_cleaned, expected_deleted = run_engine(test_file, 'pandas')
+    cleaner, cleaned, deleted = run_engine(test_file, 'streaming', chunk_size=4)
+    
+    assert cleaner.original_row_count == expected_cleaner.original_row_count
+    assert cleaner.rows_removed == expected_cleaner.rows_removed
+    pd.testing.assert_frame_equal(cleaned, expected_cleaned)
+    pd.testing.assert_frame_equal(deleted, expected_deleted)
+    
+    print(f"✓ Streaming engine matches pandas engine ({cleaner.rows_removed} rows removed)")
+    return True
+
+def test_xml_engine():
+    """Check the raw XML engine removes the pandas engine's rows and keeps the formatting"""
+    from openpyxl import load_workbook
+    
+    test_file = create_test_excel()
+    
+    # Give the source some formatting the DataFrame round-trip would lose
+    workbook = load_workbook(test_file)
+    workbook.active.column_dimensions['H'].width = 42
+    workbook.save(test_file)
+    
+    expected_cleaner, expected_cleaned, expected_deleted = run_engine(test_file, 'pandas')
+    cleaner, cleaned, deleted = run_engine(test_file, 'xml', chunk_size=4)
+    
+    assert cleaner.original_row_count == expected_cleaner.original_row_count
+    assert cleaner.rows_removed == expected_cleaner.rows_removed
+    pd.testing.assert_frame_equal(cleaned, expected_cleaned)
+    pd.testing.assert_frame_equal(deleted, expected_deleted)
+    
+    output = load_workbook(cleaner.get_output_path("_CLEANED.xlsx"))
+    assert output.active.column_dimensions['H'].width == 42
+    
+    print(f"✓ XML engine matches pandas engine and keeps formatting ({cleaner.rows_removed} rows removed)")
+    return True
+
+def test_xml_engine_ranges():
+    """Check the XML engine moves merged cells, hyperlinks and other ranges up with the kept rows"""
+    from openpyxl import Workbook, load_workbook
+    from openpyxl.formatting.rule import CellIsRule
+    from openpyxl.workbook.defined_name import DefinedName
+    from openpyxl.worksheet.table import Table
+    from openpyxl.styles import PatternFill
+    from openpyxl.worksheet.datavalidation import DataValidation
+    from cleaner_core import ExcelCleaner
+    
+    workbook = Workbook()
+    sheet = workbook.active
+    for column in range(1, 75):
+        sheet.cell(1, column, f"Col_{column}")
+    for row in range(2, 13):
+        sheet.cell(row, 1, f"row {row}")
+        sheet.cell(row, 8, "Test Order" if row in (3, 4, 5) else f"Order {row}")
+    sheet.merge_cells("A8:B9")
+    sheet.merge_cells("A4:B4")  # On a removed row
+    sheet["C10"] = "link"
+    sheet["C10"].hyperlink = "https://example.com"
+    sheet.conditional_formatting.add("D10:D11", CellIsRule(operator='greaterThan', formula=['1'],
+                                                           fill=PatternFill(bgColor="FF0000")))
+    validation = DataValidation(type="list", formula1='"x,y"')
+    validation.add("E3:E4")  # Removed rows only
+    sheet.add_data_validation(validation)
+    sheet.auto_filter.ref = "A1:BV12"
+    sheet["F2"] = "=LEN(A2)"  # Before the first removed row
+    sheet["F10"] = "=LEN(A10)"
+    ranges_file = Path("test_sample_ranges.xlsx")
+    workbook.save(ranges_file)
+    
+    cleaner = ExcelCleaner(ranges_file, engine='xml')
+    assert cleaner.process() is not None and cleaner.rows_removed == 3
+    output = load_workbook(cleaner.get_output_path("_CLEANED.xlsx")).active
+    assert [str(merged) for merged in output.merged_cells.ranges] == ["A5:B6"]
+    assert output["A5"].value == "row 8"
+    assert output["C7"].value == "link" and output["C7"].hyperlink.target == "https://example.com"
+    assert [str(cf.sqref) for cf in output.conditional_formatting] == ["D7:D8"]
+    assert output.data_validations.dataValidation == []
+    assert output.auto_filter.ref == "A1:BV9"
+    # Formulas are only replaced by their cached values (none here) after the first removed row
+    assert output["F2"].value == "=LEN(A2)" and output["F7"].value is None
+    
+    # A table, the print area and a defined name over the rows shrink with them too
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "PO Lines"
+    for column in range(1, 75):
+        sheet.cell(1, column, f"Col_{column}")
+    for row in range(2, 12):
+        sheet.cell(row, 8, "Test Order" if row in (3, 4) else f"Order {row}")
+    sheet.add_table(Table(displayName="Orders", ref="A1:BV11"))
+    sheet.print_area = "A1:BV11"
+    workbook.defined_names["OrderColumn"] = DefinedName("OrderColumn", attr_text="'PO Lines'!$H$2:$H$11")
+    workbook.defined_names["TestRows"] = DefinedName("TestRows", attr_text="'PO Lines'!$H$3:$H$4")
+    workbook.save(ranges_file)
+    
+    cleaner = ExcelCleaner(ranges_file, engine='xml')
+    assert cleaner.process() is not None and cleaner.rows_removed == 2
+    workbook = load_workbook(cleaner.get_output_path("_CLEANED.xlsx"))
+    output = workbook["PO Lines"]
+    assert output.tables["Orders"].ref == "A1:BV9"
+    assert output.tables["Orders"].autoFilter.ref == "A1:BV9"
+    assert output.print_area == "'PO Lines'!$A$1:$BV$9"
+    assert workbook.defined_names["OrderColumn"].attr_text == "'PO Lines'!$H$2:$H$9"
+    assert workbook.defined_names["TestRows"].attr_text == "'PO Lines'!#REF!"
+    
+    for path in Path(".").glob("test_sample_ranges*"):
+        path.unlink()
+    
+    print("✓ XML engine moves merged cells, hyperlinks, formats, tables and names with their rows")
+    return True
+
+def test_batch_cli():
+    """Clean a directory of files with the command line entry point and two workers"""
+    import shutil
+    import tempfile
+    from cleaner_cli import collect_files, main
+    
+    test_file = create_test_excel()
+    
+    with tempfile.TemporaryDirectory() as folder:
+        for region in ("north", "south", "east"):
+            shutil.copy(test_file, Path(folder) / f"{region}.xlsx")
+        
+        assert main([folder, "--workers", "2", "--save-deleted", "--no-cache"]) == 0
+        
+        for region in ("north", "south", "east"):
+            assert (Path(folder) / f"{region}_CLEANED.xlsx").exists()
+            assert (Path(folder) / f"{region}_DELETED.xlsx").exists()
+        
+        # Outputs of a previous run are not picked up again
+        assert len(collect_files([folder])) == 3
+    
+    print("✓ Batch command line cleaned all files")
+    return True
+
+def test_headless_core():
+    """Check the core imports without tkinter and reports errors as CleanerError objects"""
+    import subprocess
+    from cleaner_core import ExcelCleaner, ReadError, MissingColumnsError
+    
+    script = "import sys, excel_cleaner, cleaner_cli; assert 'tkinter' not in sys.modules"
+    subprocess.run([sys.executable, "-c", script], check=True, cwd=Path(__file__).parent)
+    
+    cleaner = ExcelCleaner("does_not_exist.xlsx")
+    assert cleaner.process() is None
+    assert isinstance(cleaner.errors[0], ReadError)
+    
+    narrow_file = Path("test_sample_narrow.xlsx")
+    pd.DataFrame({'Order': ['test', 'ok']}).to_excel(narrow_file, index=False)
+    try:
+        ExcelCleaner(narrow_file, raise_errors=True).process()
+        assert False, "missing columns were not reported"
+    except MissingColumnsError as error:
+        assert len(error.missing_columns) == len(ExcelCleaner.COLUMNS)
+    
+    print("✓ Core runs headless with structured errors")
+    return True
+
+def test_result_cache():
+    """Check a second run of the same file comes from the cache, and rule changes miss it"""
+    import tempfile
+    from cleaner_core import ExcelCleaner
+    from result_cache import ResultCache
+    
+    test_file = create_test_excel()
+    
+    with tempfile.TemporaryDirectory() as folder:
+        cache = ResultCache(folder)
+        first = ExcelCleaner(test_file, save_deleted=True, cache=cache)
+        output_path = first.process()
+        assert not first.cache_hit
+        
+        output_path.unlink()
+        second = ExcelCleaner(test_file, save_deleted=True, cache=cache)
+        assert second.process() == output_path and second.cache_hit
+        assert output_path.exists() and second.deleted_output_path.exists()
+        assert (second.original_row_count, second.rows_removed) == (first.original_row_count, first.rows_removed)
+        
+        class StricterCleaner(ExcelCleaner):
+            RULES = ExcelCleaner.RULES + [('Comment', ['Normal'])]
+        
+        stricter = StricterCleaner(test_file, cache=cache)
+        stricter.process()
+        assert not stricter.cache_hit and stricter.rows_removed == first.rows_removed + 1
+        assert len(cache.entries()) == 2
+        
+        # 'auto' is keyed by the engine it picks, so the pandas result is not served to the xml engine
+        chunked = ExcelCleaner(test_file, cache=cache, memory_budget_mb=0)
+        chunked.process()
+        assert chunked.engine == 'xml' and not chunked.cache_hit
+        assert len(cache.entries()) == 3
+        
+        # Shrinking the limit evicts the least recently used entries
+        cache.max_bytes = cache.size() - 1
+        cache.evict()
+        assert len(cache.entries()) == 2
+        
+        assert cache.invalidate(test_file) == 2
+        assert cache.entries() == []
+    
+    print("✓ Result cache reuses outputs and follows rule changes")
+    return True
+
+def test_frame_cache():
+    """Check a second load of an unchanged file comes from the frame cache and a changed file replaces its entry"""
+    import os
+    import tempfile
+    from cleaner_core import ExcelCleaner, pyarrow_available
+    from frame_cache import FrameCache
+    
+    test_file = create_test_excel()
+    
+    with tempfile.TemporaryDirectory() as folder:
+        frame_cache = FrameCache(folder)
+        first = ExcelCleaner(test_file, engine='pandas', frame_cache=frame_cache)
+        first.process()
+        assert not first.frame_cache_hit and len(frame_cache.entries()) == 1
+        
+        class StricterCleaner(ExcelCleaner):
+            RULES = ExcelCleaner.RULES + [('Comment', ['Normal'])]
+        
+        stricter = StricterCleaner(test_file, engine='pandas', frame_cache=frame_cache)
+        stricter.process()
+        assert stricter.frame_cache_hit and stricter.rows_removed == first.rows_removed + 1
+        pd.testing.assert_frame_equal(stricter.df, first.df)
+        
+        # A changed file misses, and its new frame replaces the old one
+        stat = test_file.stat()
+        os.utime(test_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        changed = ExcelCleaner(test_file, engine='pandas', frame_cache=frame_cache)
+        changed.process()
+        assert not changed.frame_cache_hit and len(frame_cache.entries()) == 1
+        
+        # Frames are stored as Arrow with pyarrow and pickled without it, and load back the same
+        entry = frame_cache.entries()[0]
+        assert entry.suffix == ('.arrow' if pyarrow_available() else '.pkl')
+        assert frame_cache.load(entry.name.split('.')[0]).equals(changed.df)
+        
+        # Columns mixing numbers and text are kept exactly (pickled rather than Arrow)
+        mixed = pd.DataFrame({'Code': [1, 'FOC', None, 2.5]})
+        key = frame_cache.key_for(test_file, 'Mixed')
+        frame_cache.store(key, mixed)
+        assert (frame_cache.directory / (key + '.pkl')).exists()
+        assert frame_cache.load(key)['Code'].tolist()[:2] == [1, 'FOC']
+        
+        # Frames read with other reader options (compact CSV text) are cached apart
+        assert (frame_cache.key_for(test_file, options={'dtype': 'str'})
+                != frame_cache.key_for(test_file, options={'dtype': 'string[pyarrow]'}))
+        
+        assert frame_cache.clear() == 2 and frame_cache.entries() == []
+    
+    print("✓ Frame cache reloads unchanged files and drops changed ones")
+    return True
+
+def test_incremental_mode():
+    """Check a second run reuses every row decision and only new rows are matched"""
+    import tempfile
+    from cleaner_core import ExcelCleaner
+    
+    test_file = create_test_excel()
+    
+    with tempfile.TemporaryDirectory() as folder:
+        first = ExcelCleaner(test_file, incremental=True, index_dir=folder)
+        first.process()
+        assert first.rows_reused == 0
+        
+        second = ExcelCleaner(test_file, incremental=True, index_dir=folder)
+        second.process()
+        assert second.rows_reused == second.original_row_count
+        assert second.rows_removed == first.rows_removed
+        
+        # Append one new row that must be removed
+        df = pd.read_excel(test_file)
+        new_row = df.iloc[[0]].copy()
+        new_row.iloc[0, 7] = "Testing appended"
+        pd.concat([df, new_row], ignore_index=True).to_excel(test_file, index=False)
+        
+        third = ExcelCleaner(test_file, incremental=True, index_dir=folder)
+        third.process()
+        assert third.rows_reused == first.original_row_count
+        assert third.rows_removed == first.rows_removed + 1
+    
+    print("✓ Incremental mode reuses earlier row decisions")
+    return True
+
+def test_run_events():
+    """Check every phase reports start and end events and the run report is written"""
+    import json
+    from cleaner_core import ExcelCleaner
+    
+    test_file = create_test_excel()
+    events = []
+    messages = []
+    cleaner = ExcelCleaner(test_file, messages.append, save_deleted=True, event_callback=events.append,
+                           profile='tracemalloc', save_report=True)
+    cleaner.process()
+    
+    ends = {event['phase']: event for event in events if event['event'] == 'end'}
+    assert set(ends) == {'preflight', 'read', 'validate', 'match', 'write'}
+    assert all(event['duration'] >= 0 and event['peak_memory_mb'] > 0 for event in ends.values())
+    assert ends['read']['rows'] == cleaner.original_row_count
+    assert ends['read']['bytes_read'] == Path(test_file).stat().st_size
+    assert ends['write']['bytes_written'] > 0
+    
+    # The progress messages are the messages of the events
+    assert messages == [event['message'] for event in events if event.get('message')]
+    assert messages[0] == "Checking file..." and messages[-1] == "File saved successfully!"
+    
+    report = json.loads(cleaner.report_path.read_text(encoding='utf-8'))
+    assert report['phases']['write']['rows'] == cleaner.original_row_count
+    assert len(report['events']) == len(events)
+    cleaner.report_path.unlink()
+    
+    print("✓ Run events and report recorded")
+    return True
+
+def test_progress_channel():
+    """Check messages posted from a worker thread coalesce to the latest one, with calls kept in order"""
+    import threading
+    from instrumentation import ProgressChannel
+    
+    channel = ProgressChannel()
+    assert channel.drain() == (None, [])
+    
+    def worker():
+        for number in range(1000):
+            channel.post(f"Processed {number} rows...")
+        channel.call(print)
+        channel.call(len)
+    
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+    
+    message, calls = channel.drain()
+    assert message == "Processed 999 rows..."
+    assert calls == [print, len]
+    assert channel.drain() == (None, [])
+    
+    print("✓ Progress channel coalesces worker messages")
+    return True
+
+def test_progress_estimate():
+    """Check chunked engines report done/total progress and the estimator turns it into a fraction and ETA"""
+    from cleaner_core import ExcelCleaner
+    from instrumentation import ProgressEstimator
+    
+    estimator = ProgressEstimator()
+    start = {'event': 'start', 'phase': 'clean', 'time': 0.0}
+    assert estimator.update(start) == (None, None)
+    fraction, eta = estimator.update({'event': 'progress', 'phase': 'clean', 'time': 10.0, 'done': 25, 'total': 100})
+    assert fraction == 0.25 and abs(eta - 30.0) < 1e-9
+    # Phases nested in the measured one keep the estimate, its end clears it
+    estimator.update({'event': 'start', 'phase': 'match', 'time': 10.0})
+    assert estimator.update({'event': 'end', 'phase': 'match', 'time': 11.0})[0] == 0.25
+    assert estimator.update({'event': 'end', 'phase': 'clean', 'time': 12.0}) == (None, None)
+    
+    test_file = create_test_excel()
+    for engine in ('projected', 'streaming', 'xml'):
+        events = []
+        ExcelCleaner(test_file, engine=engine, chunk_size=2, event_callback=events.append).process()
+        totals = [event for event in events if event['event'] == 'progress' and event.get('total')]
+        assert totals, engine
+        assert all(0 <= event['done'] <= event['total'] for event in totals), engine
+    
+    print("✓ Progress fractions and ETA estimated")
+    return True
+
+def test_preflight():
+    """Check the pre-flight step estimates the rows and rejects missing columns before the full load"""
+    from cleaner_core import ExcelCleaner, MissingColumnsError
+    
+    test_file = create_test_excel()
+    cleaner = ExcelCleaner(test_file)
+    assert cleaner.preflight()
+    # The sheet declares 20 data rows, the last 3 blank ones are dropped by pandas later
+    assert cleaner.estimated_rows == 20
+    assert cleaner.estimated_memory_mb > 0
+    
+    # Drop columns BO onwards: the file is rejected without loading it
+    narrow_file = "test_sample_narrow.xlsx"
+    pd.read_excel(test_file).iloc[:, :60].to_excel(narrow_file, index=False)
+    events = []
+    cleaner = ExcelCleaner(narrow_file, event_callback=events.append)
+    assert cleaner.process() is None
+    assert isinstance(cleaner.errors[0], MissingColumnsError)
+    assert 'read' not in {event['phase'] for event in events}
+    Path(narrow_file).unlink()
+    
+    print("✓ Pre-flight check rejects missing columns early")
+    return True
+
+def test_auto_engine():
+    """Check engine='auto' keeps pandas within the memory budget and switches to the chunked xml engine beyond it"""
+    from cleaner_core import ExcelCleaner
+    
+    test_file = create_test_excel()
+    
+    roomy = ExcelCleaner(test_file, save_deleted=True, memory_budget_mb=1024)
+    assert roomy.process() is not None
+    assert roomy.engine == 'pandas' and "within" in roomy.engine_reason
+    
+    tight = ExcelCleaner(test_file, save_deleted=True, memory_budget_mb=0)
+    assert tight.process() is not None
+    assert tight.engine == 'xml' and "over" in tight.engine_reason
+    assert tight.rows_removed == roomy.rows_removed
+    
+    print("✓ Auto engine follows the memory budget")
+    return True
+
+def test_parallel_matching():
+    """Check matching the distinct values in worker processes gives the serial keep mask and stats"""
+    from cleaner_core import ExcelCleaner
+    from parallel_match import match_parallel
+    
+    test_file = create_test_excel()
+    df = pd.read_excel(test_file, dtype=object)
+    df.iloc[3, 66] = 12.5
+    df.iloc[4, 8] = "Ünïcode FOC"
+    
+    serial = ExcelCleaner(test_file)
+    expected = serial.evaluate_rules(df)
+    
+    parallel = ExcelCleaner(test_file, match_workers=2)
+    parallel.PARALLEL_MIN_VALUES = 0
+    keep_mask = parallel.evaluate_rules(df)
+    
+    assert keep_mask.tolist() == expected.tolist()
+    for col_name, stats in serial.rule_stats.items():
+        for key in ('rows', 'distinct', 'matched'):
+            assert parallel.rule_stats[col_name][key] == stats[key]
+    
+    # Too few distinct values to start the pool: matched in this process
+    positions = {idx: idx for idx in range(len(df.columns))}
+    keep, rule_stats = match_parallel(df, positions, serial.plan_rules(df, positions, serial.compile_rules()),
+                                      workers=2, min_values=len(df) * 4 + 1)
+    assert keep.tolist() == expected.tolist()
+    assert [counts['matched'] for _, counts in rule_stats] == [stats['matched'] for stats in serial.rule_stats.values()]
+    
+    print("✓ Parallel matching agrees with serial matching")
+    return True
+
+def test_multi_sheet():
+    """Check every sheet (or a chosen subset) is cleaned into one workbook of each kind with per-sheet counts"""
+    from openpyxl import load_workbook
+    from cleaner_core import ExcelCleaner, MissingSheetsError
+    
+    test_file = create_test_excel()
+    single = ExcelCleaner(test_file, engine='pandas')
+    single.process()
+    
+    df = pd.read_excel(test_file)
+    multi_file = Path("test_sample_sheets.xlsx")
+    with pd.ExcelWriter(multi_file, engine='openpyxl') as writer:
+        df.to_excel(writer, sheet_name='North', index=False)
+        pd.DataFrame().to_excel(writer, sheet_name='Notes', index=False)
+        df.iloc[:10].to_excel(writer, sheet_name='South', index=False)
+    
+    cleaner = ExcelCleaner(multi_file, save_deleted=True, sheets='all', sheet_workers=2)
+    output_path = cleaner.process()
+    assert output_path is not None and cleaner.engine == 'pandas'
+    assert list(cleaner.sheet_stats) == ['North', 'Notes', 'South']
+    assert cleaner.sheet_stats['North']['removed'] == single.rows_removed
+    assert cleaner.sheet_stats['Notes'] == {'rows': 0, 'removed': 0, 'remaining': 0}
+    assert cleaner.rows_removed == sum(stats['removed'] for stats in cleaner.sheet_stats.values())
+    
+    cleaned = load_workbook(output_path, read_only=True)
+    deleted = load_workbook(cleaner.deleted_output_path, read_only=True)
+    assert cleaned.sheetnames == deleted.sheetnames == ['North', 'Notes', 'South']
+    for name, stats in cleaner.sheet_stats.items():
+        assert len(list(cleaned[name].values)) == stats['remaining'] + bool(stats['rows'])
+        assert len(list(deleted[name].values)) == stats['removed'] + bool(stats['rows'])
+    cleaned.close()
+    deleted.close()
+    
+    subset = ExcelCleaner(multi_file, sheets=['South'])
+    assert subset.process() is not None
+    assert list(subset.sheet_stats) == ['South']
+    
+    # Options of the single-sheet engines are refused, and sheets over the memory budget are still loaded whole
+    for options in ({'incremental': True}, {'match_workers': 2}, {'engine': 'xml'}):
+        try:
+            ExcelCleaner(multi_file, sheets='all', **options)
+            assert False, f"{options} accepted with sheets"
+        except ValueError:
+            pass
+    events = []
+    tight = ExcelCleaner(multi_file, sheets='all', memory_budget_mb=0, event_callback=events.append)
+    assert tight.process() is not None and tight.engine == 'pandas'
+    assert tight.engine_reason.endswith("sheets North, South need more than the 0 MB memory budget, "
+                                        "but several sheets are always loaded whole by the pandas engine")
+    assert any(event.get('message', '').startswith("Warning: sheets North, South") for event in events)
+    
+    missing = ExcelCleaner(multi_file, sheets=['West'])
+    assert missing.process() is None
+    assert isinstance(missing.errors[0], MissingSheetsError)
+    
+    for path in Path(".").glob("test_sample_sheets*.xlsx"):
+        path.unlink()
+    
+    print(f"✓ Multi-sheet cleaning kept {len(cleaner.sheet_stats)} sheets, removed {cleaner.rows_removed} rows")
+    return True
+
+def test_columnar_formats():
+    """Check CSV and Parquet inputs and outputs remove the same rows as .xlsx and keep CSV text as it was"""
+    from cleaner_core import ExcelCleaner, parquet_available
+    from cleaner_cli import is_input_file
+    
+    test_file = create_test_excel()
+    expected = ExcelCleaner(test_file, engine='pandas')
+    expected.process()
+    
+    df = pd.read_excel(test_file, dtype=object)
+    df.iloc[15, 0] = "007"
+    csv_file = Path("test_sample_table.csv")
+    df.to_csv(csv_file, index=False)
+    assert is_input_file(csv_file) and not is_input_file(Path("test_sample_table_CLEANED.csv"))
+    
+    cleaner = ExcelCleaner(csv_file, save_deleted=True)
+    output_path = cleaner.process()
+    assert output_path == Path("test_sample_table_CLEANED.csv") and cleaner.engine == 'pandas'
+    assert cleaner.rows_removed == expected.rows_removed
+    cleaned = pd.read_csv(output_path, dtype=str)
+    assert len(cleaned) == expected.remaining_row_count
+    assert "007" in cleaned.iloc[:, 0].tolist()
+    assert len(pd.read_csv(cleaner.deleted_output_path)) == expected.rows_removed
+    
+    try:
+        ExcelCleaner(csv_file, engine='xml')
+        assert False, "the xml engine cannot read CSV"
+    except ValueError:
+        pass
+    
+    if parquet_available():
+        both = ExcelCleaner(test_file, output_formats=['parquet', 'xlsx'])
+        output_path = both.process()
+        assert output_path.name == "test_sample_CLEANED.parquet" and both.engine == 'pandas'
+        assert len(pd.read_parquet(output_path)) == expected.remaining_row_count
+        
+        parquet_file = Path("test_sample_table.parquet")
+        output_path.replace(parquet_file)
+        from_parquet = ExcelCleaner(parquet_file)
+        assert from_parquet.process() is not None
+        assert from_parquet.rows_removed == 0
+    else:
+        print("  (pyarrow is not installed, Parquet skipped)")
+    
+    for path in Path(".").glob("test_sample_table*"):
+        path.unlink()
+    
+    print(f"✓ CSV{' and Parquet' if parquet_available() else ''} files clean like .xlsx")
+    return True
+
+def test_rules_file():
+    """Check rules from a file, by letter or header, remove the same rows in plan order with per-rule stats"""
+    import json
+    import tempfile
+    from cleaner_core import ExcelCleaner, MissingColumnsError, RulesError
+    
+    test_file = create_test_excel()
+    expected = ExcelCleaner(test_file, engine='pandas')
+    expected.process()
+    
+    with tempfile.TemporaryDirectory() as folder:
+        # The built-in rules, two columns by letter and two by (differently cased) header
+        rules_path = Path(folder) / "rules.json"
+        rules_path.write_text(json.dumps({"rules": [
+            {"column": "bv", "name": "ShipmentID", "patterns": ["FOC"]},
+            {"header": "col_7", "name": "Order", "patterns": ['test', 'testing', 'M88', 'GB Test', 'GB Testing', 'GB']},
+            {"column": "I", "patterns": ['test', 'testing', 'FOC']},
+            {"header": " Col_66 ", "patterns": ['FOC', 'M88']},
+        ]}))
+        
+        for engine in ('pandas', 'xml'):
+            cleaner = ExcelCleaner(test_file, engine=engine, rules_file=rules_path, save_report=True)
+            assert cleaner.process() is not None
+            assert cleaner.rows_removed == expected.rows_removed
+            assert cleaner.COLUMNS['Order'] == 'H' and cleaner.COLUMNS[' Col_66 '] == 'BO'
+            
+            # Highest sample hit rate first; every row is removed by exactly one rule
+            rates = [step['sample_hit_rate'] for step in cleaner.rule_plan]
+            assert rates == sorted(rates, reverse=True)
+            assert [step['rule'] for step in cleaner.rule_plan] == list(cleaner.rule_stats)
+            assert sum(stats['matched'] for stats in cleaner.rule_stats.values()) == cleaner.rows_removed
+            examined = [stats['rows'] for stats in cleaner.rule_stats.values()]
+            assert examined == sorted(examined, reverse=True) and examined[-1] < examined[0]
+            assert all('seconds' in stats for stats in cleaner.rule_stats.values())
+            assert len(cleaner.describe_rule_stats()) == 4
+            report = json.loads(cleaner.report_path.read_text())
+            assert report['rule_stats'] == json.loads(json.dumps(cleaner.rule_stats))
+            cleaner.report_path.unlink()
+        
+        sheets = ExcelCleaner(test_file, sheets='all', rules_file=rules_path)
+        assert sheets.process() is not None and sheets.rows_removed == expected.rows_removed
+        
+        # Shorthand mapping in YAML; a header that is not in the file
+        yaml_path = Path(folder) / "rules.yaml"
+        yaml_path.write_text("column:BV: [FOC]\nNo Such Header: [test]\n")
+        try:
+            import yaml
+        except ImportError:
+            yaml = None
+        if yaml is not None:
+            missing = ExcelCleaner(test_file, rules_file=yaml_path)
+            assert missing.process() is None
+            assert isinstance(missing.errors[0], MissingColumnsError)
+            assert "No Such Header (header 'No Such Header')" in missing.errors[0].missing_columns
+        
+        # Shorthand keys that could be a column letter or a header need a prefix
+        rules_path.write_text(json.dumps({"column:BV": ["FOC"], "header:COL": ["x"]}))
+        short = ExcelCleaner(test_file, rules_file=rules_path)
+        assert short.COLUMNS == {'BV': 'BV'} and short.RULE_HEADERS == {'COL': 'COL'}
+        
+        for text in ('[1, 2]', '{"rules": [{"column": "H", "header": "Col_7", "patterns": ["x"]}]}', '{"H": ',
+                     '{"ID": ["x"]}'):
+            rules_path.write_text(text)
+            try:
+                ExcelCleaner(test_file, rules_file=rules_path)
+                assert False, f"{text} is not a valid rules file"
+            except RulesError:
+                pass
+    
+    print("✓ Rules files are compiled into an evaluation plan")
+    return True
+
+def test_compact_mode():
+    """Check compact mode shrinks the loaded rows, matches on them directly and writes the same files"""
+    import tempfile
+    from openpyxl import load_workbook
+    from cleaner_core import ExcelCleaner, PatternMatcher, compact_column, parquet_available
+    from frame_cache import FrameCache
+    
+    test_file = create_test_excel()
+    df = pd.read_excel(test_file, dtype=object)
+    rows = len(df)
+    df['Col_0'] = range(rows)
+    df['Col_1'] = [0.5 * k for k in range(rows)]
+    df['Col_2'] = [0.1] * rows
+    df['Col_3'] = ([1, "1", 2.5, "x"] * rows)[:rows]
+    compact_file = Path("test_sample_compact.xlsx")
+    df.to_excel(compact_file, index=False)
+    
+    formats = ['xlsx', 'csv'] + (['parquet'] if parquet_available() else [])
+    runs = {}
+    for compact in (False, True):
+        cleaner = ExcelCleaner(compact_file, engine='pandas', save_deleted=True, compact=compact,
+                               output_formats=formats)
+        assert cleaner.process() is not None
+        outputs = {}
+        for path in cleaner.output_paths("_CLEANED") + cleaner.output_paths("_DELETED"):
+            if path.suffix == '.xlsx':
+                workbook = load_workbook(path, read_only=True)
+                outputs[path.name] = list(workbook.worksheets[0].iter_rows(values_only=True))
+                workbook.close()
+            elif path.suffix == '.csv':
+                outputs[path.name] = path.read_text()
+            else:
+                outputs[path.name] = pd.read_parquet(path)
+        runs[compact] = (cleaner, outputs)
+    
+    plain, compact = runs[False][0], runs[True][0]
+    assert compact.rows_removed == plain.rows_removed and plain.memory_mb is None
+    assert compact.memory_mb['compact'] < compact.memory_mb['loaded']
+    assert compact.df['Col_7'].dtype == 'category' and compact.df['Col_0'].dtype == 'int8'
+    assert compact.df['Col_1'].dtype == 'float32' and compact.df['Col_2'].dtype == 'float64'
+    assert compact.df['Col_3'].dtype == object
+    for name, output in runs[False][1].items():
+        if isinstance(output, pd.DataFrame):
+            pd.testing.assert_frame_equal(runs[True][1][name], output)
+        else:
+            assert runs[True][1][name] == output, name
+    
+    # The compact read gives read_excel's columns, compacted, whatever the chunking
+    loaded = pd.read_excel(compact_file)
+    chunked = ExcelCleaner(compact_file, compact=True, chunk_size=7).read_input()
+    assert list(chunked.columns) == list(loaded.columns)
+    for name in loaded.columns:
+        pd.testing.assert_series_equal(chunked[name], compact_column(loaded[name]), check_names=False)
+    assert compact.memory_mb['peak_rss'] is None or compact.memory_mb['peak_rss'] > 0
+    
+    # The auto engine counts on the smaller footprint of a compact load
+    budget = (plain.estimated_memory_mb + compact.estimated_memory_mb) / 2
+    assert compact.estimated_memory_mb < plain.estimated_memory_mb
+    assert [ExcelCleaner(compact_file, compact=flag, memory_budget_mb=budget).choose_engine()
+            for flag in (False, True)] == ['xml', 'pandas']
+    
+    # Frames come back from the frame cache compacted, with the sizes they were read at
+    with tempfile.TemporaryDirectory() as folder:
+        frame_cache = FrameCache(folder)
+        cached = []
+        for _ in range(2):
+            cleaner = ExcelCleaner(compact_file, engine='pandas', compact=True, frame_cache=frame_cache)
+            assert cleaner.process() is not None
+            cached.append(cleaner)
+        assert cached[1].frame_cache_hit and cached[1].rows_removed == compact.rows_removed
+        assert cached[1].memory_mb['loaded'] == compact.memory_mb['loaded']
+        assert cached[1].loaded_dtypes == cached[0].loaded_dtypes
+    
+    # Categoricals are matched through their categories, like the text they hold
+    values = pd.Series(["FOC-1", "po", None, "PO", "foc", "x"] * 3, dtype=object)
+    category = compact_column(values)
+    assert category.dtype == 'category'
+    matcher = PatternMatcher(['foc', 'PO'])
+    assert list(matcher.match_series(category)) == list(PatternMatcher(['foc', 'PO']).match_series(values))
+    assert list(matcher.match_series(category.iloc[[0, 1]])) == [True, True] and matcher.stats['distinct'] == 2
+    
+    for path in Path(".").glob("test_sample_compact*"):
+        path.unlink()
+    
+    print(f"✓ Compact mode: {compact.memory_mb['loaded']:.2f} MB loaded, {compact.memory_mb['compact']:.2f} MB compacted")
+    return True
+
+def test_preview():
+    """Check the preview counts the pandas engine's removals from the rule columns and writes nothing"""
+    from cleaner_core import ExcelCleaner
+    from cleaner_cli import main
+    
+    test_file = create_test_excel()
+    expected = ExcelCleaner(test_file, engine='pandas')
+    expected.process()
+    
+    csv_file = Path("test_sample_preview.csv")
+    pd.read_excel(test_file).to_csv(csv_file, index=False)
+    for path in (test_file, csv_file):
+        cleaner = ExcelCleaner(path)
+        for output in cleaner.output_paths("_CLEANED"):
+            output.unlink(missing_ok=True)
+        preview = cleaner.preview(sample_rows=3)
+        assert preview['removed'] == expected.rows_removed
+        assert preview['remaining'] == expected.remaining_row_count
+        assert sum(rule['removed'] for rule in preview['rules']) == preview['removed']
+        assert {rule['rule']: rule['matches'] for rule in preview['rules']}['Order'] == 4
+        assert preview['sample'][0] == {'row': 3, 'Order': 'Test Order', 'Buyer PO Number': None,
+                                        'Comment': None, 'ShipmentID': None}
+        assert len(preview['sample']) == 3
+        assert not cleaner.output_paths("_CLEANED")[0].exists()
+    
+    assert main([str(csv_file), "--preview", "--workers", "1"]) == 0
+    assert not Path("test_sample_preview_CLEANED.csv").exists()
+    csv_file.unlink()
+    
+    # Two rules on one column count apart
+    class SplitOrderCleaner(ExcelCleaner):
+        RULES = [('ShipmentID', ['FOC']), ('Order', ['test', 'testing']), ('Buyer PO Number', ['test', 'FOC']),
+                 ('Comment', ['FOC', 'M88']), ('Order', ['M88', 'GB'])]
+    split = SplitOrderCleaner(test_file).preview()
+    rules = {rule['rule']: rule for rule in split['rules']}
+    assert list(rules) == ['ShipmentID', 'Order', 'Buyer PO Number', 'Comment', 'Order #2']
+    assert rules['Order']['matches'] == 2 and rules['Order #2']['matches'] == 3
+    assert rules['Order']['removed'] + rules['Order #2']['removed'] == 4
+    assert sum(rule['removed'] for rule in split['rules']) == split['removed'] == expected.rows_removed
+    
+    print(f"✓ Preview counts {preview['removed']} rows to remove without writing")
+    return True
+
+def test_watch_folder():
+    """Check the watcher cleans settled files once, waits for incomplete ones and resumes interrupted files"""
+    import json
+    import shutil
+    import tempfile
+    from folder_watcher import FolderWatcher
+    
+    test_file = create_test_excel()
+    
+    with tempfile.TemporaryDirectory() as folder:
+        for region in ("north", "south", "east"):
+            shutil.copy(test_file, Path(folder) / f"{region}.xlsx")
+        # Still being written: no zip directory yet
+        (Path(folder) / "west.xlsx").write_bytes(b"PK\x03\x04")
+        journal_path = Path(folder) / "journal" / "watch.json"
+        
+        def watch(**options):
+            lines = []
+            watcher = FolderWatcher([folder], workers=2, poll_seconds=0.05, settle_seconds=0.1,
+                                    journal_path=journal_path, report=lines.append, **options)
+            return watcher.run(until_idle=True), [line for line in lines if line.startswith("OK")]
+        
+        # One file waits for a worker at a time, the others in the folder
+        counts, cleaned = watch(max_queue=1)
+        assert counts == {'queued': 0, 'running': 0, 'done': 3, 'failed': 0} and len(cleaned) == 3
+        for region in ("north", "south", "east"):
+            assert (Path(folder) / f"{region}_CLEANED.xlsx").exists()
+        assert not (Path(folder) / "west_CLEANED.xlsx").exists()
+        
+        # Unchanged files are not cleaned again, a file left running by a stopped run is
+        journal = json.loads(journal_path.read_text())
+        south = str((Path(folder) / "south.xlsx").resolve())
+        assert journal[south]['summary']['removed'] == 10
+        journal[south]['status'] = 'running'
+        journal_path.write_text(json.dumps(journal))
+        counts, cleaned = watch()
+        assert counts['done'] == 3 and len(cleaned) == 1 and "south.xlsx" in cleaned[0]
+    
+    print("✓ Watch folder cleaned each settled file at least once")
+    return True
+
+def test_benchmark_suite():
+    """Run the benchmark suite on a small synthetic workbook"""
+    import tempfile
+    from benchmark_cleaner import PHASES, compare_results, run_suite
+    
+    with tempfile.TemporaryDirectory() as folder:
+        results = run_suite(sizes=[300], match_rate=0.2, engines=("pandas", "xml"),
+                            workdir=folder, isolate=False, report=lambda line: None)
+    
+    pandas_case, xml_case = results["cases"]
+    assert list(pandas_case["phases"]) == list(PHASES)
+    assert pandas_case["rows"] == 300
+    assert 0.1 * 300 < pandas_case["rows_removed"] < 0.3 * 300
+    assert xml_case["rows_removed"] == pandas_case["rows_removed"]
+    assert compare_results(results, results, report=lambda line: None) == []
+    
+    print(f"✓ Benchmark suite ran ({pandas_case['rows_removed']} of 300 synthetic rows removed)")
+    return True
+
 if __name__ == "__main__":
     try:
         test_cleaning_logic()
+        test_vectorized_matching()
+        test_aho_corasick()
+        test_projected_engine()
+        test_streaming_engine()
+        test_xml_engine()
+        test_xml_engine_ranges()
+        test_batch_cli()
+        test_headless_core()
+        test_result_cache()
+        test_frame_cache()
+        test_incremental_mode()
+        test_run_events()
+        test_progress_channel()
+        test_progress_estimate()
+        test_preflight()
+        test_auto_engine()
+        test_parallel_matching()
+        test_multi_sheet()
+        test_columnar_formats()
+        test_rules_file()
+        test_compact_mode()
+        test_preview()
+        test_watch_folder()
+        test_benchmark_suite()
     except Exception as e:
         print(f"\n✗ Test failed with error: {e}")
         import traceback
@@ -0,0 +1,611 @@
+"""
+Streaming access to the worksheet XML inside .xlsx files
+Reads individual columns straight from the sheet part without building a workbook
+"""
+
+import re
+import zipfile
+from array import array
+from bisect import bisect_left, bisect_right
+import posixpath
+from html import unescape
+from pathlib import Path
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+
+from openpyxl.reader.strings import read_string_table
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+from openpyxl.utils.datetime import from_excel, from_ISO8601, WINDOWS_EPOCH, MAC_EPOCH
+
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+# Size of the blocks read from the compressed sheet part
+READ_BLOCK_SIZE = 1 << 20
+
+# Tags may carry a namespace prefix (e.g. <x:row>) depending on the exporter
+_ROW_NUMBER_RE = re.compile(rb'<(?:\w+:)?row\b[^>]*?\br="(\d+)"')
+_SHEET_DATA_RE = re.compile(rb'<(?:\w+:)?sheetData\b[^>]*?(/?)>')
+_DIMENSION_RE = re.compile(rb'<(?:\w+:)?dimension\b[^>]*?\bref="([^"]*)"')
+_DIMENSION_ELEMENT_RE = re.compile(rb'<(?:\w+:)?dimension\b[^>]*?/>')
+_FORMULA_RE = re.compile(rb'<(?:\w+:)?f\b[^>]*?(?:/>|>.*?</(?:\w+:)?f>)', re.S)
+_REFERENCE_RE = re.compile(rb'(\br="[A-Z]*)\d+"')
+_CELL_RE = re.compile(rb'<(?:\w+:)?c\b([^>]*?)(?:/>|>(.*?)</(?:\w+:)?c>)', re.S)
+_CELL_REF_RE = re.compile(rb'\br="([A-Z]+)\d+"')
+_HAS_VALUE_RE = re.compile(rb'<(?:\w+:)?(?:v|is)\b')
+_TYPE_RE = re.compile(rb'\bt="([^"]*)"')
+_STYLE_RE = re.compile(rb'\bs="(\d+)"')
+_VALUE_RE = re.compile(rb'<(?:\w+:)?v>(.*?)</(?:\w+:)?v>', re.S)
+_TEXT_RE = re.compile(rb'<(?:\w+:)?t\b[^>]*?(?:/>|>(.*?)</(?:\w+:)?t>)', re.S)
+_PHONETIC_RE = re.compile(rb'<(?:\w+:)?rPh\b.*?</(?:\w+:)?rPh>', re.S)
+# Elements after <sheetData> that refer to cells by row: merged cells and hyperlinks sit
+# on given cells, conditional formats, data validations and filters cover areas
+_RANGE_ELEMENT_RE = re.compile(
+    rb'<(?:\w+:)?(mergeCell|hyperlink|conditionalFormatting|dataValidation|autoFilter)\b'
+    rb'[^>]*?(?:/>|>.*?</(?:\w+:)?\1>)', re.S)
+_RANGE_ATTRIBUTE_RE = re.compile(rb'(\b(?:sq)?ref=")([^"]*)"')
+_RANGE_END_RE = re.compile(rb'(\$?[A-Z]*\$?)(\d+)$')
+# Containers that must hold at least one element, and may count them
+_RANGE_CONTAINER_RE = re.compile(
+    rb'<(?:\w+:)?(mergeCells|hyperlinks|dataValidations)\b([^>]*?)(?:/>|>(.*?)</(?:\w+:)?\1>)', re.S)
+_COUNT_RE = re.compile(rb'\bcount="\d+"')
+# Start tag of a table part, whose ref covers its header and rows
+_TABLE_RE = re.compile(rb'<(?:\w+:)?table\b[^>]*>')
+# Area of a sheet in a defined name's formula (e.g. 'PO Lines'!$A$1:$BV$11), after its sheet prefix
+_NAME_AREA_RE = re.compile(rb'\$?[A-Z]{0,3}\$?\d+(?::\$?[A-Z]{0,3}\$?\d+)?(?![\w(])')
+_DEFINED_NAME_RE = re.compile(rb'(<(?:\w+:)?definedName\b[^>]*>)(.*?)(</(?:\w+:)?definedName>)', re.S)
+
+
+def column_letter_to_index(col_letter):
+    """Convert Excel column letter to 0-based index"""
+    result = 0
+    for char in col_letter.upper():
+        result = result * 26 + (ord(char) - ord('A') + 1)
+    return result - 1
+
+
+def index_to_column_letter(col_index):
+    """Convert 0-based index to Excel column letter"""
+    letters = ""
+    col_index += 1
+    while col_index:
+        col_index, remainder = divmod(col_index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+def _unescape(text):
+    """Decode the character data of an element"""
+    text = text.decode("utf-8")
+    return unescape(text) if "&" in text else text
+
+
+def _cast_number(text):
+    """Convert a numeric cell value the way openpyxl does"""
+    if "." in text or "E" in text or "e" in text:
+        return float(text)
+    return int(text)
+
+
+class XlsxPackage:
+    """An opened .xlsx file: sheet list, shared strings and date styles"""
+    
+    def __init__(self, path):
+        self.path = Path(path)
+        self.zip = zipfile.ZipFile(self.path)
+        self.workbook_part = self._find_workbook_part()
+        self._relationships = self._read_relationships(self.workbook_part)
+        self.sheets, self.epoch = self._read_workbook()
+        self._shared_strings = None
+        self._date_styles = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def close(self):
+        self.zip.close()
+    
+    def _find_workbook_part(self):
+        root = ET.fromstring(self.zip.read("_rels/.rels"))
+        for rel in root.iter(f"{{{PKG_REL_NS}}}Relationship"):
+            if rel.get("Type", "").endswith("/officeDocument"):
+                return rel.get("Target").lstrip("/")
+        return "xl/workbook.xml"
+    
+    def _read_relationships(self, part):
+        """Map relationship ids of a part to the absolute paths of their targets"""
+        folder, name = posixpath.split(part)
+        rels_part = posixpath.join(folder, "_rels", name + ".rels")
+        targets = {}
+        if rels_part not in self.zip.namelist():
+            return targets
+        root = ET.fromstring(self.zip.read(rels_part))
+        for rel in root.iter(f"{{{PKG_REL_NS}}}Relationship"):
+            target = rel.get("Target")
+            if target.startswith("/"):
+                path = target.lstrip("/")
+            else:
+                path = posixpath.normpath(posixpath.join(folder, target))
+            targets[rel.get("Id")] = (rel.get("Type", ""), path)
+        return targets
+    
+    def part_of_type(self, type_suffix):
+        for rel_type, path in self._relationships.values():
+            if rel_type.endswith(type_suffix):
+                return path
+        return None
+    
+    def _read_workbook(self):
+        root = ET.fromstring(self.zip.read(self.workbook_part))
+        sheets = []
+        for sheet in root.iter(f"{{{MAIN_NS}}}sheet"):
+            rel_id = sheet.get(f"{{{REL_NS}}}id")
+            if rel_id in self._relationships:
+                sheets.append((sheet.get("name"), self._relationships[rel_id][1]))
+        
+        epoch = WINDOWS_EPOCH
+        properties = root.find(f"{{{MAIN_NS}}}workbookPr")
+        if properties is not None and properties.get("date1904") in ("1", "true"):
+            epoch = MAC_EPOCH
+        return sheets, epoch
+    
+    @property
+    def shared_strings(self):
+        """Shared string table, loaded on first use"""
+        if self._shared_strings is None:
+            part = self.part_of_type("/sharedStrings")
+            if part and part in self.zip.namelist():
+                with self.zip.open(part) as source:
+                    self._shared_strings = read_string_table(source)
+            else:
+                self._shared_strings = []
+        return self._shared_strings
+    
+    @property
+    def date_styles(self):
+        """Map of style ids with a date/time number format to True if they are durations"""
+        if self._date_styles is None:
+            self._date_styles = {}
+            part = self.part_of_type("/styles")
+            if part and part in self.zip.namelist():
+                root = ET.fromstring(self.zip.read(part))
+                formats = dict(BUILTIN_FORMATS)
+                for fmt in root.iter(f"{{{MAIN_NS}}}numFmt"):
+                    formats[int(fmt.get("numFmtId"))] = fmt.get("formatCode")
+                cell_xfs = root.find(f"{{{MAIN_NS}}}cellXfs")
+                if cell_xfs is not None:
+                    for style_id, xf in enumerate(cell_xfs.iter(f"{{{MAIN_NS}}}xf")):
+                        fmt = formats.get(int(xf.get("numFmtId", 0)))
+                        if is_date_format(fmt):
+                            self._date_styles[style_id] = is_timedelta_format(fmt)
+        return self._date_styles
+    
+    def open_sheet(self, index=0):
+        """Return a SheetReader for the sheet at the given position"""
+        name, part = self.sheets[index]
+        return SheetReader(self, part, name)
+
+
+class SheetReader:
+    """Splits a worksheet part into its <row> elements and decodes selected cells"""
+    
+    def __init__(self, package, part, name=None):
+        self.package = package
+        self.part = part
+        self.name = name
+        self._prefix = b""
+        self._letters = {}
+        self._columns = {}
+        self.head = b""
+        self.tail = b""
+        # Uncompressed size of the sheet part, how much of it rows() has read so far
+        # and the offset just past the last row it yielded
+        self.size = package.zip.getinfo(part).file_size
+        self.bytes_read = 0
+        self.position = 0
+    
+    def dimension(self):
+        """Return (max_row, max_col) declared by the sheet's <dimension>, or None"""
+        with self.package.zip.open(self.part) as source:
+            head = b""
+            while b"sheetData" not in head:
+                block = source.read(64 * 1024)
+                if not block:
+                    break
+                head += block
+        match = _DIMENSION_RE.search(head)
+        if not match:
+            return None
+        last_cell = match.group(1).split(b":")[-1].decode()
+        letters = "".join(ch for ch in last_cell if ch.isalpha())
+        digits = "".join(ch for ch in last_cell if ch.isdigit())
+        if not letters or not digits:
+            return None
+        return int(digits), column_letter_to_index(letters) + 1
+    
+    def rows(self):
+        """Yield (row number, raw <row> bytes) for every row element in the sheet
+        
+        Once the first row is yielded, head holds the XML before the rows (up to and
+        including the <sheetData> tag); once exhausted, tail holds the XML after them.
+        """
+        with self.package.zip.open(self.part) as source:
+            self.bytes_read = 0
+            self.position = 0
+            buffer = b""
+            match = None
+            while match is None:
+                block = source.read(READ_BLOCK_SIZE)
+                self.bytes_read += len(block)
+                buffer += block
+                match = _SHEET_DATA_RE.search(buffer)
+                if match is None and not block:
+                    return
+            
+            # Rows and cells use the same namespace prefix as <sheetData>
+            self._prefix = match.group(0)[1:match.group(0).index(b"sheetData")]
+            open_tag = b"<" + self._prefix + b"row"
+            close_tag = b"</" + self._prefix + b"row>"
+            end_tag = b"</" + self._prefix + b"sheetData>"
+            
+            if match.group(1):
+                # <sheetData/>: no rows at all
+                self.head = buffer[:match.end() - 2] + b">"
+                self.tail = end_tag + buffer[match.end():] + source.read()
+                self.bytes_read = self.position = self.size
+                return
+            self.head = buffer[:match.end()]
+            buffer = buffer[match.end():]
+            
+            row_number = 0
+            while True:
+                block = source.read(READ_BLOCK_SIZE)
+                self.bytes_read += len(block)
+                # Offset of buffer[0] in the part
+                offset = self.bytes_read - len(block) - len(buffer)
+                pos = 0
+                while True:
+                    start = buffer.find(open_tag, pos)
+                    if start < 0:
+                        break
+                    tag_end = buffer.find(b">", start)
+                    if tag_end < 0:
+                        break
+                    if buffer[tag_end - 1] == 0x2F:  # self-closing <row .../>
+                        end = tag_end + 1
+                    else:
+                        close = buffer.find(close_tag, tag_end)
+                        if close < 0:
+                            break
+                        end = close + len(close_tag)
+                    row_xml = buffer[start:end]
+                    number = _ROW_NUMBER_RE.match(row_xml)
+                    row_number = int(number.group(1)) if number else row_number + 1
+                    self.position = offset + end
+                    yield row_number, row_xml
+                    pos = end
+                buffer = buffer[pos:]
+                end = buffer.find(end_tag)
+                if end >= 0 or not block:
+                    self.tail = buffer[max(end, 0):] + block + source.read()
+                    self.bytes_read = self.position = self.size
+                    return
+                buffer += block
+    
+    @staticmethod
+    def has_values(row_xml):
+        """True if the row holds at least one cell value"""
+        return _HAS_VALUE_RE.search(row_xml) is not None
+    
+    @staticmethod
+    def row_width(row_xml):
+        """Number of columns up to the last cell of the row"""
+        refs = _CELL_REF_RE.findall(row_xml)
+        if refs:
+            return max(column_letter_to_index(ref.decode()) for ref in refs) + 1
+        return len(_CELL_RE.findall(row_xml))
+    
+    def _find_cell(self, row_xml, reference):
+        """Return (attributes, inner xml) of the cell with the given reference, or None"""
+        pos = row_xml.find(b' r="' + reference + b'"')
+        if pos < 0:
+            return None
+        start = row_xml.rfind(b"<", 0, pos)
+        tag_end = row_xml.find(b">", pos)
+        attributes = row_xml[start:tag_end]
+        if row_xml[tag_end - 1] == 0x2F:
+            return attributes, b""
+        close = row_xml.find(b"</" + self._prefix + b"c>", tag_end)
+        return attributes, row_xml[tag_end + 1:close]
+    
+    def read_cells(self, row_number, row_xml, col_indices):
+        """Decode the cells of a row at the given 0-based column indices
+        
+        Returns a dict of column index to value; empty or missing cells are left out.
+        Values are converted like pandas' openpyxl reader does (integral floats become ints).
+        """
+        values = {}
+        row_ref = str(row_number).encode()
+        for col_index in col_indices:
+            letter = self._letters.get(col_index)
+            if letter is None:
+                letter = self._letters[col_index] = index_to_column_letter(col_index).encode()
+            cell = self._find_cell(row_xml, letter + row_ref)
+            if cell is not None:
+                value = self._cell_value(*cell)
+                if value is not None:
+                    values[col_index] = value
+        
+        if not values and _CELL_RE.search(row_xml) and not _CELL_REF_RE.search(row_xml):
+            # Cells without references are positioned by their order in the row
+            wanted = set(col_indices)
+            for position, match in enumerate(_CELL_RE.finditer(row_xml)):
+                if position in wanted:
+                    value = self._cell_value(match.group(1), match.group(2))
+                    if value is not None:
+                        values[position] = value
+        return values
+    
+    def read_row(self, row_xml):
+        """Decode every cell of a row, like read_cells for all its columns, in one pass
+        
+        Returns a dict of column index to value; empty cells are left out.
+        """
+        values = {}
+        for position, match in enumerate(_CELL_RE.finditer(row_xml)):
+            reference = _CELL_REF_RE.search(match.group(1))
+            if reference is not None:
+                letters = reference.group(1)
+                position = self._columns.get(letters)
+                if position is None:
+                    position = self._columns[letters] = column_letter_to_index(letters.decode())
+            value = self._cell_value(match.group(1), match.group(2))
+            if value is not None:
+                values[position] = value
+        return values
+    
+    def _cell_value(self, attributes, inner):
+        type_match = _TYPE_RE.search(attributes)
+        data_type = type_match.group(1) if type_match else b"n"
+        if not inner:
+            return None
+        
+        if data_type == b"inlineStr":
+            inner = _PHONETIC_RE.sub(b"", inner)
+            text = b"".join(part or b"" for part in _TEXT_RE.findall(inner))
+            return _unescape(text) or None
+        
+        value_match = _VALUE_RE.search(inner)
+        if not value_match:
+            return None
+        text = value_match.group(1).decode("utf-8")
+        
+        if data_type == b"s":
+            return self.package.shared_strings[int(text)] or None
+        if data_type == b"b":
+            return bool(int(text))
+        if data_type == b"e":
+            return None
+        if data_type == b"str":
+            return _unescape(value_match.group(1)) or None
+        if data_type == b"d":
+            return from_ISO8601(text)
+        
+        number = _cast_number(text)
+        style_match = _STYLE_RE.search(attributes)
+        style_id = int(style_match.group(1)) if style_match else 0
+        if style_id in self.package.date_styles:
+            try:
+                return from_excel(number, self.package.epoch, timedelta=self.package.date_styles[style_id])
+            except (OverflowError, ValueError):
+                return None
+        if isinstance(number, float) and number.is_integer():
+            return int(number)
+        return number
+
+
+class FilteredCopyWriter:
+    """Writes a copy of the package in which one sheet keeps only the rows passed to write_row
+    
+    Kept <row> elements are copied verbatim apart from their row numbers, which are
+    shifted up to close the gaps left by dropped rows. Rows after the first dropped row
+    have their formulas removed in favour of their cached values, because their references
+    would no longer point at the right rows; rows before it keep theirs, which stay right
+    unless they refer to rows below them. The calculation chain is left out either way, so
+    Excel rebuilds it. The <dimension> element is dropped since the
+    final row count is not known when the sheet head is written. Merged cells, hyperlinks,
+    conditional formats, data validations and the auto filter after the rows move up with
+    them (see shift_ranges), and so do the sheet's tables and the workbook's defined names
+    on the sheet (print area, filter database...), whose parts are written last for that.
+    Every other part of the package (styles, column widths, other sheets...) is copied unchanged.
+    """
+    
+    # Rows buffered before they are handed to the compressor
+    FLUSH_ROWS = 1000
+    
+    def __init__(self, package, sheet, path):
+        self.package = package
+        self.sheet = sheet
+        self.path = Path(path)
+        self.rows_written = 0
+        self.rows_dropped = 0
+        # Source numbers of the dropped rows, in order, to move the ranges of the sheet tail
+        self._dropped = array("q")
+        self._pending = []
+        self._formula_tag = b"<" + sheet._prefix + b"f"
+        self._calc_chain = package.part_of_type("/calcChain")
+        
+        self._tables = {path for rel_type, path in package._read_relationships(sheet.part).values()
+                        if rel_type.endswith("/table")}
+        
+        infos = [info for info in package.zip.infolist() if info.filename != self._calc_chain]
+        position = next(i for i, info in enumerate(infos) if info.filename == sheet.part)
+        # Parts referring to rows of the sheet are copied by close(), once the dropped rows are known
+        deferred = self._tables | {package.workbook_part}
+        self._remaining = [info for info in infos[:position] if info.filename in deferred] + infos[position + 1:]
+        
+        self.zip = zipfile.ZipFile(self.path, "w", zipfile.ZIP_DEFLATED)
+        for info in infos[:position]:
+            if info.filename not in deferred:
+                self._copy_part(info)
+        
+        sheet_info = infos[position]
+        self.stream = self.zip.open(
+            self._new_info(sheet_info), "w",
+            force_zip64=sheet_info.file_size >= zipfile.ZIP64_LIMIT
+        )
+        self.stream.write(_DIMENSION_ELEMENT_RE.sub(b"", sheet.head))
+    
+    def _new_info(self, info):
+        new_info = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+        new_info.compress_type = zipfile.ZIP_DEFLATED
+        new_info.external_attr = info.external_attr
+        return new_info
+    
+    def _copy_part(self, info):
+        data = self.package.zip.read(info.filename)
+        if self._calc_chain:
+            # The calculation chain is not copied, so drop every reference to it
+            name = posixpath.basename(self._calc_chain).encode()
+            if info.filename == "[Content_Types].xml":
+                data = re.sub(rb'<Override\b[^>]*?PartName="[^"]*/' + re.escape(name) + rb'"[^>]*?/>', b"", data)
+            elif info.filename.endswith(".rels"):
+                data = re.sub(rb'<Relationship\b[^>]*?Target="(?:[^"]*/)?' + re.escape(name) + rb'"[^>]*?/>', b"", data)
+        if self._dropped and info.filename in self._tables:
+            data = self.shift_table(data)
+        elif self._dropped and info.filename == self.package.workbook_part:
+            data = self.shift_defined_names(data)
+        self.zip.writestr(self._new_info(info), data)
+    
+    def write_row(self, row_number, row_xml):
+        """Copy a source row, renumbered to its position in this copy"""
+        new_number = row_number - self.rows_dropped
+        if new_number != row_number:
+            row_xml = _REFERENCE_RE.sub(b"\\g<1>" + str(new_number).encode() + b'"', row_xml)
+        if self.rows_dropped and self._formula_tag in row_xml:
+            row_xml = _FORMULA_RE.sub(b"", row_xml)
+        self._pending.append(row_xml)
+        self.rows_written += 1
+        if len(self._pending) >= self.FLUSH_ROWS:
+            self.stream.write(b"".join(self._pending))
+            self._pending = []
+    
+    def drop_row(self, row_number):
+        """Leave out a source row; the rows after it move up"""
+        self.rows_dropped += 1
+        self._dropped.append(row_number)
+    
+    def shift_range(self, reference, shrink, min_rows=1):
+        """A cell or area reference ("A8:B9", "C10") moved to the kept rows, None when it is gone
+        
+        With shrink, an area keeps the kept rows inside it and is gone when none is
+        left, unless min_rows asks to keep that many; otherwise (cells that must stay
+        together) any dropped row removes it. References without row numbers (whole
+        columns) stay as they are.
+        """
+        ends = [_RANGE_END_RE.match(end) for end in reference.split(b":")]
+        if any(end is None for end in ends):
+            return reference
+        first, last = int(ends[0].group(2)), int(ends[-1].group(2))
+        before_first = bisect_left(self._dropped, first)
+        up_to_last = bisect_right(self._dropped, last)
+        if not shrink and up_to_last > before_first:
+            return None
+        first, last = first - before_first, last - up_to_last
+        if min_rows > 1 and len(ends) > 1:
+            last = max(last, first + min_rows - 1)
+        if last < first:
+            return None
+        rows = [first, last] if len(ends) > 1 else [first]
+        return b":".join(end.group(1) + str(row).encode() for end, row in zip(ends, rows))
+    
+    def shift_ranges(self, tail):
+        """The sheet tail with its merged cells, hyperlinks, conditional formats, data
+        validations and auto filter moved up with the kept rows
+        
+        Merged cells and hyperlinks on a dropped row are removed. Areas (conditional
+        formats, validations, filter) shrink to the kept rows and are removed once empty.
+        Containers left without elements are removed too, the others get their count.
+        """
+        if not self._dropped:
+            return tail
+        
+        def shift_element(element):
+            shrink = element.group(1) not in (b"mergeCell", b"hyperlink")
+            removed = False
+            
+            def shift_attribute(attribute):
+                nonlocal removed
+                references = [self.shift_range(reference, shrink) for reference in attribute.group(2).split()]
+                references = [reference for reference in references if reference is not None]
+                if not references:
+                    removed = True
+                return attribute.group(1) + b" ".join(references) + b'"'
+            
+            shifted = _RANGE_ATTRIBUTE_RE.sub(shift_attribute, element.group(0))
+            return b"" if removed else shifted
+        
+        def fix_container(container):
+            children = len(_RANGE_ELEMENT_RE.findall(container.group(3) or b""))
+            if not children:
+                return b""
+            return _COUNT_RE.sub(b'count="' + str(children).encode() + b'"', container.group(0), count=1)
+        
+        tail = _RANGE_ELEMENT_RE.sub(shift_element, tail)
+        return _RANGE_CONTAINER_RE.sub(fix_container, tail)
+    
+    def shift_table(self, xml):
+        """A table part of the sheet with its area and auto filter moved up with the kept rows
+        
+        A table keeps its header row and at least one row below it, as Excel requires,
+        and so do its filter and sort state.
+        """
+        def shift_area(element):
+            return _RANGE_ATTRIBUTE_RE.sub(
+                lambda attribute: attribute.group(1) + self.shift_range(attribute.group(2), True, 2) + b'"',
+                element.group(0), count=1)
+        
+        xml = _TABLE_RE.sub(shift_area, xml, count=1)
+        return re.sub(rb'<(?:\w+:)?(?:autoFilter|sortState|sortCondition)\b[^>]*>', shift_area, xml)
+    
+    def shift_defined_names(self, xml):
+        """The workbook part with the areas of its defined names on this sheet moved up with the kept rows
+        
+        An area whose rows were all dropped becomes #REF!, as when Excel deletes them.
+        """
+        names = {self.sheet.name, "'" + self.sheet.name.replace("'", "''") + "'"}
+        prefixes = {escape(text, entities).encode("utf-8") for text in names for entities in ({}, {"'": "&apos;"})}
+        sheet_area = re.compile(
+            rb"(?<![\w'.])(" + b"|".join(re.escape(prefix) for prefix in sorted(prefixes, key=len, reverse=True))
+            + rb")!(" + _NAME_AREA_RE.pattern + rb")"
+        )
+        
+        def shift_area(area):
+            reference = self.shift_range(area.group(2), True)
+            return area.group(1) + b"!" + (b"#REF!" if reference is None else reference)
+        
+        return _DEFINED_NAME_RE.sub(
+            lambda defined: defined.group(1) + sheet_area.sub(shift_area, defined.group(2)) + defined.group(3), xml)
+    
+    def close(self):
+        """Finish the sheet (call once sheet.rows() is exhausted) and copy the remaining parts"""
+        self.stream.write(b"".join(self._pending) + self.shift_ranges(self.sheet.tail))
+        self._pending = []
+        self.stream.close()
+        for info in self._remaining:
+            self._copy_part(info)
+        self.zip.close()
+    
+    def abort(self):
+        """Close and delete a partially written copy"""
+        try:
+            self.stream.close()
+            self.zip.close()
+        except Exception:
+            pass
+        self.path.unlink(missing_ok=True)